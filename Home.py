@@ -1,7 +1,8 @@
 # app.py  – HOME (minimal)
 import streamlit as st
-from common.sql import load_master
-from common.data import load_name_lookup
+from common.memory import guard_session
+from common.profiling import profile_rerun
+from common.universe import get_universe
 
 st.set_page_config(
     page_title="🏠 Home",
@@ -9,6 +10,8 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+profile_rerun()
+guard_session()
 
 # Header
 st.title("🏠 Indian Stock Analyzer – Home")
@@ -25,8 +28,7 @@ st.markdown("---")
 
 # Dataset statistics
 try:
-    master_df = load_master()        # your master symbol list
-    name_df   = load_name_lookup()   # symbol ↔ company-name mapping
+    master_df = get_universe().frame   # shared, process-wide symbol list
 
     c1, c2, c3 = st.columns(3)
     c1.metric("Total Symbols",     f"{len(master_df):,}")
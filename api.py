@@ -0,0 +1,297 @@
+# api.py
+# ------------------------------------------------------------
+# Headless JSON API over the analysis functions (Starlette / ASGI).
+#
+#   GET /api/v1/stocks/{symbol}/metrics       core ratios, company / sector / market_cap / price
+#                                             + stored fundamentals
+#   GET /api/v1/stocks/{symbol}/fundamentals  ?as_of=2025-06-30  (recorded history)
+#   GET /api/v1/stocks/{symbol}/summary       price, day / 52w / ATH, levels, beta
+#   GET /api/v1/stocks/{symbol}/indicators    ?interval=1d&period=1y&rows=1
+#   GET /api/v1/stocks/{symbol}/pivots        ?timeframe=D&method=classic
+#   GET /api/v1/stocks/{symbol}/peers         ?k=10
+#   GET /api/v1/industries/{industry}/averages ?source=local|live
+#   GET /api/health   /api/metrics (Prometheus)
+#
+# Run the UI and the API in one process, sharing every cache:
+#       uvicorn api:app --port 8501
+# or the API alone:
+#       uvicorn api:api --port 8000
+# (set STOCK_ANALYZER_PROVIDER=synthetic to run offline)
+# ------------------------------------------------------------
+import json
+import math
+
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Mount, Route
+
+from common import telemetry
+from common.bars import STALE_S
+from common.cache import Uncached, cached
+from common.export import indicator_panel, industry_stats
+from common.finance import _fetch_core_metrics, get_industry_averages
+from common.fundamentals_history import fundamentals_as_of, fundamentals_history
+from common.levels import get_levels
+from common.market_calendar import intraday_ttl
+from common.peer_finder import top_peers
+from common.price_stats import price_stats
+from common.provider import UpstreamUnavailable
+from common.resample import INTERVALS, get_bars
+from common.risk import risk_for
+from common.sql import dataset_version
+from common.telemetry import span
+from common.universe import get_universe
+from pivot_utils import METHODS, TIMEFRAMES, get_pivots
+
+MAX_ROWS = 500
+MAX_PEERS = 50
+RETRY_AFTER_S = 60
+
+
+class ApiResponse(JSONResponse):
+    """JSON with NaN / inf as null and numpy / pandas scalars unwrapped."""
+
+    def render(self, content) -> bytes:
+        return json.dumps(_clean(content), separators=(",", ":"), allow_nan=False).encode()
+
+
+def _clean(value):
+    if isinstance(value, dict):
+        return {str(k): _clean(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(v) for v in value]
+    if isinstance(value, pd.DataFrame):
+        return _clean(value.to_dict(orient="records"))
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return None if pd.isna(value) else pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _symbol(request: Request) -> str:
+    """Path symbol, upper-cased without '.NS'; 404 if it is not in the universe."""
+    symbol = request.path_params["symbol"].strip().upper().removesuffix(".NS")
+    if not (get_universe().frame["Symbol"] == symbol).any():
+        raise HTTPException(404, f"Unknown symbol {symbol!r}")
+    return symbol
+
+
+def _choice(request: Request, name: str, default: str, allowed) -> str:
+    value = request.query_params.get(name, default)
+    if value not in allowed:
+        raise HTTPException(400, f"{name} must be one of {sorted(allowed)}")
+    return value
+
+
+def _int(request: Request, name: str, default: int, high: int) -> int:
+    try:
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        raise HTTPException(400, f"{name} must be an integer")
+    return max(1, min(value, high))
+
+
+# ────────────────────────────────────────────────────────────────────
+# Endpoints (sync: Starlette runs them in its thread pool)
+# ────────────────────────────────────────────────────────────────────
+
+
+def metrics(request: Request):
+    symbol = _symbol(request)
+    stored = get_universe().frame.set_index("Symbol").loc[symbol]
+    # the UI's meta keys (_company, _sector, …) under public names
+    live = {k.removeprefix("_"): v for k, v in _fetch_core_metrics(symbol).items()}
+    return ApiResponse({
+        "symbol": symbol,
+        "live": live,
+        "stored": stored.to_dict(),
+        "freshness": (f := _fetch_core_metrics.freshness(symbol)) and f._asdict(),
+    })
+
+
+def fundamentals(request: Request):
+    """Stored fundamentals as of a date, or the full refresh history without ``as_of``."""
+    symbol = _symbol(request)
+    as_of = request.query_params.get("as_of")
+    if as_of is None:
+        history = fundamentals_history(symbol)
+        return ApiResponse({"symbol": symbol, "history": history.reset_index()})
+    try:
+        values = fundamentals_as_of(as_of, [symbol]).iloc[0]
+    except ValueError:
+        raise HTTPException(400, "as_of must be a date (YYYY-MM-DD)")
+    return ApiResponse({"symbol": symbol, "as_of": as_of, "values": values.to_dict()})
+
+
+def summary(request: Request):
+    symbol = _symbol(request)
+    bars = get_bars(f"{symbol}.NS", interval="1d", period="1y")
+    if bars.empty:
+        raise HTTPException(503, "No price data available", headers={"Retry-After": str(RETRY_AFTER_S)})
+    close = bars["Close"]
+    last = float(close.iloc[-1])
+    ath = price_stats()["ATH"].get(symbol, np.nan)
+    support, resistance = get_levels(f"{symbol}.NS", period="6mo", interval="1d").nearest(last)
+    risk = risk_for(symbol)
+    return ApiResponse({
+        "symbol": symbol,
+        "date": close.index[-1],
+        "price": last,
+        "day_pct": (last / close.iloc[-2] - 1) * 100 if len(close) > 1 else None,
+        "high_52w": float(bars["High"].max()),
+        "low_52w": float(bars["Low"].min()),
+        "ath": max(ath, last) if pd.notna(ath) else None,
+        "support": support,
+        "resistance": resistance,
+        "risk": risk.drop(columns="Symbol"),
+    })
+
+
+@cached("api.indicators", ttl=intraday_ttl("interval"), stale_ttl=STALE_S, max_entries=1024,
+        max_bytes=128 * 2**20)
+def _indicator_panel(symbol: str, interval: str, period: str) -> pd.DataFrame:
+    bars = get_bars(f"{symbol}.NS", interval=interval, period=period)
+    if bars.empty:
+        return Uncached(bars)
+    wide = pd.concat({symbol: bars[["Open", "High", "Low", "Close"]]}, axis=1).swaplevel(axis=1)
+    return indicator_panel(wide).drop(columns="Symbol")
+
+
+def indicators(request: Request):
+    symbol = _symbol(request)
+    interval = _choice(request, "interval", "1d", INTERVALS)
+    period = request.query_params.get("period", "1y")
+    rows = _int(request, "rows", 1, MAX_ROWS)
+    try:
+        panel = _indicator_panel(symbol, interval, period)
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    return ApiResponse({"symbol": symbol, "interval": interval, "rows": panel.tail(rows)})
+
+
+def pivots(request: Request):
+    symbol = _symbol(request)
+    timeframe = _choice(request, "timeframe", "D", TIMEFRAMES)
+    method = _choice(request, "method", "classic", METHODS)
+    found = get_pivots(symbol, timeframe, method)
+    if not found:
+        raise HTTPException(404, f"No pivots for {symbol}")
+    return ApiResponse({"symbol": symbol, "timeframe": timeframe, "method": method, **found})
+
+
+@cached("api.peers", max_entries=2048)
+def _peers(symbol: str, k: int, snapshot: str) -> list:
+    """TF-IDF peers are refitted per call in ``top_peers`` – memoise them per snapshot."""
+    peers = top_peers(symbol, k=k)
+    cols = [c for c in ("Symbol", "Company Name", "Industry", "PE Ratio", "ROE", "MarketCap") if c in peers]
+    return _clean(peers[cols].to_dict(orient="records")) if not peers.empty else []
+
+
+def peers(request: Request):
+    symbol = _symbol(request)
+    k = _int(request, "k", 10, MAX_PEERS)
+    return ApiResponse({"symbol": symbol, "peers": _peers(symbol, k, dataset_version())})
+
+
+@cached("api.industry_stats", max_entries=2)
+def _industry_stats(snapshot: str) -> pd.DataFrame:
+    return industry_stats(get_universe().frame).set_index("Industry")
+
+
+def industry_averages(request: Request):
+    industry = request.path_params["industry"]
+    source = _choice(request, "source", "local", {"local", "live"})
+    frame = get_universe().frame
+    if not (frame["Industry"] == industry).any():
+        raise HTTPException(404, f"Unknown industry {industry!r}")
+    if source == "live":
+        # medians of each member's live core metrics (one upstream call per uncached member)
+        averages = get_industry_averages(industry, frame)
+    else:
+        averages = _industry_stats(dataset_version()).loc[industry].to_dict()
+    return ApiResponse({"industry": industry, "source": source, "averages": averages})
+
+
+def health(request: Request):
+    return ApiResponse({"status": "ok", "dataset": dataset_version()})
+
+
+def prometheus(request: Request):
+    return PlainTextResponse(telemetry.prometheus_text())
+
+
+# ────────────────────────────────────────────────────────────────────
+# Errors and app
+# ────────────────────────────────────────────────────────────────────
+
+
+def _http_error(request: Request, exc: HTTPException):
+    return ApiResponse({"error": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+
+
+def _upstream_error(request: Request, exc: UpstreamUnavailable):
+    # circuit open or rate-limited with nothing cached; any other error is a 500
+    return ApiResponse({"error": "Market data temporarily unavailable"}, status_code=503,
+                       headers={"Retry-After": str(RETRY_AFTER_S)})
+
+
+class _Traced:
+    """ASGI middleware: one ``api.<route>`` span per request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        # relative to the mount point: under ``uvicorn api:app`` the path starts with /api
+        path, root = scope["path"], scope.get("root_path", "")
+        if root and path.startswith(root):
+            path = path[len(root):]
+        parts = path.strip("/").split("/")
+        name = parts[-1] if len(parts) > 1 and parts[0] == "v1" else parts[0] or "root"
+        with span(f"api.{name}"):
+            await self.app(scope, receive, send)
+
+
+stock_routes = [
+    Route("/metrics", metrics),
+    Route("/fundamentals", fundamentals),
+    Route("/summary", summary),
+    Route("/indicators", indicators),
+    Route("/pivots", pivots),
+    Route("/peers", peers),
+]
+
+api = Starlette(
+    routes=[
+        Mount("/v1/stocks/{symbol}", routes=stock_routes),
+        Route("/v1/industries/{industry}/averages", industry_averages),
+        Route("/health", health),
+        Route("/metrics", prometheus),
+    ],
+    exception_handlers={
+        HTTPException: _http_error,
+        UpstreamUnavailable: _upstream_error,
+    },
+)
+api.add_middleware(_Traced)
+
+
+def _streamlit_app():
+    import streamlit as st
+    return st.App("Home.py", routes=[Mount("/api", app=api)])
+
+
+def __getattr__(name):
+    # ``uvicorn api:app`` builds the combined UI + API app only when asked for
+    if name == "app":
+        return _streamlit_app()
+    raise AttributeError(name)
@@ -0,0 +1,107 @@
+# backtest.py
+# ------------------------------------------------------------
+# Parameter sweeps of the chart signals over the universe
+# (see common/backtest.py):
+#   • crossover  EMA fast / slow lengths
+#   • rsi        RSI period, oversold entry, overbought exit
+#   • pivot      bounce off previous day / week / month pivot supports
+#
+# Reports CAGR, max drawdown and hit rate per parameter set, best first.
+# Bars come from an export (python export.py DIR --bars) with --bars DIR,
+# otherwise they are downloaded in batches like the nightly job.
+#
+# Run:  python backtest.py crossover [--bars DIR] [--period 5y] [--limit N]
+#           [--param fast=10,20 --param slow=50,100] [--workers N] [--out FILE]
+# (set STOCK_ANALYZER_PROVIDER=synthetic to run offline)
+# ------------------------------------------------------------
+import argparse
+import time
+
+import pandas as pd
+import pyarrow.compute as pc
+
+from common.backtest import COST, GRIDS, STRATEGIES, grid_size, summarize, sweep
+from common.bars import wide_bars
+from common.export import load
+from common.resample import period_days, trim_period
+from common.sql import ENGINE
+from nightly import fetch_bars
+
+PERIOD = "5y"
+TOP = 15
+
+
+def _value(text: str):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_grid(strategy: str, params) -> dict:
+    """``["fast=10,20", …]`` over the default grid of *strategy*."""
+    grid = dict(GRIDS[strategy])
+    for item in params or []:
+        name, _, values = item.partition("=")
+        if name not in grid:
+            raise SystemExit(f"{strategy} has no parameter {name!r}; have {', '.join(grid)}")
+        grid[name] = tuple(_value(v.strip()) for v in values.split(",") if v.strip())
+    return grid
+
+
+def load_bars(bars_dir: str = None, period: str = PERIOD, limit: int = None, progress: bool = True) -> pd.DataFrame:
+    """Daily bars, columns (field, symbol): from an export directory, else downloaded."""
+    symbols = pd.read_sql("SELECT DISTINCT Symbol FROM DimCompany", ENGINE)["Symbol"].dropna()
+    if limit:
+        symbols = symbols.head(limit)
+    if bars_dir:
+        filter = pc.field("Symbol").isin(symbols.tolist())
+        if period != "max":
+            first_year = pd.Timestamp.now().year - int(period_days(period) // 365) - 1
+            filter = filter & (pc.field("Year") >= first_year)
+        table = load(bars_dir, "Bars", columns=["Date", "Symbol", "Open", "High", "Low", "Close"], filter=filter)
+        return trim_period(wide_bars(table.to_pandas()), period)
+    bars = fetch_bars([f"{s}.NS" for s in symbols], period, progress)
+    bars.columns = bars.columns.set_levels(bars.columns.levels[1].str.removesuffix(".NS"), level=1)
+    return bars
+
+
+def backtest(strategy: str, grid: dict = None, bars_dir: str = None, period: str = PERIOD, limit: int = None,
+             workers: int = None, cost: float = COST, out: str = None, progress: bool = True) -> pd.DataFrame:
+    t0 = time.perf_counter()
+    bars = load_bars(bars_dir, period, limit, progress)
+    if progress:
+        print(f"✅ Bars: {bars['Close'].shape[1]:,} symbols × {len(bars):,} sessions "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    results = sweep(bars, strategy, grid, workers=workers, cost=cost, progress=progress)
+    if progress:
+        print(f"✅ {strategy}: {grid_size(strategy, grid)} parameter sets × {bars['Close'].shape[1]:,} symbols "
+              f"= {len(results):,} runs in {time.perf_counter() - t0:.1f}s")
+    if out:
+        (results.to_parquet if out.endswith(".parquet") else results.to_csv)(out, index=False)
+        if progress:
+            print(f"✅ Wrote {out}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest chart signals over the universe with parameter sweeps")
+    parser.add_argument("strategy", choices=list(STRATEGIES))
+    parser.add_argument("--param", action="append", metavar="NAME=V1,V2",
+                        help="replace one parameter's values in the default grid (repeatable)")
+    parser.add_argument("--bars", metavar="DIR", help="read bars from an export instead of downloading")
+    parser.add_argument("--period", default=PERIOD, help="history to test (yfinance period)")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N symbols")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: every core)")
+    parser.add_argument("--cost", type=float, default=COST, help="cost per side, fraction of traded value")
+    parser.add_argument("--out", help="write every (parameter set, symbol) row (.parquet or .csv)")
+    args = parser.parse_args()
+
+    grid = parse_grid(args.strategy, args.param)
+    results = backtest(args.strategy, grid, args.bars, args.period, args.limit, args.workers, args.cost, args.out)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(summarize(results).head(TOP).round(2).to_string(index=False))
@@ -0,0 +1 @@
+"""Offline benchmarks for the Indian Stock Analyzer (see ``python -m benchmarks.run -h``)."""
@@ -0,0 +1,156 @@
+"""
+benchmarks.flows
+~~~~~~~~~~~~~~~~
+Scripted page visits driven through ``streamlit.testing.v1.AppTest``.
+
+Each flow builds a list of steps for a symbol; a step receives the
+``AppTest`` and performs one user interaction followed by a rerun. The
+first step always loads the page.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parent.parent
+RUN_TIMEOUT = 120
+
+Step = Callable[[AppTest], None]
+
+
+def _load(at: AppTest) -> None:
+    at.run(timeout=RUN_TIMEOUT)
+
+
+def _search(query: str) -> Step:
+    def step(at: AppTest) -> None:
+        at.text_input[0].input(query).run(timeout=RUN_TIMEOUT)
+    return step
+
+
+class WidgetMissing(LookupError):
+    """The page did not render the widget a step wants (e.g. no peers found)."""
+
+
+def _widget(elements, label: str):
+    for el in elements:
+        if el.label == label:
+            return el
+    raise WidgetMissing(label)
+
+
+def _select(label: str, index: int) -> Step:
+    def step(at: AppTest) -> None:
+        box = _widget(at.selectbox, label)
+        box.select_index(min(index, len(box.options) - 1)).run(timeout=RUN_TIMEOUT)
+    return step
+
+
+def _multiselect(label: str, index: int) -> Step:
+    def step(at: AppTest) -> None:
+        box = _widget(at.multiselect, label)
+        box.select(box.options[min(index, len(box.options) - 1)]).run(timeout=RUN_TIMEOUT)
+    return step
+
+
+def _radio(label: str, index: int) -> Step:
+    def step(at: AppTest) -> None:
+        radio = _widget(at.radio, label)
+        radio.set_value(radio.options[min(index, len(radio.options) - 1)]).run(timeout=RUN_TIMEOUT)
+    return step
+
+
+def _check(label: str) -> Step:
+    def step(at: AppTest) -> None:
+        _widget(at.checkbox, label).check().run(timeout=RUN_TIMEOUT)
+    return step
+
+
+def _toggle(label: str) -> Step:
+    def step(at: AppTest) -> None:
+        box = _widget(at.checkbox, label)
+        box.set_value(not box.value).run(timeout=RUN_TIMEOUT)
+    return step
+
+
+FLOWS: Dict[str, dict] = {
+    "home": {
+        "script": "Home.py",
+        "steps": lambda sym: [_load],
+    },
+    "sector": {
+        "script": "pages/2_Sector_Analysis.py",
+        "steps": lambda sym: [_load, _select("Rank Top-10 by", 1), _check("Show **all** companies")],
+    },
+    "fundamentals": {
+        "script": "pages/1_Fundamentals.py",
+        "symbol": "TCS",
+        "steps": lambda sym: [_load, _search(sym), _select("Price chart period", 5)],
+    },
+    "fundamentals_compare": {
+        "script": "pages/1_Fundamentals.py",
+        "symbol": "INFY",
+        "steps": lambda sym: [_load, _search(sym), _multiselect("Compare with peers", 1)],
+    },
+    "technical": {
+        "script": "pages/3_Technical_Analysis.py",
+        "symbol": "RELIANCE",
+        "steps": lambda sym: [_load, _search(sym), _select("Select Interval", 1), _check("🌙 Dark Mode")],
+    },
+    "index": {
+        "script": "pages/4_Index_Analysis.py",
+        "steps": lambda sym: [_load, _select(" Select Index", 2)],
+    },
+    "heatmap": {
+        "script": "pages/6_Heatmap.py",
+        "steps": lambda sym: [_load, _radio("Return over", 3), _radio("Group tiles by", 1)],
+    },
+}
+
+
+# Single widget changes on an already-rendered page. ``fragment`` is the span
+# of the st.fragment the widget lives in – what a fragment-scoped rerun costs
+# in the browser – while AppTest always reruns the whole script.
+INTERACTIONS: Dict[str, dict] = {
+    "fundamentals_period": {
+        "flow": "fundamentals",
+        "setup": lambda: [_load, _search("TCS")],
+        "act": lambda i: _select("Price chart period", i % 3 + 2),
+        "fragment": "display.price_chart",
+    },
+    "compare_period": {
+        "flow": "fundamentals_compare",
+        "setup": lambda: [_load, _search("INFY"), _multiselect("Compare with peers", 1)],
+        "act": lambda i: _select("Chart period", i % 3 + 1),
+        "fragment": "display.compare_chart",
+    },
+    "technical_dark_mode": {
+        "flow": "technical",
+        "setup": lambda: [_load, _search("RELIANCE")],
+        "act": lambda i: _toggle("🌙 Dark Mode"),
+        "fragment": "technical.chart",
+    },
+    "technical_interval": {
+        "flow": "technical",
+        "setup": lambda: [_load, _search("RELIANCE")],
+        "act": lambda i: _select("Select Interval", i % 2 + 4),
+        "fragment": "technical.chart",
+    },
+}
+
+
+def new_app(flow: str) -> AppTest:
+    return AppTest.from_file(str(ROOT / FLOWS[flow]["script"]), default_timeout=RUN_TIMEOUT)
+
+
+def steps(flow: str, symbol: Optional[str] = None) -> List[Step]:
+    """Steps for *flow*; *symbol* overrides the flow's default search term."""
+    return FLOWS[flow]["steps"](symbol or FLOWS[flow].get("symbol"))
+
+
+def errors(at: AppTest) -> List[str]:
+    """Uncaught exceptions plus ``st.error`` messages from the last run."""
+    return [e.message for e in at.exception] + [e.value for e in at.error]
@@ -0,0 +1,292 @@
+"""
+benchmarks.loadtest
+~~~~~~~~~~~~~~~~~~~
+Multi-session load test for the Streamlit pages.
+
+Simulates ``--users`` sessions, ``--concurrency`` at a time, each walking
+``--visits`` random page flows (Home, Fundamentals, Sector, Technical,
+Index – see benchmarks.flows) with a random symbol from a shared pool.
+Every rerun is timed, and all market data goes through a counting wrapper
+around the offline provider (synthetic by default, ``--provider replay``
+for recorded data).
+
+Report (JSON + console table), per page and overall:
+
+    reruns, throughput, p50/p95/p99 rerun time, upstream calls per rerun,
+    cache hit rate (share of reruns served without any upstream call),
+    process CPU per session, peak RSS and RSS growth per session,
+    and per cached function: hits, misses, hit rate, evictions, bytes held.
+
+    python -m benchmarks.loadtest --users 20 --concurrency 4 --out loadtest.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.run import ANCHOR, ROOT, _clear_caches, _git_commit
+
+RERUN_KEY = "_loadtest_rerun"
+
+# ────────────────────────────────────────────────────────────────────
+# Upstream call accounting
+# ────────────────────────────────────────────────────────────────────
+
+
+class _CountingTicker:
+    def __init__(self, owner: "CountingProvider", inner):
+        self._owner = owner
+        self._inner = inner
+
+    def history(self, *args, **kwargs):
+        self._owner.record("history")
+        return self._inner.history(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name in ("info", "financials", "cashflow", "recommendations"):
+            self._owner.record(name)
+        return getattr(self._inner, name)
+
+
+class CountingProvider:
+    """Wrap a provider; count calls per rerun tag found in session state."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = f"counting({inner.name})"
+        self.offline = getattr(inner, "offline", False)
+        self.calls: dict = defaultdict(int)
+        self.by_method: dict = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, method: str) -> None:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+        tag = None
+        if ctx is not None:
+            try:
+                tag = ctx.session_state[RERUN_KEY] if RERUN_KEY in ctx.session_state else None
+            except Exception:
+                tag = None
+        with self._lock:
+            self.calls[tag] += 1
+            self.by_method[method] += 1
+
+    def Ticker(self, symbol: str):
+        return _CountingTicker(self, self.inner.Ticker(symbol))
+
+    def download(self, tickers, **kwargs):
+        self.record("download")
+        return self.inner.download(tickers, **kwargs)
+
+
+# ────────────────────────────────────────────────────────────────────
+# Process metrics
+# ────────────────────────────────────────────────────────────────────
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentiles(samples) -> dict:
+    arr = np.asarray(samples, dtype=float)
+    if arr.size == 0:
+        return {}
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 2),
+        "p95_ms": round(float(np.percentile(arr, 95)), 2),
+        "p99_ms": round(float(np.percentile(arr, 99)), 2),
+        "mean_ms": round(float(arr.mean()), 2),
+        "max_ms": round(float(arr.max()), 2),
+    }
+
+
+# ────────────────────────────────────────────────────────────────────
+# Simulation
+# ────────────────────────────────────────────────────────────────────
+
+
+def _symbol_pool(size: int, seed: int) -> list:
+    from common.universe import get_universe
+
+    desc = get_universe().descriptions()
+    symbols = sorted(desc[desc.str.len() > 30].index)
+    return random.Random(seed).sample(symbols, min(size, len(symbols)))
+
+
+def run_load(users: int, concurrency: int, visits: int, pool: list,
+             counter: CountingProvider, seed: int) -> list:
+    from benchmarks import flows
+
+    tags = count()
+    samples = []
+    lock = threading.Lock()
+
+    def session(uid: int) -> None:
+        rng = random.Random(seed * 1000 + uid)
+        for _ in range(visits):
+            flow = rng.choice(list(flows.FLOWS))
+            symbol = rng.choice(pool) if "symbol" in flows.FLOWS[flow] else None
+            at = flows.new_app(flow)
+            for i, step in enumerate(flows.steps(flow, symbol)):
+                tag = next(tags)
+                at.session_state[RERUN_KEY] = tag
+                t0 = time.perf_counter()
+                try:
+                    step(at)
+                    err = (flows.errors(at) or [None])[0]
+                except flows.WidgetMissing:         # flow not applicable to this symbol
+                    break
+                except Exception as exc:            # timeout, AppTest failure, …
+                    err = f"{type(exc).__name__}: {exc}"
+                wall = (time.perf_counter() - t0) * 1000
+                with lock:
+                    samples.append({"user": uid, "flow": flow, "page": flows.FLOWS[flow]["script"],
+                                    "step": i, "symbol": symbol, "tag": tag,
+                                    "wall_ms": wall, "error": err})
+                if err:
+                    break
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool_:
+        list(pool_.map(session, range(users)))
+
+    for s in samples:
+        s["upstream_calls"] = counter.calls.get(s["tag"], 0)
+    return samples
+
+
+def summarise(samples: list, elapsed: float, cpu: float, users: int,
+              rss_before: float, rss_after: float) -> dict:
+    by_page = defaultdict(list)
+    for s in samples:
+        by_page[s["page"]].append(s)
+
+    pages = {}
+    for page, rows in sorted(by_page.items()):
+        calls = [r["upstream_calls"] for r in rows]
+        pages[page] = {
+            "reruns": len(rows),
+            "errors": sum(bool(r["error"]) for r in rows),
+            **_percentiles([r["wall_ms"] for r in rows]),
+            "upstream_per_rerun": round(float(np.mean(calls)), 2),
+            "cache_hit_rate": round(sum(c == 0 for c in calls) / len(calls), 3),
+        }
+
+    all_calls = [s["upstream_calls"] for s in samples]
+    return {
+        "overall": {
+            "users": users,
+            "reruns": len(samples),
+            "errors": sum(bool(s["error"]) for s in samples),
+            "elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+            **_percentiles([s["wall_ms"] for s in samples]),
+            "upstream_calls": int(sum(all_calls)),
+            "cache_hit_rate": round(sum(c == 0 for c in all_calls) / max(1, len(all_calls)), 3),
+            "cpu_s": round(cpu, 2),
+            "cpu_s_per_session": round(cpu / users, 3),
+            "rss_start_mb": round(rss_before, 1),
+            "rss_end_mb": round(rss_after, 1),
+            "rss_per_session_mb": round((rss_after - rss_before) / users, 2),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+        },
+        "pages": pages,
+        "errors_sample": sorted({s["error"] for s in samples if s["error"]})[:10],
+    }
+
+
+def _print_table(report: dict) -> None:
+    cols = ["reruns", "p50_ms", "p95_ms", "p99_ms", "upstream_per_rerun", "cache_hit_rate", "errors"]
+    print(f"{'page':34}" + "".join(f"{c:>20}" for c in cols))
+    for page, row in report["pages"].items():
+        print(f"{page:34}" + "".join(f"{row.get(c, ''):>20}" for c in cols))
+    cols = ["entries", "hits", "misses", "hit_rate", "evictions", "bytes"]
+    print(f"\n{'cached function':40}" + "".join(f"{c:>12}" for c in cols))
+    for row in report["caches"]:
+        print(f"{row['function']:40}" + "".join(
+            f"{round(row[c], 3) if isinstance(row[c], float) else row[c]:>12}" for c in cols))
+    print(json.dumps(report["overall"], indent=2))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=int, default=10, help="simulated sessions")
+    ap.add_argument("--concurrency", type=int, default=4, help="sessions running at once")
+    ap.add_argument("--visits", type=int, default=4, help="page flows per session")
+    ap.add_argument("--symbols", type=int, default=40, help="size of the shared symbol pool")
+    ap.add_argument("--provider", choices=["synthetic", "replay"], default="synthetic")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", default="loadtest_results.json")
+    args = ap.parse_args(argv)
+
+    os.chdir(ROOT)
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+    from common.provider import set_provider
+    if args.provider == "synthetic":
+        from common.synthetic import SyntheticProvider
+        inner = SyntheticProvider(anchor=ANCHOR)
+    else:
+        from common.replay import ReplayProvider
+        inner = ReplayProvider()
+    counter = CountingProvider(inner)
+    set_provider(counter)
+    _clear_caches()
+
+    # AppTest flips this global option on/off around every run; with several
+    # sessions in flight one run's reset would hide another's widget metadata.
+    from streamlit import config
+    config.set_option("global.appTest", True)
+
+    pool = _symbol_pool(args.symbols, args.seed)
+    rss_before, cpu_before, t0 = _rss_mb(), time.process_time(), time.perf_counter()
+    samples = run_load(args.users, args.concurrency, args.visits, pool, counter, args.seed)
+    elapsed, cpu = time.perf_counter() - t0, time.process_time() - cpu_before
+
+    report = summarise(samples, elapsed, cpu, args.users, rss_before, _rss_mb())
+    from common import cache
+    report["caches"] = cache.stats().to_dict("records")
+    report["meta"] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "provider": args.provider,
+        "upstream_by_method": dict(counter.by_method),
+        **{k: v for k, v in vars(args).items() if k != "out"},
+    }
+    Path(args.out).write_text(json.dumps(report, indent=2, default=str))
+    _print_table(report)
+    print(f"✅ wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
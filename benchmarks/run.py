@@ -0,0 +1,322 @@
+"""
+benchmarks.run
+~~~~~~~~~~~~~~
+Offline benchmark suite. Swaps yfinance for the deterministic
+``SyntheticProvider`` and times the app's hot paths:
+
+    indicators   EMA / RSI / SMMA / crossover throughput on daily bars
+    peers        top_peers() TF-IDF lookup latency
+    industry     get_industry_averages() cold (empty cache) and warm
+    db           bootstrap into a scratch DB, universe + snapshot load
+    pages        AppTest render time per page flow (see benchmarks.flows)
+    interactions one widget change: whole-script rerun vs. the fragment it lives in
+    backtest     default-grid sweep of each strategy, symbol × parameter runs per second
+
+Results are written as JSON so runs can be diffed across commits:
+
+    python -m benchmarks.run --out bench_results.json
+    python -m benchmarks.run --only indicators,peers --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+ANCHOR = "2025-06-30"          # fixed so every run sees identical bars
+
+# ────────────────────────────────────────────────────────────────────
+# Harness
+# ────────────────────────────────────────────────────────────────────
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1) -> dict:
+    """Run *fn* ``warmup + repeat`` times; return timing stats in ms."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    arr = np.asarray(samples)
+    return {
+        "runs": repeat,
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "min_ms": round(float(arr.min()), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def _setup_offline() -> None:
+    """Route every market-data call to the synthetic provider."""
+    os.chdir(ROOT)
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    os.environ["STOCK_ANALYZER_PROVIDER"] = "synthetic"
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+    from common.provider import set_provider
+    from common.synthetic import SyntheticProvider
+    set_provider(SyntheticProvider(anchor=ANCHOR))
+
+
+def _clear_caches() -> None:
+    import streamlit as st
+    from common import cache, resample
+    cache.clear_all()
+    resample.clear()
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+# ────────────────────────────────────────────────────────────────────
+# Cases
+# ────────────────────────────────────────────────────────────────────
+
+
+def bench_indicators(repeat: int) -> dict:
+    from common.provider import Ticker
+    from indicators import apply_ema, calculate_smma, compute_rsi, compute_sma, detect_crossovers
+
+    bars = Ticker("TCS.NS").history(period="max").reset_index()
+    with_ema = apply_ema(bars.copy(), [20, 50])
+    rows = len(bars)
+
+    cases = {
+        "ema_20_50_200": lambda: apply_ema(bars.copy(), [20, 50, 200]),
+        "sma_50": lambda: compute_sma(bars, 50),
+        "rsi_14": lambda: compute_rsi(bars),
+        "smma_14": lambda: calculate_smma(bars["Close"], 14),
+        "crossovers_20_50": lambda: detect_crossovers(with_ema),
+    }
+    out = {"rows": rows}
+    for name, fn in cases.items():
+        stats = measure(fn, repeat)
+        stats["rows_per_s"] = round(rows / (stats["p50_ms"] / 1000), 1)
+        out[name] = stats
+    return out
+
+
+def bench_peers(repeat: int) -> dict:
+    from common.peer_finder import top_peers
+    from common.universe import get_universe
+
+    uni = get_universe()
+    desc = uni.descriptions()
+    symbols = desc[desc.str.len() > 30].index[::200].tolist()[:10]
+    frame = uni.with_descriptions()
+
+    it = iter(symbols * (repeat + 1))
+    return {
+        "symbols": symbols,
+        "top_peers_k10": measure(lambda: top_peers(next(it), frame, k=10), repeat),
+        "descriptions_load": measure(lambda: uni.__class__(uni.frame, uni.snapshot).descriptions(), repeat),
+    }
+
+
+def bench_industry(repeat: int) -> dict:
+    from common.finance import get_industry_averages
+    from common.universe import get_universe
+
+    frame = get_universe().frame
+    counts = frame["Industry"].value_counts()
+    industries = counts.index[:3].tolist()
+    out = {"industries": {str(i): int(counts[i]) for i in industries}}
+
+    def cold():
+        _clear_caches()
+        for ind in industries:
+            get_industry_averages(ind, frame)
+
+    def warm():
+        for ind in industries:
+            get_industry_averages(ind, frame)
+
+    out["cold"] = measure(cold, max(1, repeat // 5), warmup=0)
+    out["warm"] = measure(warm, repeat)
+    return out
+
+
+def bench_db(repeat: int, symbols: int) -> dict:
+    import bootstrap_db
+    from common.sql import compute_snapshot_id
+    from common.universe import load_universe_frame
+
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "bench.db")
+        out["bootstrap"] = measure(
+            lambda: bootstrap_db.bootstrap(db, limit=symbols, progress=False),
+            max(1, repeat // 5), warmup=0,
+        )
+        out["bootstrap"]["symbols"] = symbols
+    out["universe_load"] = measure(load_universe_frame, repeat)
+    out["snapshot_hash"] = measure(compute_snapshot_id, repeat)
+    return out
+
+
+def bench_pages(repeat: int) -> dict:
+    from benchmarks import flows
+
+    out = {}
+    for flow in flows.FLOWS:
+        def visit(flow=flow):
+            at = flows.new_app(flow)
+            for step in flows.steps(flow):
+                step(at)
+            errs = flows.errors(at)
+            if errs:
+                raise RuntimeError(f"{flow}: {errs[0]}")
+
+        _clear_caches()
+        try:
+            out[flow] = {"cold": measure(visit, 1, warmup=0), "warm": measure(visit, repeat)}
+        except Exception as exc:          # keep going – a broken page is a result too
+            out[flow] = {"error": str(exc)}
+    return out
+
+
+def bench_interactions(repeat: int) -> dict:
+    """
+    Per widget change: ``rerun`` is the whole-script rerun AppTest performs
+    (what every interaction cost before fragments), ``fragment`` the time
+    spent in the widget's fragment during that rerun – the work the browser
+    waits for now that only the fragment reruns.
+    """
+    from benchmarks import flows
+    from common import telemetry
+
+    def span_total(name: str) -> tuple:
+        row = telemetry.snapshot().set_index("span")
+        return (row.at[name, "total_s"], row.at[name, "count"]) if name in row.index else (0.0, 0)
+
+    out = {}
+    for name, spec in flows.INTERACTIONS.items():
+        at = flows.new_app(spec["flow"])
+        try:
+            for step in spec["setup"]():
+                step(at)
+            reruns, fragments = [], []
+            for i in range(repeat + 1):                 # first change warms the new widget state
+                total0, count0 = span_total(spec["fragment"])
+                t0 = time.perf_counter()
+                spec["act"](i)(at)
+                wall = (time.perf_counter() - t0) * 1000
+                total1, count1 = span_total(spec["fragment"])
+                if i:
+                    reruns.append(wall)
+                    fragments.append((total1 - total0) * 1000 if count1 > count0 else float("nan"))
+        except Exception as exc:
+            out[name] = {"error": f"{type(exc).__name__}: {exc}"}
+            continue
+        rerun, fragment = np.median(reruns), np.median(fragments)
+        out[name] = {
+            "fragment_span": spec["fragment"],
+            "rerun_p50_ms": round(float(rerun), 2),
+            "fragment_p50_ms": None if np.isnan(fragment) else round(float(fragment), 2),
+            "speedup": None if np.isnan(fragment) or not fragment else round(float(rerun / fragment), 1),
+        }
+    return out
+
+
+def bench_backtest(repeat: int, symbols: int, workers: int) -> dict:
+    """
+    One default-grid sweep per strategy over *symbols* symbols of 5y daily
+    bars, plus the time a full-universe sweep would take at that rate.
+    """
+    from common.backtest import GRIDS, grid_size, sweep
+    from common.universe import get_universe
+    from nightly import fetch_bars
+
+    universe = get_universe().frame["Symbol"].dropna().unique()
+    bars = fetch_bars([f"{s}.NS" for s in universe[:symbols]], "5y", progress=False)
+    bars.columns = bars.columns.set_levels(bars.columns.levels[1].str.removesuffix(".NS"), level=1)
+    n = bars["Close"].shape[1]
+
+    out = {"symbols": n, "sessions": len(bars), "workers": workers or os.cpu_count()}
+    for strategy in GRIDS:
+        stats = measure(lambda: sweep(bars, strategy, workers=workers), repeat, warmup=0)
+        runs = n * grid_size(strategy)
+        stats["runs"] = runs
+        stats["runs_per_s"] = round(runs / (stats["p50_ms"] / 1000))
+        stats["universe_s"] = round(len(universe) * grid_size(strategy) / stats["runs_per_s"], 1)
+        out[strategy] = stats
+    return out
+
+
+SUITES: Dict[str, Callable[[argparse.Namespace], dict]] = {
+    "indicators": lambda a: bench_indicators(a.repeat),
+    "peers": lambda a: bench_peers(max(1, a.repeat // 2)),
+    "industry": lambda a: bench_industry(a.repeat),
+    "db": lambda a: bench_db(a.repeat, a.db_symbols),
+    "pages": lambda a: bench_pages(max(1, a.repeat // 5)),
+    "interactions": lambda a: bench_interactions(max(1, a.repeat // 2)),
+    "backtest": lambda a: bench_backtest(max(1, a.repeat // 5), a.bt_symbols, a.bt_workers),
+}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", default="bench_results.json", help="JSON output path")
+    ap.add_argument("--only", default="", help=f"comma-separated subset of {','.join(SUITES)}")
+    ap.add_argument("--repeat", type=int, default=10, help="timed iterations per case")
+    ap.add_argument("--db-symbols", type=int, default=300, help="symbols to bootstrap in the db case")
+    ap.add_argument("--bt-symbols", type=int, default=500, help="symbols in the backtest sweeps")
+    ap.add_argument("--bt-workers", type=int, default=None, help="backtest processes (default: every core)")
+    args = ap.parse_args(argv)
+
+    _setup_offline()
+    selected = [s for s in args.only.split(",") if s] or list(SUITES)
+    unknown = set(selected) - set(SUITES)
+    if unknown:
+        ap.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "provider": "synthetic",
+            "anchor": ANCHOR,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for name in selected:
+        t0 = time.perf_counter()
+        print(f"▶ {name} …", flush=True)
+        report["results"][name] = SUITES[name](args)
+        print(f"  done in {time.perf_counter() - t0:.1f}s", flush=True)
+
+    Path(args.out).write_text(json.dumps(report, indent=2, default=str))
+    print(f"✅ wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,13 +3,23 @@
 # Build / refresh nse.db with two tables:
 #   • DimCompany        ← basic listing info from two CSVs
 #   • FactFundamentals  ← latest Yahoo fundamentals + Description
+#   • DatasetMeta       ← snapshot ID that keys the app's caches
+#   • FundamentalsHistory / FundamentalsSnapshots
+#                       ← every refresh, changed values only
+#                         (see common/fundamentals_history.py)
+#
+# Run:  python bootstrap_db.py
+# (set STOCK_ANALYZER_PROVIDER=synthetic to seed offline)
 # ------------------------------------------------------------
 import pandas as pd
-import yfinance as yf
 import sqlalchemy as sa
 from tqdm import tqdm
 from pathlib import Path
 
+from common.fundamentals_history import record_fundamentals, seed_from_current
+from common.provider import Ticker
+from common.sql import record_snapshot
+
 # ------------------------------------------------------------------
 # Config – edit if your CSVs live elsewhere
 # ------------------------------------------------------------------
@@ -17,47 +27,70 @@ CSV_COMPANY   = "nse_stocks_.csv"                     # listing info
 CSV_INDUSTRY  = "nse_stocks_with industries.csv"      # sector + industry
 DB_PATH       = "nse.db"                              # output SQLite file
 
-engine = sa.create_engine(f"sqlite:///{DB_PATH}", future=True, echo=False)
 
 # ------------------------------------------------------------------
-# 1) DimCompany  (Symbol, CompanyName, Big Sectors, Industry)
+# 1) DimCompany  (Symbol, CompanyName, Series, Big Sectors, Industry)
 # ------------------------------------------------------------------
-df_company  = pd.read_csv(CSV_COMPANY)
-df_industry = pd.read_csv(CSV_INDUSTRY)[["Symbol", "Big Sectors", "Industry"]]
+def build_dim(csv_company: str = CSV_COMPANY, csv_industry: str = CSV_INDUSTRY) -> pd.DataFrame:
+    df_company  = pd.read_csv(csv_company)
+    df_industry = pd.read_csv(csv_industry)[["Symbol", "Big Sectors", "Industry"]]
+
+    return (
+        df_company
+            .rename(columns={"Company Name": "CompanyName", " SERIES": "Series"})
+            [["Symbol", "CompanyName", "Series"]]
+            .merge(df_industry, on="Symbol", how="left")
+    )
 
-dim = (
-    df_company
-        .rename(columns={"Company Name": "CompanyName"})
-        [["Symbol", "CompanyName"]]
-        .merge(df_industry, on="Symbol", how="left")
-)
-dim.to_sql("DimCompany", engine, if_exists="replace", index=False)
 
 # ------------------------------------------------------------------
 # 2) FactFundamentals  (plus Description)
 # ------------------------------------------------------------------
-symbols = dim["Symbol"].dropna().unique()
-rows = []
-
-print("⬇️  Pulling fundamentals & descriptions from yfinance …")
-for sym in tqdm(symbols, desc="Fetching"):
-    try:
-        info = yf.Ticker(f"{sym}.NS").info
-    except Exception:
-        info = {}
-
-    rows.append({
-        "Symbol":       sym,
-        "PERatio":      info.get("trailingPE"),
-        "EPS":          info.get("trailingEps"),
-        "ROE":          info.get("returnOnEquity"),
-        "ProfitMargin": info.get("profitMargins"),
-        "DebtToEquity": info.get("debtToEquity"),
-        "MarketCap":    info.get("marketCap"),
-        "Description":  info.get("longBusinessSummary"),   # ← new field
-    })
-
-fact = pd.DataFrame(rows)
-fact.to_sql("FactFundamentals", engine, if_exists="replace", index=False)
-
-print(f"✅ Seeded {len(dim):,} companies into {DB_PATH}")
+def fetch_fundamentals(symbols, progress: bool = True) -> pd.DataFrame:
+    rows = []
+    for sym in tqdm(symbols, desc="Fetching", disable=not progress):
+        try:
+            info = Ticker(f"{sym}.NS").info
+        except Exception:
+            info = {}
+
+        rows.append({
+            "Symbol":       sym,
+            "PERatio":      info.get("trailingPE"),
+            "EPS":          info.get("trailingEps"),
+            "ROE":          info.get("returnOnEquity"),
+            "ProfitMargin": info.get("profitMargins"),
+            "DebtToEquity": info.get("debtToEquity"),
+            "MarketCap":    info.get("marketCap"),
+            "Description":  info.get("longBusinessSummary"),   # ← new field
+        })
+    return pd.DataFrame(rows)
+
+
+def bootstrap(db_path: str = DB_PATH, limit: int = None, progress: bool = True) -> str:
+    """Rebuild *db_path*; returns the new dataset snapshot ID."""
+    engine = sa.create_engine(f"sqlite:///{db_path}", future=True, echo=False)
+
+    dim = build_dim()
+    if limit:
+        dim = dim.head(limit)
+    dim.to_sql("DimCompany", engine, if_exists="replace", index=False)
+
+    if progress:
+        print("⬇️  Pulling fundamentals & descriptions …")
+    fact = fetch_fundamentals(dim["Symbol"].dropna().unique(), progress=progress)
+    seed_from_current(engine)                 # keep the values about to be replaced
+    history = record_fundamentals(fact, engine)
+    fact.to_sql("FactFundamentals", engine, if_exists="replace", index=False)
+
+    # 3) DatasetMeta  (content hash – unchanged data keeps the same ID)
+    snapshot_id = record_snapshot(engine)
+
+    if progress:
+        print(f"✅ Seeded {len(dim):,} companies into {Path(db_path)} (snapshot {snapshot_id})")
+        print(f"   History {history['date']}: {history['changed']:,} of {history['values']:,} values new or changed")
+    return snapshot_id
+
+
+if __name__ == "__main__":
+    bootstrap()
@@ -0,0 +1,306 @@
+"""
+common.backtest
+~~~~~~~~~~~~~~~
+Vectorized backtests of the chart signals on daily bars.
+
+A strategy turns wide OHLC frames (dates × symbols) into a 0/1 signal
+array of the same shape. The signal is decided at each close and held over
+the next session's return, so nothing looks ahead. P&L, equity, drawdown
+and per-trade returns are then array operations over every symbol at once.
+The only Python loop is over parameter sets, and an indicator shared by
+several sets (an EMA length, an RSI period, a pivot timeframe) is computed
+once per batch. Every position change costs ``COST`` of the traded value.
+
+``sweep`` splits the symbols into batches of ``BATCH`` and runs the whole
+grid on each batch in a process pool, so a full-universe sweep scales with
+the number of cores.
+
+Strategies
+----------
+crossover   long while EMA(fast) > EMA(slow) – the chart's 20/50 markers
+rsi         long from RSI(period) < lower until RSI > upper
+pivot       buy when a session trades down to a support level of the previous
+            day / week / month pivots and closes back above it; sell at the
+            target level, or once a close is more than *stop* below the support
+
+Functions
+---------
+grid_size(strategy, grid=None) -> int
+    Valid parameter sets in *grid* (default ``GRIDS[strategy]``).
+evaluate(bars, strategy, grid=None, cost=COST) -> DataFrame
+    One row per (parameter set, symbol): return, CAGR, drawdown, hit rate, …
+sweep(bars, strategy, grid=None, workers=None, batch=BATCH, cost=COST) -> DataFrame
+    ``evaluate`` over symbol batches in a process pool.
+summarize(results) -> DataFrame
+    Per parameter set: median CAGR and drawdown, hit rate, share beating buy & hold.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from common.telemetry import traced
+from pivot_utils import FORMULAS, TIMEFRAMES
+
+COST = 0.001                    # per side, as a fraction of the traded value
+BATCH = 100                     # symbols per pool task
+FIELDS = ["Open", "High", "Low", "Close"]
+
+# ~100 parameter sets each; the chart's EMA 20/50 and RSI 14 30/70 are included
+GRIDS = {
+    "crossover": {
+        "fast": (5, 8, 10, 12, 15, 18, 20, 25, 30, 40),
+        "slow": (50, 60, 75, 90, 100, 120, 150, 175, 200, 250),
+    },
+    "rsi": {
+        "period": (7, 10, 14, 21),
+        "lower": (20, 25, 30, 35, 40),
+        "upper": (55, 60, 65, 70, 75),
+    },
+    "pivot": {
+        "method": tuple(FORMULAS),
+        "timeframe": tuple(TIMEFRAMES),
+        "level": ("S1", "S2", "S3"),
+        "target": ("Pivot", "R1"),
+        "stop": (0.02, 0.05),
+    },
+}
+METRICS = [
+    "Return %", "CAGR %", "Max drawdown %", "Trades", "Hit rate %", "Avg trade %",
+    "Exposure %", "Buy & hold %", "Buy & hold CAGR %",
+]
+
+Signals = Iterator[Tuple[dict, np.ndarray]]
+
+
+def _combos(strategy: str, grid: Optional[dict]) -> list:
+    grid = GRIDS[strategy] if grid is None else grid
+    names = list(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    if strategy == "crossover":
+        combos = [c for c in combos if c["fast"] < c["slow"]]
+    elif strategy == "rsi":
+        combos = [c for c in combos if c["lower"] < c["upper"]]
+    return combos
+
+
+def grid_size(strategy: str, grid: Optional[dict] = None) -> int:
+    return len(_combos(strategy, grid))
+
+
+def _hold(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """Long from an entry until the next exit (an exit wins a tie), via a forward fill."""
+    rows = np.arange(len(entries))[:, None]
+    last_entry = np.maximum.accumulate(np.where(entries & ~exits, rows, -1), axis=0)
+    last_exit = np.maximum.accumulate(np.where(exits, rows, -1), axis=0)
+    return last_entry > last_exit
+
+
+# ────────────────────────────────────────────────────────────────────
+# Strategies: (params, signal) per parameter set
+# ────────────────────────────────────────────────────────────────────
+
+
+def _crossover(bars: pd.DataFrame, combos: list) -> Signals:
+    close = bars["Close"].ffill()
+    seen = bars["Close"].notna().cumsum().to_numpy()
+    ema = {n: close.ewm(span=n, adjust=False).mean().to_numpy()
+           for n in sorted({c[k] for c in combos for k in ("fast", "slow")})}
+    for c in combos:
+        # no position until the slow EMA has seen `slow` closes
+        yield c, (ema[c["fast"]] > ema[c["slow"]]) & (seen >= c["slow"])
+
+
+def _rsi(close: pd.DataFrame, period: int) -> np.ndarray:
+    """Same rolling-mean RSI as ``indicators.compute_rsi``, for every column at once."""
+    delta = close.diff()
+    gain = delta.clip(lower=0).rolling(period).mean()
+    loss = (-delta).clip(lower=0).rolling(period).mean()
+    return (100 - 100 / (1 + gain / loss)).to_numpy()
+
+
+def _rsi_signals(bars: pd.DataFrame, combos: list) -> Signals:
+    close = bars["Close"].ffill()
+    rsi = {n: _rsi(close, n) for n in sorted({c["period"] for c in combos})}
+    for c in combos:
+        r = rsi[c["period"]]
+        yield c, _hold(r < c["lower"], r > c["upper"])
+
+
+def _previous_period(bars: pd.DataFrame, timeframe: str) -> Tuple[pd.DataFrame, ...]:
+    """High, low and close of the previous completed day / week / month, on every row."""
+    if timeframe == "D":
+        return tuple(bars[f].shift(1) for f in ("High", "Low", "Close"))
+    freq = "W-SUN" if timeframe == "W" else "M"
+    key = bars.index.to_period(freq)
+    agg = {"High": "max", "Low": "min", "Close": "last"}
+    return tuple(bars[f].groupby(key).agg(how).shift(1).reindex(key).set_axis(bars.index)
+                 for f, how in agg.items())
+
+
+def _pivot_signals(bars: pd.DataFrame, combos: list) -> Signals:
+    low, close = bars["Low"].to_numpy(), bars["Close"].to_numpy()
+    levels = {}
+    for method, timeframe in sorted({(c["method"], c["timeframe"]) for c in combos}):
+        high_p, low_p, close_p = _previous_period(bars, timeframe)
+        levels[method, timeframe] = {k: v.to_numpy() for k, v in FORMULAS[method](high_p, low_p, close_p).items()}
+    with np.errstate(invalid="ignore"):
+        for c in combos:
+            lv = levels[c["method"], c["timeframe"]]
+            support, target = lv[c["level"]], lv[c["target"]]
+            entries = (low <= support) & (close > support)
+            exits = (close >= target) | (close < support * (1 - c["stop"]))
+            yield c, _hold(entries, exits)
+
+
+STRATEGIES = {"crossover": _crossover, "rsi": _rsi_signals, "pivot": _pivot_signals}
+
+
+# ────────────────────────────────────────────────────────────────────
+# Performance
+# ────────────────────────────────────────────────────────────────────
+
+
+def _performance(held: np.ndarray, returns: np.ndarray, years: np.ndarray, cost: float) -> Dict[str, np.ndarray]:
+    """
+    *held*: 1 where the position is held over that row's return. Trades are
+    found from the position edges and valued from the log-equity curve, so
+    hit rate and average trade need no per-trade loop either.
+    """
+    n_rows, n_cols = held.shape
+    held = held.astype(float)
+    turnover = np.abs(np.diff(held, axis=0, prepend=0.0))
+    log_eq = np.cumsum(np.log1p(held * returns - cost * turnover), axis=0)
+    drawdown = np.expm1((log_eq - np.maximum.accumulate(log_eq, axis=0)).min(axis=0))
+
+    # trade k holds rows [start, end); its exit cost lands on row `end`
+    edges = np.diff(held, axis=0, prepend=0.0, append=0.0).T
+    s_col, s_row = np.nonzero(edges > 0)
+    _, e_row = np.nonzero(edges < 0)
+    curve = np.vstack([np.zeros(n_cols), log_eq])
+    trade = np.expm1(curve[np.minimum(e_row + 1, n_rows), s_col] - curve[s_row, s_col])
+    trades = np.bincount(s_col, minlength=n_cols)
+    wins = np.bincount(s_col, weights=trade > 0, minlength=n_cols)
+    total = np.bincount(s_col, weights=trade, minlength=n_cols)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "Return %": np.expm1(log_eq[-1]) * 100,
+            "CAGR %": np.expm1(log_eq[-1] / years) * 100,
+            "Max drawdown %": drawdown * 100,
+            "Trades": trades,
+            "Hit rate %": np.where(trades > 0, wins / trades * 100, np.nan),
+            "Avg trade %": np.where(trades > 0, total / trades * 100, np.nan),
+        }
+
+
+@traced("backtest.evaluate")
+def evaluate(bars: pd.DataFrame, strategy: str, grid: Optional[dict] = None, cost: float = COST) -> pd.DataFrame:
+    """
+    *bars*: daily bars with columns (field, symbol), as ``nightly.fetch_bars``
+    returns them. One row per parameter set and symbol, with the parameters
+    as columns ahead of ``METRICS``.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {sorted(STRATEGIES)}")
+    combos = _combos(strategy, grid)
+    bars = bars[FIELDS].sort_index()
+    close = bars["Close"]
+    symbols = close.columns
+
+    valid = close.notna().to_numpy()
+    returns = np.nan_to_num(close.pct_change(fill_method=None).to_numpy())
+    first, last = valid.argmax(axis=0), len(valid) - 1 - valid[::-1].argmax(axis=0)
+    dates = pd.DatetimeIndex(bars.index)
+    years = (dates[last] - dates[first]).to_numpy() / np.timedelta64(1, "D") / 365.25
+    years = np.where(valid.any(axis=0) & (years > 0), years, np.nan)
+    prices = close.to_numpy()
+    cols = np.arange(len(symbols))
+    hold_return = prices[last, cols] / prices[first, cols]
+    rows = np.maximum(valid.sum(axis=0), 1)
+
+    frames = []
+    for params, signal in STRATEGIES[strategy](bars, combos):
+        held = np.zeros(signal.shape, dtype=bool)
+        held[1:] = signal[:-1] & valid[1:]
+        stats = _performance(held, returns, years, cost)
+        stats["Exposure %"] = held.sum(axis=0) / rows * 100
+        frames.append(pd.DataFrame({"Symbol": symbols, **params, **stats}))
+    if not frames:
+        return pd.DataFrame(columns=["Symbol", *GRIDS[strategy], *METRICS])
+    out = pd.concat(frames, ignore_index=True)
+    out["Buy & hold %"] = np.tile((hold_return - 1) * 100, len(frames))
+    with np.errstate(invalid="ignore"):
+        out["Buy & hold CAGR %"] = np.tile((hold_return ** (1 / years) - 1) * 100, len(frames))
+    return out
+
+
+def _evaluate_batch(args) -> pd.DataFrame:
+    return evaluate(*args)
+
+
+def sweep(
+    bars: pd.DataFrame,
+    strategy: str,
+    grid: Optional[dict] = None,
+    workers: Optional[int] = None,
+    batch: int = BATCH,
+    cost: float = COST,
+    progress: bool = False,
+) -> pd.DataFrame:
+    """
+    ``evaluate`` for every symbol in *bars*, *batch* symbols per task on
+    *workers* processes (default: every core). ``workers=1`` runs in this
+    process.
+    """
+    symbols = list(bars["Close"].columns)
+    tasks = [(bars.loc[:, pd.IndexSlice[FIELDS, symbols[i:i + batch]]], strategy, grid, cost)
+             for i in range(0, len(symbols), batch)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    bar = tqdm(total=len(symbols), desc=f"Backtesting {strategy}", unit="sym", disable=not progress)
+    frames = []
+    if workers <= 1:
+        for task in tasks:
+            frames.append(_evaluate_batch(task))
+            bar.update(task[0]["Close"].shape[1])
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            for task, frame in zip(tasks, pool.map(_evaluate_batch, tasks)):
+                frames.append(frame)
+                bar.update(task[0]["Close"].shape[1])
+    bar.close()
+    if not frames:
+        return evaluate(bars, strategy, grid, cost)
+    return pd.concat(frames, ignore_index=True)
+
+
+def summarize(results: pd.DataFrame) -> pd.DataFrame:
+    """One row per parameter set across symbols, best median CAGR first."""
+    params = [c for c in results.columns if c != "Symbol" and c not in METRICS]
+    valid = results.dropna(subset=["CAGR %"])
+    g = valid.assign(
+        _beats=valid["CAGR %"] > valid["Buy & hold CAGR %"],
+        _wins=valid["Hit rate %"] * valid["Trades"] / 100,
+    ).groupby(params, observed=True)
+    out = pd.DataFrame({
+        "Symbols": g.size(),
+        "Median CAGR %": g["CAGR %"].median(),
+        "Median drawdown %": g["Max drawdown %"].median(),
+        "Hit rate %": g["_wins"].sum() / g["Trades"].sum() * 100,
+        "Trades / symbol": g["Trades"].mean(),
+        "Exposure %": g["Exposure %"].mean(),
+        "Beats buy & hold %": g["_beats"].mean() * 100,
+    })
+    return out.sort_values("Median CAGR %", ascending=False).reset_index()
+
+
+__all__ = [
+    "COST", "BATCH", "GRIDS", "METRICS", "STRATEGIES", "grid_size", "evaluate", "sweep", "summarize",
+]
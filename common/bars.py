@@ -0,0 +1,99 @@
+"""
+common.bars
+~~~~~~~~~~~
+Cached OHLCV history – the one place pages and helpers fetch price bars.
+
+Functions
+---------
+get_history(symbol, period="1mo", interval="1d", auto_adjust=True) -> DataFrame
+    ``Ticker(symbol).history(...)`` behind ``common.cache`` with a
+    market-hours aware lifetime: intraday bars expire at the next bar
+    boundary, daily-and-longer bars once the next close has settled.
+    Expired bars are served for up to ``STALE_S`` while they revalidate;
+    an empty or failed fetch is never stored, so a refresh during an
+    outage keeps the old bars, and with nothing cached the result is an
+    empty (uncached) frame. *symbol* is passed through unchanged (add
+    ``.NS`` for NSE equities).
+prefetch_histories(symbols, period="1mo", interval="1d", auto_adjust=True, force=False) -> dict
+    Fetch every symbol not already fresh in the bar cache with a single
+    batched ``download`` and store each one, so later ``get_history``
+    calls with the same arguments are served from memory. *force*
+    re-downloads every symbol in that one batch.
+long_bars(bars) -> DataFrame
+    Wide daily bars, columns (field, symbol), to Date, Symbol, OHLC rows.
+wide_bars(long) -> DataFrame
+    The inverse of ``long_bars``.
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+
+from common.cache import Uncached, cached
+from common.market_calendar import intraday_ttl
+from common.provider import EmptyHistory, Ticker, UpstreamUnavailable, download
+from common.telemetry import traced
+
+STALE_S = 3 * 24 * 60 * 60
+
+
+@cached("bars.history", ttl=intraday_ttl("interval"), stale_ttl=STALE_S,
+        max_entries=1024, max_bytes=256 * 2**20)
+def get_history(
+    symbol: str,
+    period: str = "1mo",
+    interval: str = "1d",
+    auto_adjust: bool = True,
+) -> pd.DataFrame:
+    try:
+        return Ticker(symbol).history(period=period, interval=interval, auto_adjust=auto_adjust)
+    except (UpstreamUnavailable, EmptyHistory):
+        return Uncached(pd.DataFrame())
+
+
+@traced("bars.prefetch")
+def prefetch_histories(
+    symbols,
+    period: str = "1mo",
+    interval: str = "1d",
+    auto_adjust: bool = True,
+    force: bool = False,
+) -> dict:
+    symbols = list(dict.fromkeys(symbols))
+    missing = symbols if force else [
+        s for s in symbols
+        if (f := get_history.freshness(s, period, interval, auto_adjust)) is None or f.stale
+    ]
+    if missing:
+        try:
+            batch = download(
+                missing, period=period, interval=interval, auto_adjust=auto_adjust,
+                group_by="ticker", actions=True, ignore_tz=False, threads=True,
+            )
+        except Exception:           # incl. an open circuit: per-symbol fallback below
+            batch = pd.DataFrame()
+        tickers = batch.columns.get_level_values(0) if isinstance(batch.columns, pd.MultiIndex) else []
+        for s in missing:
+            if s in tickers:
+                bars = batch[s].dropna(how="all", subset=["Open", "High", "Low", "Close"])
+                bars.columns.name = None
+                if not bars.empty:
+                    get_history.prime(bars, s, period, interval, auto_adjust)
+    return {s: get_history(s, period, interval, auto_adjust) for s in symbols}
+
+
+def long_bars(bars: pd.DataFrame) -> pd.DataFrame:
+    """(field, symbol) columns → Date, Symbol, Open, High, Low, Close rows."""
+    out = bars.stack(level=1, future_stack=True).dropna(how="all")
+    out.index.names = ["Date", "Symbol"]
+    return out.reset_index()
+
+
+def wide_bars(long: pd.DataFrame) -> pd.DataFrame:
+    """Inverse of ``long_bars``: Date, Symbol, OHLC rows → (field, symbol) columns."""
+    wide = long.pivot(index="Date", columns="Symbol", values=["Open", "High", "Low", "Close"])
+    wide.index = pd.to_datetime(wide.index)
+    return wide.rename_axis(columns=[None, None]).sort_index()
+
+
+__all__ = ["get_history", "prefetch_histories", "long_bars", "wide_bars"]
@@ -0,0 +1,514 @@
+"""
+common.cache
+~~~~~~~~~~~~
+Process-wide memoisation with per-function statistics – used in place of
+``st.cache_data`` so hit rates and memory held are visible.
+
+    @cached("finance.core_metrics", ttl=eod_ttl(), max_entries=2500)
+    def _fetch_core_metrics(symbol: str) -> dict: ...
+
+Behaves like ``st.cache_data`` where the app relies on it:
+
+* parameters whose name starts with ``_`` are not part of the key;
+* exceptions are not cached;
+* callers get their own copy (pandas >= 3 objects are copy-on-write, so a
+  shallow copy is enough; dicts / lists are deep-copied).
+
+On top of that each cache is LRU-bounded by ``max_entries`` and/or
+``max_bytes`` and concurrent misses on the same key compute once.
+
+``ttl`` is either seconds or a callable ``ttl(arguments) -> seconds``
+evaluated when a value is stored (see common.market_calendar for the
+market-hours aware ones).
+
+Stale-while-revalidate: with ``stale_ttl`` set, an expired entry is still
+returned for up to that many seconds past its expiry while a background
+thread recomputes it. A failed refresh keeps the old value, so pages keep
+rendering (with ``.freshness()`` reporting its age) during upstream
+incidents. Return ``Uncached(value)`` to hand a value back without
+storing it (partial data, fallbacks).
+
+Per function it records hits, misses, evictions (LRU vs. TTL expiry),
+compute time, compute time saved by hits and approximate bytes held.
+
+Memory budget: besides each cache's own bounds, all caches together are
+held under ``STOCK_ANALYZER_CACHE_BUDGET`` (default 768MB). When a store
+pushes the total over it, the least recently used entries *across* caches
+are evicted first, so a burst on one page pushes out another page's cold
+data rather than growing the process. ``STOCK_ANALYZER_CACHE_LIMITS``
+overrides per-cache byte limits, e.g. ``bars.history=128MB,levels.get=32MB``.
+
+Functions
+---------
+cached(name=None, ttl=None, stale_ttl=None, max_entries=None, max_bytes=None, show_spinner=False)
+    The decorator; the wrapper gets ``.clear()``, ``.stats()``,
+    ``.freshness(*args) -> Freshness(as_of, stale) | None`` and
+    ``.prime(value, *args)`` to store a value fetched in bulk elsewhere.
+stats() -> DataFrame
+    One row per cached function.
+clear_all()
+    Empty every cache (statistics are kept).
+set_budget(nbytes) / budget() / total_bytes()
+    The cross-cache byte budget (``None`` = unbounded) and current holdings.
+parse_bytes("64MB") -> int
+"""
+
+from __future__ import annotations
+
+import copy
+import functools
+import inspect
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from common import telemetry
+
+REFRESH_WORKERS = 4
+ENV_BUDGET = "STOCK_ANALYZER_CACHE_BUDGET"
+ENV_LIMITS = "STOCK_ANALYZER_CACHE_LIMITS"
+DEFAULT_BUDGET = 768 * 2**20
+
+_registry: "OrderedDict[str, _Cache]" = OrderedDict()
+_registry_lock = threading.Lock()
+_refresh_pool: Optional[ThreadPoolExecutor] = None
+_budget_lock = threading.Lock()
+
+
+class Uncached:
+    """Wrap a return value to give it to the caller without caching it."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Freshness(NamedTuple):
+    as_of: float        # epoch seconds the value was computed
+    stale: bool         # past its TTL (being served while revalidating)
+
+    @property
+    def age_s(self) -> float:
+        return time.time() - self.as_of
+
+
+# ────────────────────────────────────────────────────────────────────
+# Configuration
+# ────────────────────────────────────────────────────────────────────
+
+_UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30}
+
+
+def parse_bytes(text: str) -> Optional[int]:
+    """``"512MB"`` / ``"1.5GB"`` / ``"4096"`` → bytes; ``"0"``, ``"none"`` or ``""`` → None (unbounded)."""
+    text = str(text).strip().upper()
+    if text in ("", "0", "NONE", "OFF"):
+        return None
+    m = re.fullmatch(r"([\d.]+)\s*([KMG]?)B?", text)
+    if not m:
+        raise ValueError(f"Cannot parse byte size {text!r}")
+    return int(float(m.group(1)) * _UNITS[m.group(2)])
+
+
+def _env_limits() -> dict:
+    """``STOCK_ANALYZER_CACHE_LIMITS``: ``name=size`` pairs, comma-separated."""
+    limits = {}
+    for item in filter(None, (p.strip() for p in os.environ.get(ENV_LIMITS, "").split(","))):
+        name, _, size = item.partition("=")
+        limits[name.strip()] = parse_bytes(size)
+    return limits
+
+
+_budget: Optional[int] = (
+    parse_bytes(os.environ[ENV_BUDGET]) if ENV_BUDGET in os.environ else DEFAULT_BUDGET
+)
+
+
+# ────────────────────────────────────────────────────────────────────
+# Keys & sizes
+# ────────────────────────────────────────────────────────────────────
+
+
+def _freeze(value):
+    """Hashable stand-in for an argument value."""
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return value
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return ("set",) + tuple(sorted(map(repr, value)))
+    if isinstance(value, dict):
+        return ("dict",) + tuple(sorted((repr(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        hashed = pd.util.hash_pandas_object(value, index=not isinstance(value, pd.Index))
+        cols = tuple(map(str, value.columns)) if isinstance(value, pd.DataFrame) else ()
+        return (type(value).__name__, cols, int(hashed.sum()), len(value))
+    if isinstance(value, np.ndarray):
+        return ("ndarray", value.dtype.str, value.shape, value.tobytes())
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ("pickle", pickle.dumps(value))
+
+
+def approx_bytes(value) -> int:
+    """Rough in-memory size of a cached value."""
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_bytes(k) + approx_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(approx_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _copy(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # safe only under copy-on-write (always on from pandas 3, hence the pin
+        # in requirements.txt): earlier versions share the cached buffers and
+        # an in-place edit by one caller would corrupt the entry for all
+        return value.copy(deep=False)
+    if isinstance(value, (dict, list, set, np.ndarray)):
+        return copy.deepcopy(value)
+    if isinstance(value, tuple):
+        items = [_copy(v) for v in value]
+        return type(value)(*items) if hasattr(value, "_fields") else tuple(items)
+    return value
+
+
+# ────────────────────────────────────────────────────────────────────
+# Cache
+# ────────────────────────────────────────────────────────────────────
+
+
+class _Entry:
+    __slots__ = ("value", "expires", "nbytes", "cost", "fetched_at", "used")
+
+    def __init__(self, value, expires, nbytes, cost):
+        self.value, self.expires, self.nbytes, self.cost = value, expires, nbytes, cost
+        self.fetched_at = time.time()
+        self.used = time.monotonic()        # last store / hit, for the cross-cache LRU
+
+
+class _Cache:
+    """LRU / TTL store for one function."""
+
+    def __init__(self, name: str, ttl, stale_ttl, max_entries, max_bytes):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self.inflight: dict = {}
+        self.lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.budget_evictions = 0
+        self.stale_hits = self.refreshes = self.refresh_errors = 0
+        self.compute_s = self.saved_s = 0.0
+
+    def lookup(self, key):
+        """``(entry, fresh)``; stale entries are returned only within ``stale_ttl``."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None, False
+        now = time.time()
+        fresh = entry.expires is None or now < entry.expires
+        if not fresh and (self.stale_ttl is None or now >= entry.expires + self.stale_ttl):
+            self._drop(key)
+            self.expirations += 1
+            return None, False
+        self.entries.move_to_end(key)
+        entry.used = time.monotonic()
+        return entry, fresh
+
+    def store(self, key, value, cost: float, arguments: dict) -> None:
+        ttl = self.ttl(arguments) if callable(self.ttl) else self.ttl
+        expires = None if ttl is None else time.time() + ttl
+        nbytes = approx_bytes(value)
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = _Entry(value, expires, nbytes, cost)
+        self.nbytes += nbytes
+        while self.entries and (
+            (self.max_entries is not None and len(self.entries) > self.max_entries)
+            or (self.max_bytes is not None and self.nbytes > self.max_bytes and len(self.entries) > 1)
+        ):
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _drop(self, key) -> None:
+        self.nbytes -= self.entries.pop(key).nbytes
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "function": self.name,
+                "entries": len(self.entries),
+                "bytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else float("nan"),
+                "stale_hits": self.stale_hits,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "evictions": self.evictions,
+                "budget_evictions": self.budget_evictions,
+                "expirations": self.expirations,
+                "compute_s": round(self.compute_s, 4),
+                "saved_s": round(self.saved_s, 4),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_s": "calendar" if callable(self.ttl) else self.ttl,
+            }
+
+
+def _spinner(text: str):
+    try:
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ModuleNotFoundError:
+        return None
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    return st.spinner(text)
+
+
+def _refresher() -> ThreadPoolExecutor:
+    global _refresh_pool
+    with _registry_lock:
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+        return _refresh_pool
+
+
+def cached(
+    name: Optional[str] = None,
+    ttl: Union[None, float, Callable[[dict], float]] = None,
+    stale_ttl: Optional[float] = None,
+    max_entries: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    show_spinner=False,
+) -> Callable:
+    """Memoise a function process-wide (see module docstring)."""
+
+    def wrap(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+        sig = inspect.signature(func)
+        limits = _env_limits()
+        cache = _Cache(label, ttl, stale_ttl, max_entries, limits.get(label, max_bytes))
+        with _registry_lock:
+            _registry[label] = cache
+
+        def bind(args, kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(
+                (k, _freeze(v)) for k, v in bound.arguments.items() if not k.startswith("_")
+            )
+            return key, bound.arguments
+
+        def compute(args, kwargs, spinner=None):
+            t0 = time.perf_counter()
+            if spinner is None:
+                value = func(*args, **kwargs)
+            else:
+                with spinner:
+                    value = func(*args, **kwargs)
+            return value, time.perf_counter() - t0
+
+        def settle(key, arguments, value, cost):
+            """Record a computed value; returns what the caller should get."""
+            with cache.lock:
+                cache.compute_s += cost
+                if isinstance(value, Uncached):
+                    return value.value
+                cache.store(key, value, cost, arguments)
+            _enforce_budget()
+            return value
+
+        def refresh(key, arguments, args, kwargs):
+            try:
+                value, cost = compute(args, kwargs)
+                settle(key, arguments, value, cost)
+                with cache.lock:
+                    cache.refreshes += 1
+            except Exception:       # keep serving the stale value
+                with cache.lock:
+                    cache.refresh_errors += 1
+            finally:
+                with cache.lock:
+                    cache.inflight.pop(key).set()
+
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            key, arguments = bind(args, kwargs)
+            while True:
+                with cache.lock:
+                    entry, fresh = cache.lookup(key)
+                    if entry is not None and fresh:
+                        cache.hits += 1
+                        cache.saved_s += entry.cost
+                        return _copy(entry.value)
+                    if entry is not None:
+                        # stale: answer now, revalidate in the background
+                        cache.stale_hits += 1
+                        if key not in cache.inflight:
+                            cache.inflight[key] = threading.Event()
+                            _refresher().submit(refresh, key, arguments, args, kwargs)
+                        return _copy(entry.value)
+                    waiter = cache.inflight.get(key)
+                    if waiter is None:
+                        cache.misses += 1
+                        cache.inflight[key] = threading.Event()
+                        break
+                waiter.wait()       # another thread is computing this key
+
+            try:
+                spinner = _spinner(show_spinner if isinstance(show_spinner, str)
+                                   else f"Running {func.__name__}(…).") if show_spinner else None
+                value, cost = compute(args, kwargs, spinner)
+                return _copy(settle(key, arguments, value, cost))
+            finally:
+                with cache.lock:
+                    cache.inflight.pop(key).set()
+
+        def freshness(*args, **kwargs) -> Optional[Freshness]:
+            """Age of the stored value for these arguments (None if absent)."""
+            key, _ = bind(args, kwargs)
+            with cache.lock:
+                entry = cache.entries.get(key)
+                if entry is None:
+                    return None
+                stale = entry.expires is not None and time.time() >= entry.expires
+                return Freshness(entry.fetched_at, stale)
+
+        def prime(value, *args, **kwargs) -> None:
+            """Store *value* as the result for these arguments (e.g. from a batch fetch)."""
+            key, arguments = bind(args, kwargs)
+            with cache.lock:
+                cache.store(key, value, 0.0, arguments)
+            _enforce_budget()
+
+        inner.clear = cache.clear
+        inner.stats = cache.stats
+        inner.freshness = freshness
+        inner.prime = prime
+        return inner
+
+    return wrap
+
+
+# ────────────────────────────────────────────────────────────────────
+# Registry
+# ────────────────────────────────────────────────────────────────────
+
+
+def stats() -> pd.DataFrame:
+    with _registry_lock:
+        caches = list(_registry.values())
+    return pd.DataFrame([c.stats() for c in caches])
+
+
+def clear_all() -> None:
+    with _registry_lock:
+        caches = list(_registry.values())
+    for c in caches:
+        c.clear()
+
+
+def total_bytes() -> int:
+    with _registry_lock:
+        caches = list(_registry.values())
+    return sum(c.nbytes for c in caches)
+
+
+def budget() -> Optional[int]:
+    return _budget
+
+
+def set_budget(nbytes: Optional[int]) -> None:
+    """Change the cross-cache budget (``None`` = unbounded) and evict down to it."""
+    global _budget
+    _budget = nbytes
+    _enforce_budget()
+
+
+def _enforce_budget() -> None:
+    """
+    Evict the least recently used entries across all caches until the total
+    fits the budget. Only one cache lock is held at a time; the oldest head
+    of each per-cache LRU is compared, which is the global LRU entry.
+    """
+    if _budget is None:
+        return
+    with _registry_lock:
+        caches = list(_registry.values())
+    with _budget_lock:
+        while sum(c.nbytes for c in caches) > _budget:
+            oldest, victim = None, None
+            for c in caches:
+                with c.lock:
+                    if c.entries:
+                        head = next(iter(c.entries.values()))
+                        if oldest is None or head.used < oldest:
+                            oldest, victim = head.used, c
+            if victim is None:
+                return
+            with victim.lock:
+                if victim.entries:
+                    victim._drop(next(iter(victim.entries)))
+                    victim.budget_evictions += 1
+
+
+def _prometheus_lines() -> list:
+    p = telemetry.METRIC_PREFIX
+    df = stats()
+    metrics = [
+        ("cache_hits_total", "counter", "hits", "Cache lookups served from memory."),
+        ("cache_misses_total", "counter", "misses", "Cache lookups that ran the function."),
+        ("cache_stale_hits_total", "counter", "stale_hits", "Expired entries served while revalidating."),
+        ("cache_refresh_errors_total", "counter", "refresh_errors", "Background refreshes that failed."),
+        ("cache_evictions_total", "counter", "evictions", "Entries dropped by the LRU bound."),
+        ("cache_budget_evictions_total", "counter", "budget_evictions",
+         "Entries dropped to keep all caches within the shared byte budget."),
+        ("cache_expirations_total", "counter", "expirations", "Entries dropped after their TTL."),
+        ("cache_saved_seconds_total", "counter", "saved_s", "Compute time avoided by hits."),
+        ("cache_entries", "gauge", "entries", "Entries currently held."),
+        ("cache_bytes", "gauge", "bytes", "Approximate bytes currently held."),
+    ]
+    out = []
+    for metric, kind, col, help_ in metrics:
+        out += [f"# HELP {p}_{metric} {help_}", f"# TYPE {p}_{metric} {kind}"]
+        out += [f'{p}_{metric}{{function="{row.function}"}} {getattr(row, col)}'
+                for row in df.itertuples()]
+    return out
+
+
+telemetry.register_collector(_prometheus_lines)
+
+
+__all__ = [
+    "cached", "Uncached", "Freshness", "stats", "clear_all", "approx_bytes",
+    "parse_bytes", "budget", "set_budget", "total_bytes",
+]
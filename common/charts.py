@@ -1,14 +1,19 @@
-import yfinance as yf
+from common.bars import get_history
+from common.cache import Uncached, cached
+from common.market_calendar import eod_ttl
+from common.provider import Ticker, UpstreamUnavailable
+from common.telemetry import traced
 import altair as alt
 import pandas as pd
 
 
+@traced("charts.price_chart")
 def _price_chart(symbol: str, period: str):
     """
     Generates an Altair line chart for historical closing prices of a stock.
     Automatically adjusts for splits.
     """
-    hist = yf.Ticker(f"{symbol}.NS").history(period=period, auto_adjust=True)
+    hist = get_history(f"{symbol}.NS", period=period, auto_adjust=True)
     if hist.empty:
         return None
     price_df = hist[["Close"]].copy()
@@ -30,15 +35,22 @@ def _price_chart(symbol: str, period: str):
     return chart
 
 
+@traced("charts.rev_pm_fcf")
+@cached("charts.rev_pm_fcf", ttl=eod_ttl(), stale_ttl=7 * 24 * 60 * 60, max_entries=512,
+        max_bytes=64 * 2**20)
 def _rev_pm_fcf_frames(symbol: str):
     """
     Fetches and prepares DataFrames for Revenue, Profit Margin, and Free Cash Flow
     for charting.
     """
-    tkr = yf.Ticker(f"{symbol}.NS")
-    fin = tkr.financials.T
-    if fin.empty:
-        return None, None, None
+    tkr = Ticker(f"{symbol}.NS")
+    try:
+        fin = tkr.financials.T
+        if fin.empty:
+            return None, None, None
+        cf = tkr.cashflow
+    except UpstreamUnavailable:
+        return Uncached((None, None, None))
 
     fin.index = pd.to_datetime(fin.index).year
     fin = fin.sort_index()
@@ -49,7 +61,6 @@ def _rev_pm_fcf_frames(symbol: str):
     if {"Net Income", "Total Revenue"}.issubset(fin.columns) and not fin["Total Revenue"].eq(0).any():
         pm_df = ((fin["Net Income"] / fin["Total Revenue"]) * 100).to_frame("Profit Margin (%)")
 
-    cf = tkr.cashflow
     fcf_df = None
     if not cf.empty and "Free Cash Flow" in cf.index:
         fcf = (cf.loc["Free Cash Flow"] / 1e7).dropna()
@@ -58,3 +69,23 @@ def _rev_pm_fcf_frames(symbol: str):
             fcf_df = fcf.to_frame("Free Cash Flow (\u20B9 Cr)")
 
     return rev_df, pm_df, fcf_df
+
+
+def _fundamentals_trend_chart(hist: pd.DataFrame, metric: str, title: str):
+    """
+    Step chart of one stored fundamental over the recorded refreshes – each
+    value holds until the next refresh that changed it.
+    """
+    series = hist[metric].dropna()
+    if series.empty:
+        return None
+    return (
+        alt.Chart(series.rename("Value").reset_index())
+        .mark_line(interpolate="step-after", point=True)
+        .encode(
+            x=alt.X("Date:T", title="Refresh date"),
+            y=alt.Y("Value:Q", title=title, scale=alt.Scale(zero=False)),
+            tooltip=[alt.Tooltip("Date:T"), alt.Tooltip("Value:Q", format=",.4g")],
+        )
+        .properties(height=220)
+    )
@@ -1,11 +1,19 @@
 # common/display.py – updated
 import streamlit as st
 import pandas as pd
-import yfinance as yf
+from common.bars import get_history
 import numpy as np
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from common.market_calendar import TZ
+
 from common.finance import (
+    DISPLAY_SCALE,
     _fetch_core_metrics,
     get_industry_averages,
     market_cap_label,
@@ -14,18 +22,141 @@ from common.finance import (
     get_stock_description,
     human_market_cap,
 )
-from common.charts import _price_chart, _rev_pm_fcf_frames
+from common.charts import _fundamentals_trend_chart, _price_chart, _rev_pm_fcf_frames
+from common.fundamentals_history import LABELS, fundamentals_as_of, fundamentals_history
 from common.peer_finder import top_peers
+from common import quotes
+from common.telemetry import traced
 
 # ────────────────────────────────────────────────────────────────
-# 1️⃣  Two‑stock comparison block
+# 0️⃣  Data age
 # ────────────────────────────────────────────────────────────────
 
-def _meta_header(sym: str, data: dict, industry: str):
+def _fmt_age(seconds: float) -> str:
+    if seconds < 90:
+        return "just now"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.0f} min ago"
+    if seconds < 36 * 3600:
+        return f"{seconds / 3600:.0f} h ago"
+    return f"{seconds / 86400:.0f} days ago"
+
+
+def data_age_caption(*freshness):
+    """Caption with the age of the oldest cached value shown (common.cache.Freshness)."""
+    known = [f for f in freshness if f is not None]
+    if not known:
+        return
+    oldest = min(f.as_of for f in known)
+    stamp = pd.Timestamp(oldest, unit="s", tz="UTC").tz_convert(TZ).strftime("%d %b %H:%M IST")
+    age = _fmt_age(time.time() - oldest)
+    if any(f.stale for f in known):
+        st.caption(f"⚠️ Live data unavailable – showing cached data from {stamp} ({age}).")
+    else:
+        st.caption(f"🕒 Data as of {stamp} ({age})")
+
+
+@st.fragment(run_every=quotes.POLL_S)
+def live_price_metric(ticker: str, label: str = "Current Price", fallback: Optional[float] = None):
+    """
+    Price metric that reruns on its own every ``quotes.POLL_S`` with the
+    shared quote service's last price for *ticker*; *fallback* (e.g. the
+    last close of bars already on the page) until the first quote lands.
+    Quotes from the simulated feed are captioned as such, not as live.
+    """
+    quotes.watch([ticker])
+    quote = quotes.last_quote(ticker)
+    if quote is None:
+        st.metric(label, f"₹{fallback:,.2f}" if fallback is not None else "N/A")
+        return
+    change = quote.change_pct
+    st.metric(label, f"₹{quote.price:,.2f}", f"{change:+.2f}%" if change is not None else None)
+    source = "🧪 Simulated" if quotes.get_service().feed.simulated else "🟢 Live"
+    st.caption(f"{source} · {_fmt_age(time.time() - quote.as_of)}")
+
+
+# ────────────────────────────────────────────────────────────────
+# 1️⃣  N‑stock comparison block
+# ────────────────────────────────────────────────────────────────
+
+COMPARE_MAX = 10
+COMPARE_WORKERS = COMPARE_MAX      # one worker per symbol: render ≈ slowest symbol
+COMPARE_METRICS = [
+    "PE Ratio", "EPS", "Profit Margin", "ROE",
+    "Debt to Equity", "Dividend Yield", "Free Cash Flow",
+]
+_LOWER_IS_BETTER = ("PE Ratio", "Debt to Equity")
+
+
+def _run_parallel(calls: list) -> list:
+    """
+    Run zero-argument *calls* on a thread pool and return their results in
+    order. Workers carry this rerun's script context, so spinners and
+    warnings raised inside still reach the page.
+    """
+    if not calls:
+        return []
+    ctx = get_script_run_ctx(suppress_warning=True)
+
+    def run(call):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return call()
+
+    with ThreadPoolExecutor(min(COMPARE_WORKERS, len(calls)), thread_name_prefix="compare") as pool:
+        return list(pool.map(run, calls))
+
+
+def _compare_bundle(sym: str) -> tuple:
+    """Everything the comparison needs for one symbol except the chart period."""
+    data = _fetch_core_metrics(sym)
+    hist = get_history(f"{sym}.NS", "max", auto_adjust=True)
+    ath = float(hist["Close"].max()) if not hist.empty else None
+    return data, ath, _rev_pm_fcf_frames(sym)
+
+
+def comparison_frame(data: dict, averages: dict) -> pd.DataFrame:
+    """
+    *data* / *averages*: ``{symbol: {metric: value}}``. Returns one row per
+    metric, one column per symbol, "value (Ind Avg: x)" cells with ✅ on the
+    single best value of each row.
+    """
+    # reindex: from_dict drops symbols whose metrics dict is empty
+    raw = pd.DataFrame.from_dict(data, orient="index").reindex(index=list(data), columns=COMPARE_METRICS)
+    avg = pd.DataFrame.from_dict(averages, orient="index").reindex(index=raw.index, columns=COMPARE_METRICS)
+    scale = pd.Series(DISPLAY_SCALE).reindex(COMPARE_METRICS).fillna(1)
+    val = raw.apply(pd.to_numeric, errors="coerce") * scale
+    ind = avg.apply(pd.to_numeric, errors="coerce") * scale
+    val = val.where(np.isfinite(val))
+
+    direction = np.where(np.isin(COMPARE_METRICS, _LOWER_IS_BETTER), -1, 1)
+    signed = val * direction
+    top = signed.eq(signed.max())
+    best = top & (top.sum() == 1) & (signed.count() > 1)
+
+    fmt = lambda df: df.map(lambda x: f"{x:.2f}", na_action="ignore").fillna("N/A")
+    tick = pd.DataFrame(np.where(best, " ✅", ""), index=val.index, columns=val.columns)
+    cells = fmt(val) + " (Ind Avg: " + fmt(ind) + ")" + tick
+    return cells.where(val.notna(), "N/A").T.rename_axis("Metric")
+
+
+def _rebased_closes(symbols: list, period: str) -> pd.DataFrame:
+    """Close of each symbol over *period*, rebased to 100 at its first bar."""
+    hists = _run_parallel([lambda s=s: get_history(f"{s}.NS", period=period, auto_adjust=True)
+                           for s in symbols])
+    closes = {
+        s: h["Close"].set_axis(pd.to_datetime(h.index).tz_localize(None).normalize())
+        for s, h in zip(symbols, hists) if not h.empty
+    }
+    if not closes:
+        return pd.DataFrame()
+    wide = pd.DataFrame(closes).sort_index().ffill()
+    return wide.div(wide.bfill().iloc[0]).mul(100)
+
+
+def _meta_header(sym: str, data: dict, industry: str, ath: Optional[float]):
     """Render basic meta info for a single stock."""
     price = data.get("_price")
-    hist  = yf.Ticker(f"{sym}.NS").history("max", auto_adjust=True)
-    ath   = hist["Close"].max() if not hist.empty else None
     pct   = ((price - ath) / ath * 100) if price and ath else None
 
     st.subheader(data.get('_company') or sym)
@@ -41,92 +172,120 @@ def _meta_header(sym: str, data: dict, industry: str):
         st.write(get_stock_description(sym))
 
 
-def compare_stocks(sym1: str, sym2: str, master_df: pd.DataFrame):
-    """Side‑by‑side comparison view."""
+@st.fragment
+@traced("display.compare_chart")
+def _compare_chart(symbols: list):
+    """Rebased price lines; the period selectbox reruns only this fragment."""
+    period = st.selectbox("Chart period", ["3mo","6mo","1y","3y","5y","max"], 2,
+                          key=f"cmp_{'_'.join(symbols)}")
+    rebased = _rebased_closes(symbols, period)
+    if rebased.empty:
+        st.info("No price data")
+    else:
+        st.subheader("Price (rebased to 100)")
+        st.line_chart(rebased)
+
+
+@traced("display.compare_stocks")
+def compare_stocks(symbols: list, master_df: pd.DataFrame):
+    """
+    Side‑by‑side comparison of up to ``COMPARE_MAX`` symbols. Per-symbol
+    data and the industry averages load concurrently, so a cold render
+    takes about as long as the slowest symbol.
+    """
+    symbols = list(dict.fromkeys(symbols))[:COMPARE_MAX]
     st.markdown("---")
-    st.markdown(f"## Comparison: {sym1} vs {sym2}")
+    st.markdown(f"## Comparison: {' vs '.join(symbols)}")
 
-    d1, d2 = _fetch_core_metrics(sym1), _fetch_core_metrics(sym2)
-    ind1   = master_df.loc[master_df["Symbol"] == sym1, "Industry"].iat[0]
-    ind2   = master_df.loc[master_df["Symbol"] == sym2, "Industry"].iat[0]
+    industry = master_df.drop_duplicates("Symbol").set_index("Symbol")["Industry"].reindex(symbols)
+    industries = list(industry.dropna().unique())
+    try:
+        loaded = _run_parallel(
+            [lambda s=s: _compare_bundle(s) for s in symbols]
+            + [lambda i=i: get_industry_averages(i, master_df) for i in industries]
+        )
+    except RuntimeError:
+        st.warning("⚠️ Market data is temporarily unavailable – please try again shortly.")
+        return
+    bundles = dict(zip(symbols, loaded[:len(symbols)]))
+    ind_avg = dict(zip(industries, loaded[len(symbols):]))
+    data_age_caption(*(_fetch_core_metrics.freshness(s) for s in symbols))
 
-    c1, c2 = st.columns(2)
-    with c1: _meta_header(sym1, d1, ind1)
-    with c2: _meta_header(sym2, d2, ind2)
+    per_row = min(len(symbols), 5)
+    for i in range(0, len(symbols), per_row):
+        for col, sym in zip(st.columns(per_row), symbols[i:i + per_row]):
+            data, ath, _ = bundles[sym]
+            with col:
+                _meta_header(sym, data, industry.get(sym), ath)
 
-    avg1 = get_industry_averages(ind1, master_df)
-    avg2 = get_industry_averages(ind2, master_df)
-    metrics = [
-        "PE Ratio","EPS","Profit Margin","ROE",
-        "Debt to Equity","Dividend Yield","Free Cash Flow"
-    ]
-    rows = []
-    for m in metrics:
-        v1, v2 = d1.get(m), d2.get(m)
-        cell1 = val_with_ind_avg(m, v1, avg1.get(m))
-        cell2 = val_with_ind_avg(m, v2, avg2.get(m))
-        t1 = t2 = ""
-        if v1 is not None and v2 is not None and np.isfinite(v1) and np.isfinite(v2):
-            n1 = v1 * 100 if m in ("Profit Margin","ROE") else v1
-            n2 = v2 * 100 if m in ("Profit Margin","ROE") else v2
-            if m == "Debt to Equity":
-                n1 /= 100; n2 /= 100
-            if m == "Free Cash Flow":
-                n1 /= 1e7; n2 /= 1e7
-            lower_is_better = m in ("Debt to Equity","PE Ratio")
-            if lower_is_better:
-                t1, t2 = (" ✅", "") if n1 < n2 else ("", " ✅") if n2 < n1 else ("", "")
-            else:
-                t1, t2 = (" ✅", "") if n1 > n2 else ("", " ✅") if n2 > n1 else ("", "")
-        rows.append((m, f"{cell1}{t1}", f"{cell2}{t2}"))
-    st.table(pd.DataFrame(rows, columns=["Metric", sym1, sym2]))
-
-    period = st.selectbox("Chart period", ["3mo","6mo","1y","3y","5y","max"], 2, key=f"cmp_{sym1}_{sym2}")
-    cc1, cc2 = st.columns(2)
-    for col, sym in ((cc1, sym1), (cc2, sym2)):
-        ch = _price_chart(sym, period)
-        col.altair_chart(ch, use_container_width=True) if ch is not None else col.info("No data")
-
-    rev1, pm1, fcf1 = _rev_pm_fcf_frames(sym1)
-    rev2, pm2, fcf2 = _rev_pm_fcf_frames(sym2)
-    if rev1 is not None and rev2 is not None:
-        st.subheader("Revenue (₹ Cr)"); c1,c2=st.columns(2); c1.bar_chart(rev1); c2.bar_chart(rev2)
-    if pm1 is not None and pm2 is not None:
-        st.subheader("Profit Margin (%)"); c1,c2=st.columns(2); c1.line_chart(pm1); c2.line_chart(pm2)
-    if fcf1 is not None and fcf2 is not None:
-        st.subheader(" Free Cash Flow (₹ Cr)"); c1,c2=st.columns(2); c1.bar_chart(fcf1); c2.bar_chart(fcf2)
+    table = comparison_frame(
+        {s: bundles[s][0] for s in symbols},
+        {s: ind_avg.get(industry.get(s), {}) for s in symbols},
+    )
+    st.table(table)
+
+    _compare_chart(symbols)
+
+    charts = (
+        ("Revenue (₹ Cr)", 0, lambda df: st.bar_chart(df, stack=False)),
+        ("Profit Margin (%)", 1, st.line_chart),
+        (" Free Cash Flow (₹ Cr)", 2, lambda df: st.bar_chart(df, stack=False)),
+    )
+    for title, pos, draw in charts:
+        series = {s: bundles[s][2][pos].iloc[:, 0] for s in symbols if bundles[s][2][pos] is not None}
+        if len(series) > 1:
+            st.subheader(title)
+            wide = pd.DataFrame(series)
+            wide.index = wide.index.astype(str)      # fiscal years as categories
+            draw(wide)
 
 # ────────────────────────────────────────────────────────────────
 # 2️⃣  Single‑stock dashboard
 # ────────────────────────────────────────────────────────────────
 
+@st.fragment
+@traced("display.price_chart")
+def _price_chart_section(symbol: str):
+    """Price chart with its period picker – a period change reruns only this fragment."""
+    period = st.selectbox("Price chart period", ["1mo","3mo","6mo","1y","3y","5y","max"], 3, key=f"period_{symbol}")
+    ch = _price_chart(symbol, period)
+    if ch is not None:
+        st.altair_chart(ch, use_container_width=True)
+
+
+@traced("display.metrics")
 def display_metrics(symbol: str, master_df: pd.DataFrame, name_df: pd.DataFrame):
     """Render fundamentals for a single stock. If user has not navigated
     from Sector Analysis, show internal peer‑dropdown; otherwise suppress it."""
 
     coming_from_sector = st.session_state.get("from_sector_nav", False)
 
-    # ── Peer dropdown (hidden when navigated from Sector Analysis) ──
-    peer_sym = None
+    # ── Peer picker (hidden when navigated from Sector Analysis) ──
+    peer_syms = []
     if not coming_from_sector:
         peer_df = top_peers(symbol, master_df, k=10)
         if not peer_df.empty:
             peer_labels = [f"{row['Company Name']} ({row['Symbol']})" for _, row in peer_df.iterrows()]
-            chosen = st.selectbox("Compare with peer", ["--"] + peer_labels, key=f"peer_{symbol}")
-            peer_sym = chosen.split("(")[-1].rstrip(")") if chosen != "--" else None
+            chosen = st.multiselect("Compare with peers", peer_labels,
+                                    max_selections=COMPARE_MAX - 1, key=f"peers_{symbol}")
+            peer_syms = [c.split("(")[-1].rstrip(")") for c in chosen]
 
-    if peer_sym:
-        compare_stocks(symbol, peer_sym, master_df)
+    if peer_syms:
+        compare_stocks([symbol] + peer_syms, master_df)
         return  # skip single‑stock details
 
     # ── Single‑stock fundamentals ──
-    data = _fetch_core_metrics(symbol)
+    try:
+        data = _fetch_core_metrics(symbol)
+    except RuntimeError:            # rate-limited / circuit open with nothing cached
+        st.warning("⚠️ Market data is temporarily unavailable – please try again shortly.")
+        return
     industry = master_df.loc[master_df["Symbol"] == symbol, "Industry"].iat[0]
     ind_avg  = get_industry_averages(industry, master_df)
 
     st.markdown(f"## {data.get('_company') or symbol}")
     price = data.get("_price")
-    hist  = yf.Ticker(f"{symbol}.NS").history("max", auto_adjust=True)
+    hist  = get_history(f"{symbol}.NS", "max", auto_adjust=True)
     ath   = hist["Close"].max() if not hist.empty else None
     pct   = ((price - ath) / ath * 100) if price and ath else None
 
@@ -138,6 +297,10 @@ def display_metrics(symbol: str, master_df: pd.DataFrame, name_df: pd.DataFrame)
         f"ATH: {ath:.2f} ({pct:.2f}% from current)" if ath is not None and pct is not None else "ATH: N/A",
     ]
     st.caption(" | ".join(meta))
+    data_age_caption(
+        _fetch_core_metrics.freshness(symbol),
+        get_history.freshness(f"{symbol}.NS", "max", auto_adjust=True),
+    )
     with st.expander(" Description"):
         st.write(get_stock_description(symbol))
     st.markdown("---")
@@ -149,10 +312,7 @@ def display_metrics(symbol: str, master_df: pd.DataFrame, name_df: pd.DataFrame)
     ]
     st.table(pd.DataFrame(rows, columns=["Metric","Value (w/ Avg)","✓"]))
 
-    period = st.selectbox("Price chart period", ["1mo","3mo","6mo","1y","3y","5y","max"], 3, key=f"period_{symbol}")
-    ch = _price_chart(symbol, period)
-    if ch is not None:
-        st.altair_chart(ch, use_container_width=True)
+    _price_chart_section(symbol)
 
     rev, pm, fcf = _rev_pm_fcf_frames(symbol)
     if fcf is not None and not fcf.empty:
@@ -164,3 +324,56 @@ def display_metrics(symbol: str, master_df: pd.DataFrame, name_df: pd.DataFrame)
 
     # Clear the flag so subsequent manual interactions show the peer dropdown again
     st.session_state.from_sector_nav = False
+
+# ────────────────────────────────────────────────────────────────
+# 3️⃣  Stored fundamentals over time (no upstream calls)
+# ────────────────────────────────────────────────────────────────
+
+_PCT_METRICS = {"ROE", "ProfitMargin"}
+
+
+def _fmt_fundamental(metric: str, value) -> str:
+    if value is None or pd.isna(value):
+        return "–"
+    if metric == "MarketCap":
+        return human_market_cap(value)
+    if metric in _PCT_METRICS:
+        return f"{value * 100:.2f}%"
+    return f"{value:,.2f}"
+
+
+@st.fragment
+@traced("display.fundamentals_history")
+def display_fundamentals_history(symbol: str):
+    """Values as of a chosen refresh vs. the latest, and a step chart per metric."""
+    hist = fundamentals_history(symbol)
+    if hist.empty:
+        st.caption("No fundamentals history yet – each `python bootstrap_db.py` run records a snapshot.")
+        return
+
+    dates = [d.date() for d in hist.index]
+    as_of = st.select_slider(
+        "As of refresh", options=dates, value=dates[0], key=f"fh_as_of_{symbol}",
+        disabled=len(dates) < 2,
+    )
+    then = fundamentals_as_of(as_of, [symbol]).iloc[0]
+    now = hist.iloc[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (now / then - 1) * 100
+    st.table(pd.DataFrame({
+        "Metric": [LABELS[m] for m in hist.columns],
+        f"As of {as_of}": [_fmt_fundamental(m, then[m]) for m in hist.columns],
+        f"Latest ({dates[-1]})": [_fmt_fundamental(m, now[m]) for m in hist.columns],
+        "Change": [f"{c:+.1f}%" if np.isfinite(c) else "–" for c in change],
+    }))
+
+    if len(dates) < 2:
+        st.caption(f"One refresh recorded ({dates[0]}) – trends appear after the next one.")
+        return
+    cols = st.columns(3)
+    for i, metric in enumerate(hist.columns):
+        chart = _fundamentals_trend_chart(hist, metric, LABELS[metric])
+        if chart is not None:
+            with cols[i % 3]:
+                st.caption(LABELS[metric])
+                st.altair_chart(chart, use_container_width=True)
@@ -0,0 +1,216 @@
+"""
+common.export
+~~~~~~~~~~~~~
+Bulk export of the local dataset as Parquet or Arrow IPC datasets.
+
+Downstream notebooks read these instead of scraping the app or calling
+Yahoo. An export directory holds one dataset per table plus a
+``manifest.json`` (format, row counts, schemas, dataset snapshot):
+
+    DimCompany/ FactFundamentals/ IndustryStats/    one file each
+    FundamentalsHistory/ FundamentalsSnapshots/     if bootstrap recorded any
+    RiskStats/ PivotLevels/ PriceStats/             if the nightly job ran
+    Bars/Year=2025/…  Indicators/Year=2025/…        hive-partitioned by year
+
+Arrow IPC files are written uncompressed, so ``load`` memory-maps them and
+the returned table's buffers point straight into the page cache – no copy,
+no deserialisation. Parquet is smaller on disk but is decoded on read.
+
+Functions
+---------
+industry_stats(universe) -> DataFrame
+    Count, median and mean of each fundamental metric per industry.
+indicator_panel(bars) -> DataFrame
+    Date, Symbol, Close, Return, SMA / EMA / RSI columns in long form.
+export_tables(root, fmt="parquet") -> dict
+    nse.db tables and industry stats.
+export_bars(bars, root, fmt="parquet") -> dict
+    Daily bars (columns (field, symbol)) and their indicator panel.
+long_bars(bars) / wide_bars(long) -> DataFrame
+    Re-exported from ``common.bars``.
+open_dataset(root, name) -> pyarrow.dataset.Dataset
+load(root, name, columns=None, filter=None) -> pyarrow.Table
+"""
+
+from __future__ import annotations
+
+import json
+import shutil
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from common.bars import long_bars, wide_bars
+from common.sql import ENGINE, compute_snapshot_id, list_tables
+from common.telemetry import traced
+from common.universe import METRIC_COLS, load_universe_frame
+
+FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+SOURCE_TABLES = (
+    "DimCompany", "FactFundamentals", "FundamentalsHistory", "FundamentalsSnapshots",
+    "RiskStats", "PivotLevels", "PriceStats",
+)
+PARTITION = "Year"
+MANIFEST = "manifest.json"
+SMA_LENGTHS = (20, 50, 200)
+EMA_LENGTHS = (20, 50)
+RSI_PERIOD = 14
+
+
+# ────────────────────────────────────────────────────────────────────
+# Derived frames
+# ────────────────────────────────────────────────────────────────────
+
+
+def industry_stats(universe: pd.DataFrame) -> pd.DataFrame:
+    """One row per industry: sector, member count and median / mean of each metric."""
+    g = universe.groupby("Industry", observed=True)
+    stats = g[METRIC_COLS].agg(["median", "mean"])
+    stats.columns = [f"{metric} {how}" for metric, how in stats.columns]
+    out = pd.concat([
+        g["Big Sectors"].agg(lambda s: s.mode().iat[0] if s.notna().any() else None).rename("Big Sectors"),
+        g.size().rename("Companies"),
+        stats.astype(float),
+    ], axis=1)
+    return out.reset_index()
+
+
+@traced("export.indicators")
+def indicator_panel(bars: pd.DataFrame) -> pd.DataFrame:
+    """
+    *bars*: daily bars with (field, symbol) columns. Every indicator is a
+    column-wise rolling / ewm over the wide Close frame – one pass for the
+    whole universe. RSI matches ``indicators.compute_rsi``.
+    """
+    close = bars["Close"]
+    panel = {"Close": close, "Return": close.pct_change(fill_method=None)}
+    for n in SMA_LENGTHS:
+        panel[f"SMA_{n}"] = close.rolling(n).mean()
+    for n in EMA_LENGTHS:
+        panel[f"EMA_{n}"] = close.ewm(span=n, adjust=False).mean()
+    delta = close.diff()
+    gain = delta.clip(lower=0).rolling(RSI_PERIOD).mean()
+    loss = (-delta.clip(upper=0)).rolling(RSI_PERIOD).mean()
+    panel[f"RSI_{RSI_PERIOD}"] = 100 - 100 / (1 + gain / loss)
+
+    out = pd.concat(panel, axis=1).stack(level=1, future_stack=True)
+    out.index.names = ["Date", "Symbol"]
+    return out.dropna(subset=["Close"]).reset_index()
+
+
+# ────────────────────────────────────────────────────────────────────
+# Writing
+# ────────────────────────────────────────────────────────────────────
+
+
+def _file_format(fmt: str):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {tuple(FORMATS)}")
+    if fmt == "arrow":
+        # uncompressed, so readers can memory-map the buffers
+        return ds.IpcFileFormat(), ds.IpcFileFormat().make_write_options(compression=None)
+    return ds.ParquetFileFormat(), ds.ParquetFileFormat().make_write_options(compression="zstd")
+
+
+def write_dataset(df: pd.DataFrame, root, name: str, fmt: str = "parquet",
+                  partition: Optional[str] = None) -> dict:
+    """Replace dataset *name* under *root*; returns its manifest entry."""
+    file_format, options = _file_format(fmt)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    target = Path(root) / name
+    shutil.rmtree(target, ignore_errors=True)
+    # single-threaded: the threaded writer can abort the interpreter at exit
+    ds.write_dataset(
+        table, target, format=file_format, file_options=options,
+        partitioning=[partition] if partition else None, partitioning_flavor="hive" if partition else None,
+        basename_template=f"part-{{i}}.{'arrow' if fmt == 'arrow' else 'parquet'}",
+        existing_data_behavior="overwrite_or_ignore", use_threads=False,
+    )
+    return {"rows": table.num_rows, "partition": partition, "schema": table.schema.to_string()}
+
+
+def _read_manifest(root, fmt: str) -> dict:
+    """The existing manifest (or ``{}``); a different format is rejected before anything is replaced."""
+    _file_format(fmt)
+    path = Path(root) / MANIFEST
+    manifest = json.loads(path.read_text()) if path.exists() else {}
+    if manifest.get("format", fmt) != fmt:
+        raise ValueError(f"{root} already holds a {manifest['format']} export")
+    return manifest
+
+
+def _update_manifest(root, fmt: str, entries: dict, **meta) -> dict:
+    manifest = _read_manifest(root, fmt)
+    manifest.update(format=fmt, created_at=pd.Timestamp.now(tz="UTC").isoformat(), **meta)
+    manifest.setdefault("datasets", {}).update(entries)
+    (Path(root) / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+@traced("export.tables")
+def export_tables(root, fmt: str = "parquet") -> dict:
+    """nse.db tables (those that exist) plus ``IndustryStats``."""
+    _read_manifest(root, fmt)
+    Path(root).mkdir(parents=True, exist_ok=True)
+    present = set(list_tables())
+    entries = {}
+    for name in SOURCE_TABLES:
+        if name in present:
+            entries[name] = write_dataset(pd.read_sql(f'SELECT * FROM "{name}"', ENGINE), root, name, fmt)
+    universe = load_universe_frame()
+    entries["IndustryStats"] = write_dataset(industry_stats(universe), root, "IndustryStats", fmt)
+    _update_manifest(root, fmt, entries, snapshot_id=compute_snapshot_id())
+    return entries
+
+
+@traced("export.bars")
+def export_bars(bars: pd.DataFrame, root, fmt: str = "parquet") -> dict:
+    """``Bars`` and ``Indicators``, partitioned by year."""
+    _read_manifest(root, fmt)
+    Path(root).mkdir(parents=True, exist_ok=True)
+    year = lambda df: df.assign(**{PARTITION: df["Date"].dt.year.astype(np.int16)})
+    entries = {
+        "Bars": write_dataset(year(long_bars(bars)), root, "Bars", fmt, PARTITION),
+        "Indicators": write_dataset(year(indicator_panel(bars)), root, "Indicators", fmt, PARTITION),
+    }
+    _update_manifest(root, fmt, entries)
+    return entries
+
+
+# ────────────────────────────────────────────────────────────────────
+# Reading
+# ────────────────────────────────────────────────────────────────────
+
+
+def open_dataset(root, name: str) -> ds.Dataset:
+    """Dataset *name* of the export at *root*, on a memory-mapping filesystem."""
+    manifest = json.loads((Path(root) / MANIFEST).read_text())
+    if name not in manifest["datasets"]:
+        raise KeyError(f"{name!r} not in export; have {sorted(manifest['datasets'])}")
+    partition = manifest["datasets"][name]["partition"]
+    return ds.dataset(
+        str(Path(root).resolve() / name),
+        format=FORMATS[manifest["format"]],
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+        partitioning="hive" if partition else None,
+    )
+
+
+def load(root, name: str, columns=None, filter=None) -> pa.Table:
+    """
+    Arrow table for *name*. For Arrow exports the buffers are memory-mapped
+    (zero-copy); *filter* (e.g. ``pc.field("Year") >= 2024``) prunes
+    partitions before anything is read.
+    """
+    return open_dataset(root, name).to_table(columns=columns, filter=filter)
+
+
+__all__ = [
+    "FORMATS", "industry_stats", "indicator_panel", "long_bars", "wide_bars", "write_dataset",
+    "export_tables", "export_bars", "open_dataset", "load",
+]
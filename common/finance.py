@@ -10,7 +10,9 @@ _fetch_core_metrics(symbol: str) -> dict
 get_industry_averages(industry, master_df, max_peers=None) -> dict
     Mean of each metric across peers in the same industry.
 get_stock_description(symbol) -> str
-    Long business summary from Yahoo Finance.
+    Long business summary (nse.db first, Yahoo Finance as fallback).
+get_recommendations(symbol) -> DataFrame
+    Analyst buy / hold / sell counts by month (cached until the next close).
 market_cap_label(mcap) -> str
     Mega / Large / Mid / Small / Micro or N/A.
 human_market_cap(mcap) -> str
@@ -28,20 +30,33 @@ from typing import Optional
 import numpy as np
 import pandas as pd
 import streamlit as st
-import yfinance as yf
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from common.cache import Uncached, cached
+from common.market_calendar import eod_ttl
+from common.provider import Ticker, UpstreamUnavailable
+
+from common.sql import dataset_version
+from common.telemetry import traced
+from common.universe import get_universe
+
+# Fundamentals change at most once a day; during an upstream outage a week
+# old value beats an empty table.
+STALE_S = 7 * 24 * 60 * 60
 
 # ────────────────────────────────────────────────────────────────────
 # 1.  Core single-stock metrics
 # ────────────────────────────────────────────────────────────────────
 
 
-@st.cache_data(ttl=60 * 60 * 6, show_spinner=False)
+@traced("finance.core_metrics")
+@cached("finance.core_metrics", ttl=eod_ttl(), stale_ttl=STALE_S, max_entries=2500,
+        max_bytes=32 * 2**20)
 def _fetch_core_metrics(symbol: str) -> dict:
     """
     Fetch trailing PE, EPS, margin, etc. for *symbol* (no '.NS' suffix).
     """
     try:
-        tkr = yf.Ticker(f"{symbol}.NS")
+        tkr = Ticker(f"{symbol}.NS")
         info = tkr.info or {}
         raw_fcf = info.get("freeCashflow")
 
@@ -50,12 +65,22 @@ def _fetch_core_metrics(symbol: str) -> dict:
             if not cf.empty and "Free Cash Flow" in cf.index:
                 raw_fcf = cf.loc["Free Cash Flow"].iloc[0]
 
+    except UpstreamUnavailable:
+        raise                       # never cache an empty result for an outage
     except Exception as exc:
         # Handle rate-limit separately so caller may decide what to do.
         if "rate" in str(exc).lower():
             raise RuntimeError("Yahoo Finance rate-limit hit") from exc
-        info, raw_fcf = {}, None
+        # all-None metrics for this rerun, but not stored: a background
+        # refresh keeps serving the last good fundamentals instead
+        return Uncached(_core_metrics({}, None))
+
+    metrics = _core_metrics(info, raw_fcf)
+    # yfinance may hide an upstream error behind an empty info dict
+    return metrics if info else Uncached(metrics)
+
 
+def _core_metrics(info: dict, raw_fcf) -> dict:
     return {
         "PE Ratio": info.get("trailingPE"),
         "EPS": info.get("trailingEps"),
@@ -77,7 +102,7 @@ def _fetch_core_metrics(symbol: str) -> dict:
 # ────────────────────────────────────────────────────────────────────
 
 
-@st.cache_data(ttl=60 * 60 * 6, show_spinner=True)
+@traced("finance.industry_averages")
 def get_industry_averages(
     industry: str,
     master_df: pd.DataFrame,
@@ -85,7 +110,27 @@ def get_industry_averages(
 ) -> dict:
     """
     Compute mean value of each metric across all tickers in *industry*.
+
+    Cached on (industry, max_peers, dataset snapshot ID) – *master_df* itself
+    is never hashed.
     """
+    averages, partial = _industry_averages(industry, max_peers, dataset_version(), master_df)
+    # warned here, in the caller's rerun: a stale hit recomputes in a thread with no script context
+    if partial and get_script_run_ctx(suppress_warning=True) is not None:
+        st.warning("⚠️ Yahoo Finance unavailable or rate-limited – partial peer data.")
+    return averages
+
+
+@cached("finance.industry_averages", ttl=eod_ttl(), stale_ttl=STALE_S, max_entries=512,
+        show_spinner=True)
+def _industry_averages(
+    industry: str,
+    max_peers: Optional[int],
+    snapshot: str,
+    _master_df: pd.DataFrame,
+) -> tuple:
+    """``(averages, partial)``; *partial* when the upstream failed part-way through."""
+    master_df = _master_df
     peer_syms = (
         master_df.loc[master_df["Industry"] == industry, "Symbol"]
         .head(max_peers)  # head(None) is safe
@@ -102,11 +147,12 @@ def get_industry_averages(
         "Free Cash Flow",
     ]}
 
+    partial = False
     for sym in peer_syms:
         try:
             data = _fetch_core_metrics(sym)  # cached – usually instant
         except RuntimeError:
-            st.warning("⚠️ Yahoo Finance rate-limit reached – partial peer data.")
+            partial = True
             break
         for m, v in data.items():
             if m.startswith("_"):
@@ -114,25 +160,41 @@ def get_industry_averages(
             if v is not None and isinstance(v, (int, float)) and np.isfinite(v):
                 buckets[m].append(float(v))
 
-    return {
+    averages = {
         m: (None if not vals else round(float(np.median(vals)), 2))
         for m, vals in buckets.items()
     }
+    # partial medians are shown once but not cached until the next close
+    return Uncached((averages, True)) if partial else (averages, False)
 
 # ────────────────────────────────────────────────────────────────────
 # 3.  Utility helpers used by UI code
 # ────────────────────────────────────────────────────────────────────
 
 
+@traced("finance.stock_description")
 def get_stock_description(symbol: str) -> str:
+    stored = get_universe().description(symbol)
+    if stored:
+        return stored
     try:
-        return yf.Ticker(f"{symbol}.NS").info.get(
+        return Ticker(f"{symbol}.NS").info.get(
             "longBusinessSummary", "No description available."
         )
     except Exception:
         return "Description could not be fetched at this time."
 
 
+@cached("finance.recommendations", ttl=eod_ttl(), stale_ttl=STALE_S, max_entries=2500,
+        max_bytes=32 * 2**20)
+def get_recommendations(symbol: str) -> pd.DataFrame:
+    """Analyst recommendation counts for *symbol* (no '.NS' suffix)."""
+    try:
+        return Ticker(f"{symbol}.NS").recommendations
+    except UpstreamUnavailable:
+        return Uncached(pd.DataFrame())
+
+
 def market_cap_label(mc: Optional[float]) -> str:
     if mc is None:
         return "N/A"
@@ -159,20 +221,18 @@ def human_market_cap(mc: Optional[float]) -> str:
     return f"{mc:.0f}"
 
 
+# Display units: margins and ROE as %, Debt to Equity as a ratio, FCF in ₹ Cr.
+# The single source for every table that shows raw Yahoo values.
+DISPLAY_SCALE = {"Profit Margin": 100, "ROE": 100, "Debt to Equity": 0.01, "Free Cash Flow": 1e-7}
+
+
 def val_with_ind_avg(metric: str, raw_val: Optional[float], ind_avg: Optional[float]) -> str:
     if raw_val is None:
         return "N/A"
 
-    # Unit conversions for display only
-    if metric == "Debt to Equity":
-        raw_val /= 100
-        ind_avg = ind_avg / 100 if ind_avg is not None else None
-    elif metric == "Free Cash Flow":
-        raw_val /= 1e7
-        ind_avg = ind_avg / 1e7 if ind_avg is not None else None
-    elif metric in ("Profit Margin", "ROE"):
-        raw_val *= 100
-        ind_avg = ind_avg * 100 if ind_avg is not None else None
+    scale = DISPLAY_SCALE.get(metric, 1)
+    raw_val *= scale
+    ind_avg = ind_avg * scale if ind_avg is not None else None
 
     base = f"{raw_val:.2f}"
     avg = f"{ind_avg:.2f}" if ind_avg is not None else "N/A"
@@ -194,15 +254,9 @@ def interpret(metric: str, value: Optional[float], ind_avg: Optional[float]) ->
         return ""
 
     # Align units for fair comparison
-    if metric == "Free Cash Flow":
-        value /= 1e7
-        ind_avg /= 1e7
-    elif metric in ("Profit Margin", "ROE"):
-        value *= 100
-        ind_avg *= 100
-    elif metric == "Debt to Equity":
-        value /= 100
-        ind_avg /= 100
+    scale = DISPLAY_SCALE.get(metric, 1)
+    value *= scale
+    ind_avg *= scale
 
     if ind_avg == 0:
         return ""
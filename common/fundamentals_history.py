@@ -0,0 +1,240 @@
+"""
+common.fundamentals_history
+~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Point-in-time fundamentals, kept in the ``FundamentalsHistory`` table of
+nse.db.
+
+``bootstrap_db.py`` replaces ``FactFundamentals`` on every refresh; before
+it does, the fresh values are folded into the history. The history is
+run-length encoded: a row ``(Symbol, Metric, Date, Value)`` holds from
+*Date* until the next row of the same series, so a refresh only adds the
+values that changed. EPS, ROE, margins and leverage move once a quarter;
+price-driven metrics (PE, market cap) are only re-recorded once they have
+drifted more than ``TOLERANCE`` from the stored value, which bounds their
+error while keeping daily refreshes from rewriting them every time.
+
+``FundamentalsSnapshots`` lists each refresh date with its symbol and
+changed-row counts, so a query can tell "unchanged" from "not recorded".
+A refresh on a date that already has a snapshot replaces it.
+
+Functions
+---------
+record_fundamentals(fact, engine=ENGINE, date=None) -> dict
+    Fold a ``FactFundamentals`` frame into the history as of *date* (IST today).
+seed_from_current(engine=ENGINE) -> dict | None
+    Record the stored ``FactFundamentals`` once, when the history is empty.
+snapshot_dates() -> list[str]
+fundamentals_as_of(date, symbols=None) -> DataFrame
+    Symbol × metric values in effect on *date*.
+fundamentals_history(symbol) -> DataFrame
+    One row per snapshot date, one column per metric (step series).
+history_stats() -> dict
+    Stored rows vs. the rows a full copy per snapshot would take.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+from common.cache import cached
+from common.market_calendar import TZ
+from common.sql import ENGINE, db_stamp
+from common.telemetry import traced
+
+TABLE = "FundamentalsHistory"
+SNAPSHOTS = "FundamentalsSnapshots"
+METRICS = ("PERatio", "EPS", "ROE", "ProfitMargin", "DebtToEquity", "MarketCap")
+LABELS = {
+    "PERatio": "PE Ratio", "EPS": "EPS", "ROE": "ROE", "ProfitMargin": "Profit Margin",
+    "DebtToEquity": "Debt to Equity", "MarketCap": "Market Cap",
+}
+# relative change below which a value is not re-recorded (0 → any change)
+TOLERANCE = {"PERatio": 0.005, "MarketCap": 0.005}
+
+_DDL = (
+    f"""CREATE TABLE IF NOT EXISTS "{TABLE}" (
+        Symbol TEXT NOT NULL, Metric TEXT NOT NULL, Date TEXT NOT NULL, Value REAL,
+        PRIMARY KEY (Symbol, Metric, Date)
+    ) WITHOUT ROWID""",
+    f"""CREATE TABLE IF NOT EXISTS "{SNAPSHOTS}" (
+        Date TEXT PRIMARY KEY, Symbols INTEGER, Changed INTEGER, RecordedAt TEXT
+    )""",
+)
+
+# Latest value per series on or before :date. SQLite takes the bare Value
+# column from the row that supplies MAX(Date).
+_AS_OF_SQL = f"""
+    SELECT Symbol, Metric, Value, MAX(Date) AS Date
+    FROM "{TABLE}" WHERE Date <= :date
+    GROUP BY Symbol, Metric
+"""
+
+
+def _today() -> str:
+    return pd.Timestamp.now(tz=TZ).date().isoformat()
+
+
+def _ensure_tables(conn) -> None:
+    for ddl in _DDL:
+        conn.execute(sa.text(ddl))
+
+
+def _has_history(engine) -> bool:
+    return TABLE in sa.inspect(engine).get_table_names()
+
+
+def _changed(new: pd.Series, old: pd.Series, metric: pd.Series) -> pd.Series:
+    """Which *new* values differ from the stored *old* ones (NaN = missing / no series)."""
+    tol = metric.map(TOLERANCE).fillna(0.0).to_numpy()
+    a, b = new.to_numpy(dtype=float), old.to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        moved = np.abs(a - b) > tol * np.abs(b)
+    both = ~np.isnan(a) & ~np.isnan(b)
+    return pd.Series(np.where(both, moved, np.isnan(a) != np.isnan(b)), index=new.index)
+
+
+# ────────────────────────────────────────────────────────────────────
+# Writing
+# ────────────────────────────────────────────────────────────────────
+
+
+@traced("fundamentals_history.record")
+def record_fundamentals(fact: pd.DataFrame, engine=ENGINE, date: Optional[str] = None) -> dict:
+    """
+    *fact*: ``FactFundamentals`` rows (Symbol plus the ``METRICS`` columns).
+    Symbols with no value at all (a failed fetch) are skipped, so they keep
+    their last recorded values instead of being blanked.
+    """
+    date = pd.Timestamp(date).date().isoformat() if date else _today()
+    present = [m for m in METRICS if m in fact]
+    values = fact.drop_duplicates("Symbol").set_index("Symbol")[present].apply(pd.to_numeric, errors="coerce")
+    values = values[values.notna().any(axis=1)]
+    new = values.rename_axis(columns="Metric").stack(future_stack=True).rename("Value").reset_index()
+
+    with engine.begin() as conn:
+        _ensure_tables(conn)
+        conn.execute(sa.text(f'DELETE FROM "{TABLE}" WHERE Date = :date'), {"date": date})
+        conn.execute(sa.text(f'DELETE FROM "{SNAPSHOTS}" WHERE Date = :date'), {"date": date})
+        prev = pd.read_sql(sa.text(_AS_OF_SQL), conn, params={"date": date})
+
+        merged = new.merge(prev[["Symbol", "Metric", "Value"]], on=["Symbol", "Metric"],
+                           how="left", suffixes=("", "_prev"))
+        rows = merged.loc[_changed(merged["Value"], merged["Value_prev"], merged["Metric"]),
+                          ["Symbol", "Metric", "Value"]].assign(Date=date)
+        rows["Value"] = rows["Value"].astype(object).where(rows["Value"].notna(), None)
+        if not rows.empty:
+            conn.execute(
+                sa.text(f'INSERT INTO "{TABLE}" (Symbol, Metric, Date, Value) '
+                        f'VALUES (:Symbol, :Metric, :Date, :Value)'),
+                rows.to_dict(orient="records"),
+            )
+        conn.execute(
+            sa.text(f'INSERT INTO "{SNAPSHOTS}" VALUES (:date, :symbols, :changed, :at)'),
+            {"date": date, "symbols": len(values), "changed": len(rows),
+             "at": pd.Timestamp.now(tz="UTC").isoformat()},
+        )
+    return {"date": date, "symbols": len(values), "changed": len(rows), "values": len(new)}
+
+
+def seed_from_current(engine=ENGINE) -> Optional[dict]:
+    """
+    First refresh after upgrading: record the ``FactFundamentals`` about to
+    be replaced, dated by its ``DatasetMeta.created_at``. No-op once any
+    history exists.
+    """
+    tables = set(sa.inspect(engine).get_table_names())
+    if "FactFundamentals" not in tables:
+        return None
+    if TABLE in tables:
+        with engine.connect() as conn:
+            if conn.execute(sa.text(f'SELECT 1 FROM "{TABLE}" LIMIT 1')).first():
+                return None
+    date = None
+    if "DatasetMeta" in tables:
+        with engine.connect() as conn:
+            row = conn.execute(sa.text("SELECT Value FROM DatasetMeta WHERE Key = 'created_at'")).first()
+        if row:
+            date = pd.Timestamp(row[0]).tz_convert(TZ).date().isoformat()
+    return record_fundamentals(pd.read_sql('SELECT * FROM "FactFundamentals"', engine), engine, date)
+
+
+# ────────────────────────────────────────────────────────────────────
+# Reading (cached until nse.db changes)
+# ────────────────────────────────────────────────────────────────────
+
+
+@cached("fundamentals_history.dates", max_entries=2)
+def _snapshot_dates(stamp: int) -> list:
+    if not _has_history(ENGINE):
+        return []
+    with ENGINE.connect() as conn:
+        return [r[0] for r in conn.execute(sa.text(f'SELECT Date FROM "{SNAPSHOTS}" ORDER BY Date'))]
+
+
+def snapshot_dates() -> list:
+    """ISO dates of the recorded refreshes, oldest first."""
+    return _snapshot_dates(db_stamp())
+
+
+@cached("fundamentals_history.as_of", max_entries=16)
+def _as_of(date: str, stamp: int) -> pd.DataFrame:
+    if not _has_history(ENGINE):
+        return pd.DataFrame(columns=list(METRICS)).rename_axis("Symbol")
+    long = pd.read_sql(sa.text(_AS_OF_SQL), ENGINE, params={"date": date})
+    wide = long.pivot(index="Symbol", columns="Metric", values="Value")
+    return wide.reindex(columns=list(METRICS)).rename_axis(columns=None)
+
+
+@traced("fundamentals_history.as_of")
+def fundamentals_as_of(date, symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Values in effect on *date* (the latest refresh on or before it), indexed by Symbol."""
+    wide = _as_of(pd.Timestamp(date).date().isoformat(), db_stamp())
+    return wide if symbols is None else wide.reindex(list(symbols))
+
+
+@cached("fundamentals_history.symbol", max_entries=256)
+def _symbol_history(symbol: str, stamp: int) -> pd.DataFrame:
+    empty = pd.DataFrame(columns=list(METRICS), index=pd.DatetimeIndex([], name="Date"), dtype=float)
+    if not _has_history(ENGINE):
+        return empty
+    long = pd.read_sql(
+        sa.text(f'SELECT Metric, Date, Value FROM "{TABLE}" WHERE Symbol = :symbol'),
+        ENGINE, params={"symbol": symbol},
+    )
+    if long.empty:
+        return empty
+    # expand each series' change points onto every refresh date since the first one;
+    # reindex(method="ffill") carries a recorded NULL forward as well as a value
+    dates = sorted(set(d for d in _snapshot_dates(stamp) if d >= long["Date"].min()) | set(long["Date"]))
+    wide = pd.DataFrame({
+        m: g.set_index("Date")["Value"].sort_index().reindex(dates, method="ffill")
+        for m, g in long.groupby("Metric")
+    }, index=dates).reindex(columns=list(METRICS))
+    wide.index = pd.DatetimeIndex(pd.to_datetime(wide.index), name="Date")
+    return wide.astype(float)
+
+
+def fundamentals_history(symbol: str) -> pd.DataFrame:
+    """Every refresh date since *symbol* was first recorded × ``METRICS`` (forward-filled)."""
+    return _symbol_history(symbol, db_stamp())
+
+
+def history_stats() -> dict:
+    """Rows stored vs. the rows one full copy per refresh would need."""
+    if not _has_history(ENGINE):
+        return {"snapshots": 0, "rows": 0, "dense_rows": 0, "ratio": None}
+    with ENGINE.connect() as conn:
+        rows = conn.execute(sa.text(f'SELECT COUNT(*) FROM "{TABLE}"')).scalar()
+        snaps, dense = conn.execute(sa.text(f'SELECT COUNT(*), SUM(Symbols) FROM "{SNAPSHOTS}"')).first()
+    dense = (dense or 0) * len(METRICS)
+    return {"snapshots": snaps, "rows": rows, "dense_rows": dense, "ratio": rows / dense if dense else None}
+
+
+__all__ = [
+    "METRICS", "LABELS", "TOLERANCE", "record_fundamentals", "seed_from_current", "snapshot_dates",
+    "fundamentals_as_of", "fundamentals_history", "history_stats",
+]
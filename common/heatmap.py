@@ -0,0 +1,125 @@
+"""
+common.heatmap
+~~~~~~~~~~~~~~
+Market heatmap: per-symbol and per-sector returns over 1D / 1W / 1M / YTD.
+
+Daily closes for the scope (the largest companies by stored market cap)
+come from the bar cache in batched downloads, and every window is computed
+in one vectorized pass over the wide close frame. Sector figures are a
+single groupby over ``DimCompany``'s ``Big Sectors``, weighted by market
+cap like the tiles. The result is cached until the next daily bar has
+settled (``eod_ttl``), so one rerun computes it and every other session
+reads the same frame.
+
+Functions
+---------
+window_returns(closes) -> DataFrame
+    Symbol × window returns (%) from a Date × Symbol close frame.
+sector_returns(frame, window) -> DataFrame
+    Cap-weighted return, median, breadth and total market cap per sector.
+heatmap_frame(top=200) -> DataFrame
+    One row per symbol: names, sector, industry, MarketCap and every window.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from common.bars import STALE_S, prefetch_histories
+from common.cache import Uncached, cached
+from common.market_calendar import eod_ttl
+from common.sql import dataset_version
+from common.telemetry import traced
+from common.universe import get_universe
+
+WINDOWS = {"1D": 1, "1W": 5, "1M": 21, "YTD": None}     # sessions back (None = since last year's close)
+PERIOD = "1y"                   # covers every window, YTD included
+BATCH = 100
+SCOPES = {"Top 100": 100, "Top 200": 200, "Top 500": 500, "All": None}
+
+
+def window_returns(closes: pd.DataFrame) -> pd.DataFrame:
+    """*closes*: Date × Symbol. Returns per symbol against the close n sessions back."""
+    closes = closes.sort_index().ffill()
+    last = closes.iloc[-1]
+    out = {}
+    for name, n in WINDOWS.items():
+        if n is None:
+            year_start = pd.Timestamp(closes.index[-1].year, 1, 1)
+            before = closes[closes.index < year_start]
+            ref = before.iloc[-1] if not before.empty else closes.bfill().iloc[0]
+        else:
+            ref = closes.iloc[-1 - n] if len(closes) > n else pd.Series(np.nan, index=closes.columns)
+        out[name] = (last / ref - 1) * 100
+    frame = pd.DataFrame(out)
+    frame.index.name = "Symbol"
+    return frame
+
+
+def sector_returns(frame: pd.DataFrame, window: str) -> pd.DataFrame:
+    """Per ``Big Sectors``: cap-weighted and median return, advancers / decliners, total cap."""
+    r = frame[window]
+    w = frame["MarketCap"].where(r.notna())
+    g = frame.assign(_rw=r * w, _w=w, _up=r > 0, _down=r < 0).groupby("Big Sectors", observed=True)
+    out = pd.DataFrame({
+        "Return %": g["_rw"].sum() / g["_w"].sum(),
+        "Median %": g[window].median(),
+        "Advancers": g["_up"].sum(),
+        "Decliners": g["_down"].sum(),
+        "Companies": g.size(),
+        "MarketCap": g["MarketCap"].sum(),
+    })
+    return out.sort_values("MarketCap", ascending=False).reset_index()
+
+
+def _scope(universe: pd.DataFrame, top: Optional[int]) -> pd.DataFrame:
+    members = universe.dropna(subset=["Symbol", "MarketCap"]).drop_duplicates("Symbol")
+    members = members[members["MarketCap"] > 0].sort_values("MarketCap", ascending=False)
+    return members if top is None else members.head(top)
+
+
+def _closes(symbols: list) -> pd.DataFrame:
+    """Date × Symbol daily closes through the bar cache, one download per batch of misses."""
+    series = {}
+    for i in range(0, len(symbols), BATCH):
+        tickers = [f"{s}.NS" for s in symbols[i:i + BATCH]]
+        for ticker, bars in prefetch_histories(tickers, period=PERIOD, interval="1d").items():
+            if not bars.empty:
+                close = bars["Close"]
+                close.index = pd.to_datetime(close.index).tz_localize(None).normalize()
+                series[ticker.removesuffix(".NS")] = close[~close.index.duplicated(keep="last")]
+    return pd.DataFrame(series)
+
+
+@cached("heatmap.frame", ttl=eod_ttl(), stale_ttl=STALE_S, max_entries=len(SCOPES) * 2)
+def _heatmap_frame(top: Optional[int], snapshot: str) -> pd.DataFrame:
+    members = _scope(get_universe().frame, top)
+    closes = _closes(members["Symbol"].tolist())
+    if closes.empty:                # upstream down with nothing cached
+        return Uncached(pd.DataFrame())
+    returns = window_returns(closes)
+    cols = ["Symbol", "Company Name", "Big Sectors", "Industry", "MarketCap"]
+    frame = members[cols].merge(returns.reset_index(), on="Symbol", how="inner")
+    for col in ("Big Sectors", "Industry"):
+        frame[col] = frame[col].astype(object).fillna("Other")
+    frame["MarketCap"] = frame["MarketCap"].astype(float)
+    frame.attrs["as_of"] = closes.index[-1].date().isoformat()
+    return frame
+
+
+@traced("heatmap.frame")
+def heatmap_frame(top: Optional[int] = 200) -> pd.DataFrame:
+    """Returns for the *top* companies by market cap (``None`` = the whole universe)."""
+    return _heatmap_frame(top, dataset_version())
+
+
+def freshness(top: Optional[int] = 200):
+    return _heatmap_frame.freshness(top, dataset_version())
+
+
+__all__ = [
+    "WINDOWS", "SCOPES", "window_returns", "sector_returns", "heatmap_frame", "freshness",
+]
@@ -0,0 +1,246 @@
+"""
+common.levels
+~~~~~~~~~~~~~
+Support / resistance levels and volume profile – one engine for every page.
+
+Swing highs and lows are found at several scales at once (a bar is a
+pivot of order *k* when it is the extreme of the ``2k + 1`` bars centred on
+it). Pivots within a price tolerance of each other are merged into one
+level; a level's strength is the number of (pivot, scale) hits behind it,
+so a swing that holds at every scale outweighs short-term noise.
+
+The volume profile spreads each bar's volume evenly over its High–Low
+range and sums it per price bin – a broadcast bars × bins overlap matrix,
+no Python loop. Index tickers without volume fall back to time-at-price.
+
+Functions
+---------
+find_pivots(df, orders=ORDERS) -> DataFrame
+    Date, price, kind ("high" / "low") and scales for every swing point.
+cluster_levels(pivots, tolerance) -> DataFrame
+    price, touches, strength, kind, last_seen – strongest first.
+volume_profile(df, bins=PROFILE_BINS) -> DataFrame
+    low, high, mid and volume per price bin.
+compute_levels(df) -> Levels
+    Both of the above plus the point of control and value area.
+get_levels(symbol, period="6mo", interval="1d") -> Levels
+    ``compute_levels`` on ``common.resample.get_bars``, cached until the
+    next bar completes.
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from common.bars import STALE_S
+from common.cache import Uncached, cached
+from common.market_calendar import intraday_ttl
+from common.resample import bar_freshness, get_bars
+from common.telemetry import traced
+
+ORDERS = (3, 5, 10, 20)
+PROFILE_BINS = 24
+VALUE_AREA = 0.70
+# cluster tolerance = this share of the median bar range, clipped to bounds
+TOLERANCE_FACTOR = 0.6
+MIN_TOLERANCE = 0.002
+MAX_TOLERANCE = 0.03
+
+
+class Levels(NamedTuple):
+    levels: pd.DataFrame        # price, touches, strength, kind, last_seen
+    profile: pd.DataFrame       # low, high, mid, volume
+    poc: Optional[float]        # mid price of the heaviest bin
+    value_area: Optional[Tuple[float, float]]
+    last_price: Optional[float]
+
+    @classmethod
+    def empty(cls) -> "Levels":
+        return cls(
+            pd.DataFrame(columns=["price", "touches", "strength", "kind", "last_seen"]),
+            pd.DataFrame(columns=["low", "high", "mid", "volume"]),
+            None, None, None,
+        )
+
+    def nearest(self, price: Optional[float] = None) -> Tuple[Optional[float], Optional[float]]:
+        """Closest level below and above *price* (default: the last close)."""
+        price = self.last_price if price is None else price
+        if price is None or self.levels.empty:
+            return None, None
+        prices = self.levels["price"]
+        below, above = prices[prices < price], prices[prices > price]
+        return (
+            float(below.max()) if not below.empty else None,
+            float(above.min()) if not above.empty else None,
+        )
+
+    def poc_range(self) -> Optional[Tuple[float, float]]:
+        """Price bin with the most volume."""
+        if self.profile.empty:
+            return None
+        row = self.profile.loc[self.profile["volume"].idxmax()]
+        return float(row["low"]), float(row["high"])
+
+
+# ────────────────────────────────────────────────────────────────────
+# Swing points
+# ────────────────────────────────────────────────────────────────────
+
+
+def _date_column(df: pd.DataFrame) -> pd.Series:
+    for col in ("Datetime", "Date"):
+        if col in df.columns:
+            return df[col]
+    return pd.Series(df.index, index=df.index)
+
+
+def find_pivots(df: pd.DataFrame, orders=ORDERS) -> pd.DataFrame:
+    """Swing highs (on High) and lows (on Low), with the number of scales each holds at."""
+    high, low = df["High"], df["Low"]
+    hi_scales = pd.Series(0, index=df.index)
+    lo_scales = pd.Series(0, index=df.index)
+    for k in orders:
+        window = 2 * k + 1
+        if len(df) < window:
+            break
+        hi_scales += (high == high.rolling(window, center=True).max()).astype(int)
+        lo_scales += (low == low.rolling(window, center=True).min()).astype(int)
+
+    dates = _date_column(df)
+    highs = pd.DataFrame({"Date": dates, "price": high, "kind": "high", "scales": hi_scales})
+    lows = pd.DataFrame({"Date": dates, "price": low, "kind": "low", "scales": lo_scales})
+    pivots = pd.concat([highs[hi_scales > 0], lows[lo_scales > 0]], ignore_index=True)
+    return pivots.sort_values("Date", ignore_index=True)
+
+
+def default_tolerance(df: pd.DataFrame) -> float:
+    """Relative cluster width from the median bar range."""
+    rng = ((df["High"] - df["Low"]) / df["Close"]).median()
+    if not np.isfinite(rng):
+        return MIN_TOLERANCE
+    return float(np.clip(rng * TOLERANCE_FACTOR, MIN_TOLERANCE, MAX_TOLERANCE))
+
+
+def cluster_levels(pivots: pd.DataFrame, tolerance: float) -> pd.DataFrame:
+    """Merge pivots whose prices lie within *tolerance* (relative) of their neighbour."""
+    if pivots.empty:
+        return Levels.empty().levels
+    p = pivots.sort_values("price", ignore_index=True)
+    gap = p["price"].pct_change().fillna(0)
+    p["cluster"] = (gap > tolerance).cumsum()
+    p["weighted"] = p["price"] * p["scales"]
+    p["is_high"] = p["kind"].eq("high").astype(int)
+
+    g = p.groupby("cluster")
+    out = pd.DataFrame({
+        "price": g["weighted"].sum() / g["scales"].sum(),
+        "touches": g.size(),
+        "strength": g["scales"].sum(),
+        "highs": g["is_high"].sum(),
+        "last_seen": g["Date"].max(),
+    })
+    lows = out["touches"] - out["highs"]
+    out["kind"] = np.select(
+        [out["highs"] > lows, out["highs"] < lows], ["resistance", "support"], "both"
+    )
+    return (
+        out.drop(columns="highs")
+        .sort_values(["strength", "last_seen"], ascending=False, ignore_index=True)
+        .round({"price": 2})
+    )
+
+
+# ────────────────────────────────────────────────────────────────────
+# Volume profile
+# ────────────────────────────────────────────────────────────────────
+
+
+def volume_profile(df: pd.DataFrame, bins: int = PROFILE_BINS) -> pd.DataFrame:
+    """Volume per price bin, each bar's volume spread uniformly over its range."""
+    low = df["Low"].to_numpy(dtype=float)
+    high = df["High"].to_numpy(dtype=float)
+    vol = df["Volume"].to_numpy(dtype=float) if "Volume" in df.columns else np.zeros(len(df))
+    ok = np.isfinite(low) & np.isfinite(high)
+    low, high, vol = low[ok], high[ok], np.nan_to_num(vol[ok])
+    if not len(low):
+        return Levels.empty().profile
+    if vol.sum() <= 0:
+        vol = np.ones_like(low)              # indices: time at price
+
+    edges = np.linspace(low.min(), high.max(), bins + 1)
+    lo_e, hi_e = edges[:-1], edges[1:]
+    span = (high - low)[:, None]
+    overlap = np.clip(
+        np.minimum(high[:, None], hi_e) - np.maximum(low[:, None], lo_e), 0, None
+    )
+    # doji bars (High == Low) land wholly in the bin that contains them
+    point = np.zeros_like(overlap)
+    idx = np.clip(np.searchsorted(edges, low, side="right") - 1, 0, bins - 1)
+    point[np.arange(len(low)), idx] = 1.0
+    share = np.where(span > 0, overlap / np.where(span > 0, span, 1), point)
+
+    return pd.DataFrame({
+        "low": lo_e,
+        "high": hi_e,
+        "mid": (lo_e + hi_e) / 2,
+        "volume": vol @ share,
+    })
+
+
+def value_area(profile: pd.DataFrame, share: float = VALUE_AREA) -> Optional[Tuple[float, float]]:
+    """Price range of the heaviest bins holding *share* of total volume."""
+    if profile.empty or profile["volume"].sum() <= 0:
+        return None
+    ranked = profile.sort_values("volume", ascending=False)
+    cum = ranked["volume"].cumsum() / ranked["volume"].sum()
+    inside = ranked[cum.shift(fill_value=0) < share]
+    return float(inside["low"].min()), float(inside["high"].max())
+
+
+# ────────────────────────────────────────────────────────────────────
+# Public entry points
+# ────────────────────────────────────────────────────────────────────
+
+
+@traced("levels.compute")
+def compute_levels(
+    df: pd.DataFrame,
+    orders=ORDERS,
+    bins: int = PROFILE_BINS,
+    tolerance: Optional[float] = None,
+) -> Levels:
+    if df is None or df.empty:
+        return Levels.empty()
+    df = df.reset_index() if not isinstance(df.index, pd.RangeIndex) else df
+    tolerance = default_tolerance(df) if tolerance is None else tolerance
+    profile = volume_profile(df, bins)
+    poc = float(profile.loc[profile["volume"].idxmax(), "mid"]) if not profile.empty else None
+    return Levels(
+        levels=cluster_levels(find_pivots(df, orders), tolerance),
+        profile=profile,
+        poc=poc,
+        value_area=value_area(profile),
+        last_price=float(df["Close"].iloc[-1]),
+    )
+
+
+@cached("levels.get", ttl=intraday_ttl("interval"), stale_ttl=STALE_S, max_entries=1024,
+        max_bytes=64 * 2**20)
+def get_levels(symbol: str, period: str = "6mo", interval: str = "1d") -> Levels:
+    """Levels for *symbol* (pass ``.NS`` for NSE equities), recomputed once per bar."""
+    bars = get_bars(symbol, interval=interval, period=period)
+    levels = compute_levels(bars)
+    fresh = bar_freshness(symbol, interval, period)
+    # levels from stale or missing bars are recomputed as soon as bars return
+    if bars.empty or fresh is None or fresh.stale:
+        return Uncached(levels)
+    return levels
+
+
+__all__ = [
+    "Levels", "find_pivots", "default_tolerance", "cluster_levels",
+    "volume_profile", "value_area", "compute_levels", "get_levels",
+]
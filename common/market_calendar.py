@@ -0,0 +1,231 @@
+"""
+common.market_calendar
+~~~~~~~~~~~~~~~~~~~~~~
+NSE trading calendar and the cache lifetimes derived from it.
+
+Regular equity session: 09:15 – 15:30 IST, Monday to Friday, except the
+exchange holidays below. Extra dates (e.g. next year's circular before it
+is added here) can be listed one ISO date per line in
+``data/nse_holidays.csv`` (header ``Date``).
+
+Functions
+---------
+is_trading_day(day) -> bool
+session_bounds(day) -> (open, close)          tz-aware IST timestamps
+is_market_open(now=None) -> bool
+next_open(now=None) / next_close(now=None) -> Timestamp
+next_bar_boundary(interval, now=None) -> Timestamp
+    When the bar that is forming now (or the next session's first bar)
+    will be complete.
+eod_ttl() / intraday_ttl(param="interval")
+    TTL callables for ``common.cache.cached``: end-of-day data lives until
+    the next close (plus a settle margin), intraday data until the next
+    bar boundary. Outside market hours both reach into the next session,
+    so nothing is refetched overnight or over weekends.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import date, time as dtime
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Union
+
+import pandas as pd
+
+TZ = "Asia/Kolkata"
+SESSION_OPEN = dtime(9, 15)
+SESSION_CLOSE = dtime(15, 30)
+HOLIDAYS_CSV = "data/nse_holidays.csv"
+
+# Yahoo keeps adjusting the last daily bar for a few minutes after the bell
+EOD_SETTLE = pd.Timedelta(minutes=20)
+MIN_TTL_S = 30
+
+# NSE equity-segment trading holidays (weekday closures only).
+NSE_HOLIDAYS = frozenset(pd.to_datetime([
+    # 2024
+    "2024-01-22", "2024-01-26", "2024-03-08", "2024-03-25", "2024-03-29",
+    "2024-04-11", "2024-04-17", "2024-05-01", "2024-05-20", "2024-06-17",
+    "2024-07-17", "2024-08-15", "2024-10-02", "2024-11-01", "2024-11-15",
+    "2024-11-20", "2024-12-25",
+    # 2025
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14",
+    "2025-04-18", "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02",
+    "2025-10-21", "2025-10-22", "2025-11-05", "2025-12-25",
+    # 2026
+    "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31", "2026-04-03",
+    "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26", "2026-09-14",
+    "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24", "2026-12-25",
+]).date)
+
+DayLike = Union[date, pd.Timestamp, str]
+
+
+@lru_cache(maxsize=1)
+def holidays() -> frozenset:
+    extra = set()
+    path = Path(HOLIDAYS_CSV)
+    if path.exists():
+        extra = set(pd.to_datetime(pd.read_csv(path)["Date"]).dt.date)
+    return NSE_HOLIDAYS | extra
+
+
+def now_ist() -> pd.Timestamp:
+    return pd.Timestamp.now(tz=TZ)
+
+
+def _as_ist(ts: Optional[pd.Timestamp]) -> pd.Timestamp:
+    if ts is None:
+        return now_ist()
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize(TZ) if ts.tzinfo is None else ts.tz_convert(TZ)
+
+
+def _as_date(day: DayLike) -> date:
+    return pd.Timestamp(day).date()
+
+
+# ────────────────────────────────────────────────────────────────────
+# Sessions
+# ────────────────────────────────────────────────────────────────────
+
+
+def is_trading_day(day: DayLike) -> bool:
+    d = _as_date(day)
+    return d.weekday() < 5 and d not in holidays()
+
+
+def session_bounds(day: DayLike) -> tuple:
+    d = _as_date(day)
+    open_ = pd.Timestamp.combine(d, SESSION_OPEN).tz_localize(TZ)
+    close = pd.Timestamp.combine(d, SESSION_CLOSE).tz_localize(TZ)
+    return open_, close
+
+
+def next_trading_day(day: DayLike, include: bool = False) -> date:
+    d = pd.Timestamp(_as_date(day))
+    if not include:
+        d += pd.Timedelta(days=1)
+    while not is_trading_day(d):
+        d += pd.Timedelta(days=1)
+    return d.date()
+
+
+def previous_trading_day(day: DayLike) -> date:
+    d = pd.Timestamp(_as_date(day)) - pd.Timedelta(days=1)
+    while not is_trading_day(d):
+        d -= pd.Timedelta(days=1)
+    return d.date()
+
+
+def is_market_open(now: Optional[pd.Timestamp] = None) -> bool:
+    now = _as_ist(now)
+    if not is_trading_day(now):
+        return False
+    open_, close = session_bounds(now)
+    return open_ <= now < close
+
+
+def next_open(now: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    """Start of the next session that has not begun yet."""
+    now = _as_ist(now)
+    day = next_trading_day(now, include=True)
+    open_, _ = session_bounds(day)
+    if open_ <= now:
+        open_, _ = session_bounds(next_trading_day(day))
+    return open_
+
+
+def next_close(now: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    """End of the current session, or of the next one if none is running."""
+    now = _as_ist(now)
+    day = next_trading_day(now, include=True)
+    _, close = session_bounds(day)
+    if close <= now:
+        _, close = session_bounds(next_trading_day(day))
+    return close
+
+
+# ────────────────────────────────────────────────────────────────────
+# Bars
+# ────────────────────────────────────────────────────────────────────
+
+_INTERVAL_RE = re.compile(r"^(\d+)(m|h|d|wk|mo)$")
+
+
+def interval_minutes(interval: str) -> Optional[int]:
+    """Minutes per bar for intraday intervals ("5m", "1h" …); None for daily+."""
+    m = _INTERVAL_RE.match(interval.strip().lower())
+    if not m:
+        raise ValueError(f"Unknown interval {interval!r}")
+    n, unit = int(m.group(1)), m.group(2)
+    if unit == "m":
+        return n
+    if unit == "h":
+        return n * 60
+    return None
+
+
+def next_bar_boundary(interval: str, now: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    """
+    When the bar forming at *now* completes. Bars are aligned to the
+    09:15 open and the last one is cut at the close. Outside a session the
+    data cannot change before the next open. Daily-or-longer intervals
+    roll at the close.
+    """
+    now = _as_ist(now)
+    minutes = interval_minutes(interval)
+    if minutes is None:
+        return next_close(now)
+    if not is_market_open(now):
+        return next_open(now)
+
+    open_, close = session_bounds(now)
+    step = pd.Timedelta(minutes=minutes)
+    elapsed = (now - open_) // step + 1
+    return min(open_ + elapsed * step, close)
+
+
+# ────────────────────────────────────────────────────────────────────
+# Cache lifetimes
+# ────────────────────────────────────────────────────────────────────
+
+
+def seconds_until(ts: pd.Timestamp, now: Optional[pd.Timestamp] = None) -> float:
+    return max(MIN_TTL_S, (ts - _as_ist(now)).total_seconds())
+
+
+def eod_expiry(now: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    """EOD data is final until the next close has settled."""
+    now = _as_ist(now)
+    _, last_close = session_bounds(now)
+    if is_trading_day(now) and last_close <= now < last_close + EOD_SETTLE:
+        return last_close + EOD_SETTLE      # today's bar is still settling
+    return next_close(now) + EOD_SETTLE
+
+
+def eod_ttl():
+    """TTL callable: seconds until the next session close has settled."""
+    def ttl(args: dict) -> float:
+        return seconds_until(eod_expiry())
+    return ttl
+
+
+def intraday_ttl(param: str = "interval", default: str = "1d"):
+    """TTL callable: seconds until the next bar of ``args[param]`` completes."""
+    def ttl(args: dict) -> float:
+        interval = args.get(param) or default
+        if interval_minutes(interval) is None:
+            return seconds_until(eod_expiry())
+        return seconds_until(next_bar_boundary(interval))
+    return ttl
+
+
+__all__ = [
+    "TZ", "SESSION_OPEN", "SESSION_CLOSE", "NSE_HOLIDAYS", "holidays", "now_ist",
+    "is_trading_day", "session_bounds", "next_trading_day", "previous_trading_day",
+    "is_market_open", "next_open", "next_close", "interval_minutes", "next_bar_boundary",
+    "seconds_until", "eod_expiry", "eod_ttl", "intraday_ttl",
+]
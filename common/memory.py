@@ -0,0 +1,199 @@
+"""
+common.memory
+~~~~~~~~~~~~~
+Memory budget for a long-running server: what the caches and sessions hold,
+and the per-session cap.
+
+Process-wide caches are bounded in ``common.cache`` (per-cache limits plus
+a shared LRU budget, ``STOCK_ANALYZER_CACHE_BUDGET``). What is left is
+per-session state: every open tab has its own ``st.session_state``, and a
+frame parked there is held until the session ends. ``guard_session`` runs
+at the top of each page and keeps the session's data values (frames,
+arrays, bytes, large containers) under ``STOCK_ANALYZER_SESSION_BUDGET``
+(default 16MB), dropping the least recently written ones first. Widget
+values and small scalars are never touched.
+
+Functions
+---------
+guard_session(budget=None) -> int
+    Trim the current session's data values to the budget; returns bytes freed.
+sessions() -> DataFrame
+    Keys and approximate bytes held by each active session.
+rss_bytes() -> int
+    Resident set size of this process.
+report() -> dict
+    Caches, sessions, budgets and RSS in one place (Diagnostics page).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from common import cache, resample, telemetry
+
+ENV_SESSION_BUDGET = "STOCK_ANALYZER_SESSION_BUDGET"
+DEFAULT_SESSION_BUDGET = 16 * 2**20
+MIN_DATA_BYTES = 64 * 2**10     # values smaller than this are left alone
+_WRITES_KEY = "_memory_writes"  # session key → first time its current value was seen
+
+_lock = threading.Lock()
+_trimmed = {"sessions": 0, "values": 0, "bytes": 0}
+
+
+def session_budget() -> Optional[int]:
+    if ENV_SESSION_BUDGET in os.environ:
+        return cache.parse_bytes(os.environ[ENV_SESSION_BUDGET])
+    return DEFAULT_SESSION_BUDGET
+
+
+def _is_data(value) -> bool:
+    return isinstance(value, (pd.DataFrame, pd.Series, np.ndarray, bytes, bytearray, list, dict, set))
+
+
+def _data_sizes(state) -> dict:
+    """``{key: bytes}`` for data values at least ``MIN_DATA_BYTES`` big."""
+    sizes = {}
+    for key in list(state.keys()):
+        if key == _WRITES_KEY:
+            continue
+        try:
+            value = state[key]
+        except KeyError:            # removed concurrently
+            continue
+        if _is_data(value):
+            nbytes = cache.approx_bytes(value)
+            if nbytes >= MIN_DATA_BYTES:
+                sizes[key] = nbytes
+    return sizes
+
+
+def guard_session(budget: Optional[int] = None) -> int:
+    """
+    Keep the current session's data values within *budget* bytes (default
+    ``session_budget()``). Write order is tracked by value identity, so the
+    value assigned longest ago goes first. Outside a Streamlit run it does
+    nothing.
+    """
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return 0
+    budget = session_budget() if budget is None else budget
+    state = st.session_state
+    sizes = _data_sizes(state)
+
+    # first-seen time per (key, value identity): a reassigned key counts as new
+    seen = state.get(_WRITES_KEY, {})
+    now = time.time()
+    seen = {k: seen[k] if k in seen and seen[k][0] == id(state[k]) else (id(state[k]), now) for k in sizes}
+    state[_WRITES_KEY] = seen
+
+    if budget is None or sum(sizes.values()) <= budget:
+        return 0
+    freed, held = 0, sum(sizes.values())
+    for key in sorted(sizes, key=lambda k: seen[k][1]):
+        if held - freed <= budget:
+            break
+        del state[key]
+        seen.pop(key, None)
+        freed += sizes[key]
+        with _lock:
+            _trimmed["values"] += 1
+    with _lock:
+        _trimmed["sessions"] += 1
+        _trimmed["bytes"] += freed
+    return freed
+
+
+def _active_session_states() -> list:
+    """``(session_id, SessionState)`` for every active session, via the runtime's session manager."""
+    try:
+        from streamlit.runtime import Runtime
+        if not Runtime.exists():
+            return []
+        infos = Runtime.instance()._session_mgr.list_active_sessions()
+    except Exception:           # internal API: report nothing rather than fail
+        return []
+    return [(info.session.id, info.session.session_state) for info in infos]
+
+
+def sessions() -> pd.DataFrame:
+    rows = []
+    for session_id, state in _active_session_states():
+        try:
+            values = state.filtered_state
+        except Exception:
+            continue
+        sizes = {k: cache.approx_bytes(v) for k, v in values.items() if k != _WRITES_KEY}
+        largest = max(sizes, key=sizes.get) if sizes else None
+        rows.append({
+            "session": session_id[:8],
+            "keys": len(sizes),
+            "bytes": sum(sizes.values()),
+            "largest_key": largest,
+            "largest_bytes": sizes.get(largest, 0),
+        })
+    return pd.DataFrame(rows, columns=["session", "keys", "bytes", "largest_key", "largest_bytes"])
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource         # peak, not current, where /proc is unavailable
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def report() -> dict:
+    caches = cache.stats()
+    if not caches.empty:
+        caches = caches[["function", "entries", "bytes", "max_bytes", "max_entries",
+                         "evictions", "budget_evictions", "expirations"]]
+        caches = caches.sort_values("bytes", ascending=False, ignore_index=True)
+    sess = sessions()
+    with _lock:
+        trimmed = dict(_trimmed)
+    return {
+        "rss_bytes": rss_bytes(),
+        "cache_bytes": cache.total_bytes(),
+        "cache_budget": cache.budget(),
+        "bar_store_bytes": resample.stats()["bytes"],
+        "session_bytes": int(sess["bytes"].sum()) if not sess.empty else 0,
+        "session_budget": session_budget(),
+        "session_trims": trimmed,
+        "caches": caches,
+        "sessions": sess,
+    }
+
+
+def _prometheus_lines() -> list:
+    p = telemetry.METRIC_PREFIX
+    budget = cache.budget()
+    with _lock:
+        trimmed = _trimmed["values"]
+    lines = [
+        f"# HELP {p}_process_rss_bytes Resident set size of the server process.",
+        f"# TYPE {p}_process_rss_bytes gauge",
+        f"{p}_process_rss_bytes {rss_bytes()}",
+        f"# HELP {p}_cache_budget_bytes Shared byte budget of all caches (-1 = unbounded).",
+        f"# TYPE {p}_cache_budget_bytes gauge",
+        f"{p}_cache_budget_bytes {budget if budget is not None else -1}",
+        f"# HELP {p}_session_values_trimmed_total Session values dropped to stay within the session budget.",
+        f"# TYPE {p}_session_values_trimmed_total counter",
+        f"{p}_session_values_trimmed_total {trimmed}",
+    ]
+    return lines
+
+
+telemetry.register_collector(_prometheus_lines)
+
+
+__all__ = ["session_budget", "guard_session", "sessions", "rss_bytes", "report"]
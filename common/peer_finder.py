@@ -3,11 +3,16 @@ import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
-from common.sql import load_master
+from common.telemetry import span, traced
+from common.universe import get_universe
 
+@traced("peer_finder.top_peers")
 def top_peers(symbol: str, df: pd.DataFrame = None, k=10, filter_sector: bool = False) -> pd.DataFrame:
     if df is None:
-        df = load_master()
+        df = get_universe().frame
+    if "Description" not in df.columns:
+        # descriptions are loaded lazily, only once similarity is asked for
+        df = df.join(get_universe().descriptions(), on="Symbol")
 
     df = df.dropna(subset=["Symbol", "Description"])
     df = df[df["Description"].str.len() > 30]
@@ -27,11 +32,13 @@ def top_peers(symbol: str, df: pd.DataFrame = None, k=10, filter_sector: bool =
         min_df=2,
         max_df=0.9
     )
-    tfidf_matrix = tfidf.fit_transform(descriptions)
+    with span("peer_finder.tfidf_fit"):
+        tfidf_matrix = tfidf.fit_transform(descriptions)
 
     # Compute cosine similarity
-    index = descriptions.index.tolist().index(symbol)
-    sim_scores = cosine_similarity(tfidf_matrix[index], tfidf_matrix).flatten()
+    with span("peer_finder.similarity"):
+        index = descriptions.index.tolist().index(symbol)
+        sim_scores = cosine_similarity(tfidf_matrix[index], tfidf_matrix).flatten()
 
     sim_df = pd.DataFrame({
         "Symbol": descriptions.index,
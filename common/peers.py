@@ -1,14 +1,23 @@
-import streamlit as st, yfinance as yf, pandas as pd, numpy as np
+import streamlit as st, pandas as pd, numpy as np
+from common.cache import cached
+from common.provider import Ticker
+from common.sql import dataset_version
+from common.telemetry import traced
 def make_peer_labels(name_df:pd.DataFrame):
     return {f"{r['Symbol']} – {r['Company Name'] or 'Unknown'}":r['Symbol'] for _,r in name_df.iterrows()}
-@st.cache_data(ttl=60*60*12)
+@cached("peers.description", ttl=60*60*12, max_entries=2500, max_bytes=16*2**20)
 def _desc(sym):
-    try: return yf.Ticker(f"{sym}.NS").info.get("longBusinessSummary","")
+    try: return Ticker(f"{sym}.NS").info.get("longBusinessSummary","")
     except: return ""
-@st.cache_data(ttl=60*60*12)
+@traced("peers.similar_description")
 def similar_description_peers(symbol:str, master_df:pd.DataFrame, k:int=5):
+    # keyed on the dataset snapshot so the frame (and its Description text) is never hashed
+    return _similar_description_peers(symbol, k, dataset_version(), master_df)
+@cached("peers.similar_description", max_entries=1024)
+def _similar_description_peers(symbol:str, k:int, snapshot:str, _master_df:pd.DataFrame):
+    master_df=_master_df
     inds=master_df.loc[master_df['Symbol']==symbol,'Industry']
     if inds.empty: return []
     industry=inds.iat[0]
     peers=[s for s in master_df.loc[master_df['Industry']==industry,'Symbol'] if s!=symbol]
-    return peers[:k]
\ No newline at end of file
+    return peers[:k]
@@ -0,0 +1,84 @@
+"""
+common.price_stats
+~~~~~~~~~~~~~~~~~~
+Per-symbol price extremes kept in the ``PriceStats`` table of nse.db.
+
+``nightly.py`` derives them from the daily bars it already downloads.
+Its default two-year window cannot see an all-time high set earlier, so
+each run folds the new bars into the previous table, and the ATH only
+ratchets up. Run ``python nightly.py --period max`` once to seed it.
+
+Functions
+---------
+compute_price_stats(bars, previous=None) -> DataFrame
+    Symbol, LastClose, High52w, Low52w, ATH, ATHDate, AsOf.
+price_stats() -> DataFrame
+    The stored table indexed by Symbol (cached until nse.db changes).
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import pandas as pd
+import sqlalchemy as sa
+
+from common.cache import cached
+from common.sql import ENGINE, db_stamp
+from common.telemetry import traced
+
+TABLE = "PriceStats"
+COLUMNS = ["Symbol", "LastClose", "High52w", "Low52w", "ATH", "ATHDate", "AsOf"]
+
+
+@traced("price_stats.compute")
+def compute_price_stats(bars: pd.DataFrame, previous: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    *bars*: daily OHLC with (field, symbol) columns. *previous*: the last
+    stored table, whose ATH is kept where it is higher than anything in *bars*.
+    """
+    high, low, close = bars["High"], bars["Low"], bars["Close"]
+    year = bars.index > bars.index.max() - pd.DateOffset(years=1)
+    out = pd.DataFrame({
+        "LastClose": close.ffill().iloc[-1],
+        "High52w": high[year].max(),
+        "Low52w": low[year].min(),
+        "ATH": high.max(),
+        "ATHDate": high.idxmax().dt.date.astype(str),
+    })
+    out.index.name = "Symbol"
+
+    if previous is not None and not previous.empty:
+        prev = previous.set_index("Symbol")[["ATH", "ATHDate"]].reindex(out.index)
+        older = prev["ATH"] > out["ATH"]
+        out.loc[older, ["ATH", "ATHDate"]] = prev.loc[older, ["ATH", "ATHDate"]]
+
+    out["AsOf"] = pd.Timestamp(bars.index.max()).date().isoformat()
+    return out.dropna(subset=["LastClose"]).reset_index()[COLUMNS]
+
+
+def read_price_stats(engine=ENGINE) -> pd.DataFrame:
+    try:
+        return pd.read_sql(f'SELECT * FROM "{TABLE}"', engine)
+    except (sa.exc.OperationalError, pd.errors.DatabaseError):    # nightly job not run yet
+        return pd.DataFrame(columns=COLUMNS)
+
+
+def write_price_stats(stats: pd.DataFrame, engine=ENGINE) -> None:
+    """Replace rows for the symbols in *stats*; symbols not in this run are kept."""
+    previous = read_price_stats(engine)
+    kept = previous[~previous["Symbol"].isin(stats["Symbol"])]
+    pd.concat([kept, stats], ignore_index=True).to_sql(TABLE, engine, if_exists="replace", index=False)
+
+
+@cached("price_stats.table", max_entries=2)
+def _load_price_stats(stamp: int) -> pd.DataFrame:
+    return read_price_stats().set_index("Symbol")
+
+
+def price_stats() -> pd.DataFrame:
+    """PriceStats indexed by Symbol (no '.NS'), re-read only when nse.db changes."""
+    return _load_price_stats(db_stamp())
+
+
+__all__ = ["compute_price_stats", "read_price_stats", "write_price_stats", "price_stats"]
@@ -0,0 +1,163 @@
+"""
+common.profiling
+~~~~~~~~~~~~~~~~
+Opt-in sampling profiler for a single Streamlit rerun.
+
+Each page calls ``profile_rerun()`` right after ``st.set_page_config``.
+When profiling is on – ``STOCK_ANALYZER_PROFILE=1`` or ``?profile=1`` in the
+URL – a daemon thread samples the script thread's stack every few
+milliseconds until the page script returns, then writes the samples in
+collapsed-stack format (one ``frame;frame;frame count`` line per stack),
+ready for flamegraph.pl, speedscope or ``py-spy``-style viewers:
+
+    profiles/<page>__<YYYYmmdd-HHMMSS>__<session>-r<rerun>.collapsed
+
+``<page>`` is the calling script's file name and ``<session>`` the first
+eight characters of the Streamlit session id, so concurrent sessions never
+write the same file.
+
+Only frames from the page script downwards are kept, so the Streamlit
+runner itself does not appear. The oldest files are deleted once more
+than ``STOCK_ANALYZER_PROFILE_KEEP`` (default 50) exist.
+
+Environment
+-----------
+STOCK_ANALYZER_PROFILE=1                 profile every rerun
+STOCK_ANALYZER_PROFILE_DIR=<dir>         output directory (default profiles)
+STOCK_ANALYZER_PROFILE_KEEP=<n>          retention limit
+STOCK_ANALYZER_PROFILE_INTERVAL_MS=<ms>  sampling interval (default 5)
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+ENV_PROFILE = "STOCK_ANALYZER_PROFILE"
+ENV_DIR = "STOCK_ANALYZER_PROFILE_DIR"
+ENV_KEEP = "STOCK_ANALYZER_PROFILE_KEEP"
+ENV_INTERVAL = "STOCK_ANALYZER_PROFILE_INTERVAL_MS"
+
+DEFAULT_DIR = "profiles"
+DEFAULT_KEEP = 50
+DEFAULT_INTERVAL_MS = 5
+MAX_SECONDS = 300           # give up on runaway scripts
+RERUN_KEY = "_profile_rerun"
+SUFFIX = ".collapsed"
+
+
+def profile_dir() -> Path:
+    return Path(os.environ.get(ENV_DIR, DEFAULT_DIR))
+
+
+def enabled() -> bool:
+    if os.environ.get(ENV_PROFILE) == "1":
+        return True
+    try:
+        return st.query_params.get("profile") == "1"
+    except Exception:           # no script context (bare mode)
+        return False
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class RerunSampler(threading.Thread):
+    """Sample *thread_id*'s stack until *root* leaves it."""
+
+    def __init__(self, thread_id: int, root, out_path: Path, interval: float, keep: int):
+        super().__init__(name="rerun-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.root = root
+        self.out_path = out_path
+        self.interval = interval
+        self.keep = keep
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def _sample(self) -> bool:
+        frame = sys._current_frames().get(self.thread_id)
+        labels = []
+        while frame is not None:
+            labels.append(_label(frame))
+            if frame is self.root:
+                self.stacks[";".join(reversed(labels))] += 1
+                self.samples += 1
+                return True
+            frame = frame.f_back
+        return False            # root frame gone → the script has finished
+
+    def run(self) -> None:
+        deadline = time.monotonic() + MAX_SECONDS
+        time.sleep(self.interval)       # skip profile_rerun's own start-up
+        while time.monotonic() < deadline and self._sample():
+            time.sleep(self.interval)
+        self.root = None        # drop the frame reference promptly
+        if self.stacks:
+            write_collapsed(self.stacks, self.out_path)
+            prune(self.out_path.parent, self.keep)
+
+
+def write_collapsed(stacks: Counter, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text("".join(f"{stack} {n}\n" for stack, n in stacks.most_common()))
+    os.replace(tmp, path)
+
+
+def prune(directory: Path, keep: int) -> None:
+    files = sorted(directory.glob(f"*{SUFFIX}"), key=lambda p: p.stat().st_mtime)
+    for old in files[:max(0, len(files) - keep)]:
+        old.unlink(missing_ok=True)
+
+
+def profile_rerun(page: Optional[str] = None) -> Optional[RerunSampler]:
+    """Start sampling the calling page script if profiling is enabled."""
+    if not enabled():
+        return None
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return None
+
+    root = sys._getframe(1)
+    # not ctx.main_script_path: multipage apps run every page through Home.py
+    page = page or Path(root.f_code.co_filename).stem
+    page = re.sub(r"[^A-Za-z0-9_-]", "", page) or "page"
+
+    rerun = st.session_state.get(RERUN_KEY, 0) + 1
+    st.session_state[RERUN_KEY] = rerun
+    session = re.sub(r"[^A-Za-z0-9]", "", ctx.session_id)[:8] or "local"
+    out = profile_dir() / f"{page}__{time.strftime('%Y%m%d-%H%M%S')}__{session}-r{rerun:04d}{SUFFIX}"
+
+    sampler = RerunSampler(
+        thread_id=threading.get_ident(),
+        root=root,
+        out_path=out,
+        interval=int(os.environ.get(ENV_INTERVAL, DEFAULT_INTERVAL_MS)) / 1000,
+        keep=int(os.environ.get(ENV_KEEP, DEFAULT_KEEP)),
+    )
+    sampler.start()
+    return sampler
+
+
+def recent_profiles(limit: int = 20) -> list:
+    """Newest profile files first."""
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    files = sorted(directory.glob(f"*{SUFFIX}"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return files[:limit]
+
+
+__all__ = ["profile_rerun", "enabled", "recent_profiles", "profile_dir", "write_collapsed", "prune"]
@@ -0,0 +1,246 @@
+"""
+common.provider
+~~~~~~~~~~~~~~~
+Market-data provider used by the app instead of importing yfinance directly.
+
+Every backend exposes the small slice of the yfinance API the app uses:
+
+    provider.Ticker(sym).history(period=..., interval=..., auto_adjust=...)
+    provider.Ticker(sym).info / .financials / .cashflow / .recommendations
+    provider.download(tickers, period=..., interval=..., group_by="ticker")
+
+The backend is picked by the ``STOCK_ANALYZER_PROVIDER`` environment
+variable (or ``set_provider`` in-process):
+
+    yfinance   live Yahoo Finance (default)
+    synthetic  deterministic offline data – see common.synthetic
+    record     live data, every response saved to a local store
+    replay     recorded responses only, no network – see common.replay
+
+Functions
+---------
+get_provider() -> provider
+    The active backend.
+set_provider(provider | None)
+    Override the backend for this process (None → back to the env var).
+Ticker(symbol)
+    Shorthand for ``get_provider().Ticker(symbol)``.
+is_offline() -> bool
+    True when the backend never touches the network (synthetic / replay).
+
+``Ticker`` and ``download`` are instrumented: each data access is timed as
+an ``upstream.<method>`` span and counted per provider in common.telemetry.
+
+They also go through a circuit breaker per provider: after
+``BREAKER_THRESHOLD`` consecutive failures calls fail fast with
+``UpstreamUnavailable`` for ``BREAKER_COOLDOWN_S`` seconds, then a single
+trial call decides whether to close it again. Callers cached with
+``stale_ttl`` keep serving their last good value meanwhile. An empty
+``history`` counts as a failure and raises ``EmptyHistory``: yfinance
+returns one instead of raising for most upstream errors.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+from common import telemetry
+from common.telemetry import record_upstream, span
+
+ENV_PROVIDER = "STOCK_ANALYZER_PROVIDER"
+TRACKED_ATTRS = ("info", "financials", "cashflow", "recommendations")
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN_S = 60
+
+_lock = threading.Lock()
+_override = None
+_instances: dict = {}
+_breakers: dict = {}
+
+
+class UpstreamUnavailable(RuntimeError):
+    """Raised instead of calling the provider while its breaker is open."""
+
+
+class EmptyHistory(RuntimeError):
+    """``history`` came back empty – how yfinance reports most upstream errors."""
+
+
+class CircuitBreaker:
+    """closed → (threshold failures) → open → (cooldown) → half-open → closed/open."""
+
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN_S):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.short_circuits = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half-open" and not self.trial_running:
+                self.trial_running = True       # let one call probe the upstream
+                return
+            self.short_circuits += 1
+        raise UpstreamUnavailable(f"{self.name} circuit open after {self.threshold} failures")
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self.trial_running = False
+            if ok:
+                self.failures, self.opened_at = 0, None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def breaker(provider_name: str) -> CircuitBreaker:
+    with _lock:
+        if provider_name not in _breakers:
+            _breakers[provider_name] = CircuitBreaker(provider_name)
+        return _breakers[provider_name]
+
+
+class YFinanceProvider:
+    """Thin pass-through to yfinance (imported lazily)."""
+
+    name = "yfinance"
+    offline = False
+
+    def Ticker(self, symbol: str):
+        import yfinance as yf
+        return yf.Ticker(symbol)
+
+    def download(self, tickers, **kwargs):
+        import yfinance as yf
+        kwargs.setdefault("progress", False)
+        return yf.download(tickers, **kwargs)
+
+
+def _build(name: str):
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "synthetic":
+        from common.synthetic import SyntheticProvider
+        return SyntheticProvider()
+    if name == "record":
+        from common.replay import ENV_RECORD_FROM, RecordingProvider
+        source = os.environ.get(ENV_RECORD_FROM, "yfinance").strip().lower()
+        if source in ("record", "replay"):
+            raise ValueError(f"{ENV_RECORD_FROM} must name a live provider, not {source!r}")
+        return RecordingProvider(_build(source))
+    if name == "replay":
+        from common.replay import ReplayProvider
+        return ReplayProvider()
+    raise ValueError(f"Unknown {ENV_PROVIDER}={name!r}")
+
+
+def get_provider():
+    """Return the active provider (process-wide, created once per name)."""
+    if _override is not None:
+        return _override
+    name = os.environ.get(ENV_PROVIDER, "yfinance").strip().lower() or "yfinance"
+    with _lock:
+        if name not in _instances:
+            _instances[name] = _build(name)
+        return _instances[name]
+
+
+def set_provider(provider) -> None:
+    """Force *provider* for this process; ``None`` restores env-var selection."""
+    global _override
+    _override = provider
+
+
+def is_offline() -> bool:
+    return bool(getattr(get_provider(), "offline", False))
+
+
+def _call(provider_name: str, method: str, fn, *args, **kwargs):
+    gate = breaker(provider_name)
+    gate.before_call()
+    error = False
+    try:
+        with span(f"upstream.{method}"):
+            return fn(*args, **kwargs)
+    except Exception:
+        error = True
+        raise
+    finally:
+        gate.record(not error)
+        record_upstream(provider_name, method, error)
+
+
+class _InstrumentedTicker:
+    """Proxy that times and counts the data accessors of a backend ticker."""
+
+    def __init__(self, provider_name: str, inner):
+        self._provider_name = provider_name
+        self._inner = inner
+
+    def history(self, *args, **kwargs):
+        return _call(self._provider_name, "history", self._history, *args, **kwargs)
+
+    def _history(self, *args, **kwargs):
+        # yfinance hides non-rate-limit errors (YfConfig.debug.hide_exceptions)
+        # and hands back an empty frame instead; count it as the failure it is
+        bars = self._inner.history(*args, **kwargs)
+        if bars.empty:
+            raise EmptyHistory(f"no bars for {getattr(self._inner, 'ticker', '?')} {kwargs}")
+        return bars
+
+    def __getattr__(self, name):
+        if name in TRACKED_ATTRS:
+            return _call(self._provider_name, name, getattr, self._inner, name)
+        return getattr(self._inner, name)
+
+
+def Ticker(symbol: str):
+    provider = get_provider()
+    return _InstrumentedTicker(provider.name, provider.Ticker(symbol))
+
+
+def download(tickers, **kwargs):
+    provider = get_provider()
+    return _call(provider.name, "download", provider.download, tickers, **kwargs)
+
+
+def _prometheus_lines() -> list:
+    p = telemetry.METRIC_PREFIX
+    states = {"closed": 0, "half-open": 1, "open": 2}
+    with _lock:
+        gates = list(_breakers.values())
+    out = [f"# HELP {p}_upstream_circuit_state 0 closed, 1 half-open, 2 open.",
+           f"# TYPE {p}_upstream_circuit_state gauge"]
+    out += [f'{p}_upstream_circuit_state{{provider="{g.name}"}} {states[g.state]}' for g in gates]
+    out += [f"# HELP {p}_upstream_short_circuits_total Calls refused while the circuit was open.",
+            f"# TYPE {p}_upstream_short_circuits_total counter"]
+    out += [f'{p}_upstream_short_circuits_total{{provider="{g.name}"}} {g.short_circuits}' for g in gates]
+    return out
+
+
+telemetry.register_collector(_prometheus_lines)
+
+
+__all__ = [
+    "get_provider", "set_provider", "is_offline", "Ticker", "download", "YFinanceProvider",
+    "UpstreamUnavailable", "EmptyHistory", "CircuitBreaker", "breaker",
+]
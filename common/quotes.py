@@ -0,0 +1,280 @@
+"""
+common.quotes
+~~~~~~~~~~~~~
+Process-wide live quotes for whatever the open sessions are looking at.
+
+A single background thread runs an asyncio loop that polls the quote feed
+for the *union* of watched symbols – one batched request per poll, however
+many sessions share a symbol. Sessions register interest with ``watch``,
+which takes a lease of ``LEASE_S``. Price fragments renew the lease every
+time they rerun, so a closed tab drops out of the poll set within a lease.
+
+Symbols that nobody has a quote for yet are fetched straight away on their
+own. The full set is polled every ``POLL_S`` while the market is open, and
+every ``CLOSED_POLL_S`` otherwise.
+
+Feeds (``STOCK_ANALYZER_QUOTES``):
+
+    provider   last daily bar from ``common.provider.download`` (default)
+    simulated  a local random walk around the first provider quote, ticking
+               even outside market hours – the default for offline providers
+
+Functions
+---------
+watch(symbols, session=None)
+    Keep *symbols* (tickers as for ``get_history``) in the poll set.
+last_quote(symbol) -> Quote | None
+    Latest price, previous close and receive time.
+get_service() -> QuoteService
+    The shared service (started on first use).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from common.market_calendar import is_market_open
+from common.provider import download, is_offline
+from common.telemetry import span
+
+ENV_FEED = "STOCK_ANALYZER_QUOTES"
+POLL_S = 15
+CLOSED_POLL_S = 15 * 60
+LEASE_S = 60                    # a watcher that has not renewed for this long is dropped
+QUOTE_PERIOD = "5d"
+SIMULATED_VOL = 0.0008          # per-tick log-return std of the simulated feed
+
+
+class Quote(NamedTuple):
+    price: float
+    prev_close: Optional[float]
+    as_of: float                # epoch seconds the quote was received
+
+    @property
+    def change_pct(self) -> Optional[float]:
+        if not self.prev_close:
+            return None
+        return (self.price / self.prev_close - 1) * 100
+
+
+# ────────────────────────────────────────────────────────────────────
+# Feeds
+# ────────────────────────────────────────────────────────────────────
+
+
+class ProviderFeed:
+    """Last and previous close from one batched daily download."""
+
+    simulated = False
+
+    def fetch(self, symbols) -> Dict[str, Tuple[float, Optional[float]]]:
+        data = download(list(symbols), period=QUOTE_PERIOD, interval="1d", auto_adjust=True,
+                        group_by="column", threads=True)
+        if data.empty:
+            return {}
+        closes = data["Close"]
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(next(iter(symbols)))
+        closes = closes.ffill()
+        last = closes.iloc[-1]
+        prev = closes.iloc[-2] if len(closes) > 1 else pd.Series(np.nan, index=closes.columns)
+        return {
+            s: (float(last[s]), float(prev[s]) if pd.notna(prev[s]) else None)
+            for s in closes.columns if pd.notna(last[s])
+        }
+
+
+class SimulatedFeed:
+    """Local stand-in: a random walk seeded from the first real quote of each symbol."""
+
+    simulated = True
+
+    def __init__(self, seed_feed=None, vol: float = SIMULATED_VOL):
+        self.seed_feed = seed_feed or ProviderFeed()
+        self.vol = vol
+        self._state: Dict[str, Tuple[float, Optional[float]]] = {}
+        self._rng = np.random.default_rng()
+
+    def fetch(self, symbols) -> Dict[str, Tuple[float, Optional[float]]]:
+        unseen = [s for s in symbols if s not in self._state]
+        if unseen:
+            self._state.update(self.seed_feed.fetch(unseen))
+        known = [s for s in symbols if s in self._state]
+        steps = np.exp(self._rng.normal(0, self.vol, len(known)))
+        for s, step in zip(known, steps):
+            price, prev = self._state[s]
+            self._state[s] = (float(price * step), prev)
+        return {s: self._state[s] for s in known}
+
+
+def default_feed():
+    name = os.environ.get(ENV_FEED, "").strip().lower()
+    if name == "simulated" or (not name and is_offline()):
+        return SimulatedFeed()
+    if name in ("", "provider"):
+        return ProviderFeed()
+    raise ValueError(f"Unknown {ENV_FEED}={name!r}")
+
+
+# ────────────────────────────────────────────────────────────────────
+# Service
+# ────────────────────────────────────────────────────────────────────
+
+
+class QuoteService:
+    """Background poller holding the last quote of every watched symbol."""
+
+    def __init__(self, feed=None, poll_s: float = POLL_S, closed_poll_s: float = CLOSED_POLL_S,
+                 lease_s: float = LEASE_S):
+        self.feed = feed or default_feed()
+        self.poll_s = poll_s
+        self.closed_poll_s = closed_poll_s
+        self.lease_s = lease_s
+        self.polls = 0
+        self.errors = 0
+        self.last_poll: Optional[float] = None
+        self._quotes: Dict[str, Quote] = {}
+        self._leases: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._loop = asyncio.new_event_loop()
+        self._wake = asyncio.Event()
+        self._thread = threading.Thread(target=self._run, name="quote-service", daemon=True)
+        self._thread.start()
+
+    # ── called from sessions ───────────────────────────────────────
+    def watch(self, session: str, symbols: Iterable[str]) -> None:
+        expires = time.monotonic() + self.lease_s
+        with self._lock:
+            for s in symbols:
+                self._leases[(session, s)] = expires
+            new = any(s not in self._quotes for s in symbols)
+        if new:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def quote(self, symbol: str) -> Optional[Quote]:
+        with self._lock:
+            return self._quotes.get(symbol)
+
+    def symbols(self) -> list:
+        """Symbols with at least one live lease (expired leases are dropped)."""
+        now = time.monotonic()
+        with self._lock:
+            self._leases = {k: t for k, t in self._leases.items() if t > now}
+            return sorted({s for _, s in self._leases})
+
+    def stats(self) -> dict:
+        symbols = self.symbols()
+        with self._lock:
+            sessions = len({sess for sess, _ in self._leases})
+        return {
+            "feed": type(self.feed).__name__,
+            "sessions": sessions,
+            "symbols": len(symbols),
+            "quotes": len(self._quotes),
+            "polls": self.polls,
+            "errors": self.errors,
+            "last_poll": self.last_poll,
+        }
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._loop.call_soon_threadsafe(self._wake.set)
+        self._thread.join(timeout=5)
+
+    # ── background loop ────────────────────────────────────────────
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._poll_forever())
+        self._loop.close()
+
+    def _interval(self) -> float:
+        return self.poll_s if self.feed.simulated or is_market_open() else self.closed_poll_s
+
+    async def _poll_forever(self) -> None:
+        next_full = time.monotonic()
+        while not self._stopped:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, next_full - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._stopped:
+                break
+
+            symbols = self.symbols()
+            full = time.monotonic() >= next_full
+            if full:
+                next_full = time.monotonic() + self._interval()
+                with self._lock:          # forget quotes nobody watches any more
+                    self._quotes = {s: q for s, q in self._quotes.items() if s in symbols}
+            else:
+                with self._lock:
+                    symbols = [s for s in symbols if s not in self._quotes]
+            if symbols:
+                await self._poll(symbols)
+
+    async def _poll(self, symbols: list) -> None:
+        try:
+            fetched = await asyncio.to_thread(self._fetch, symbols)
+        except Exception:               # incl. an open circuit: keep the last quotes
+            self.errors += 1
+            return
+        now = time.time()
+        with self._lock:
+            for s, (price, prev) in fetched.items():
+                self._quotes[s] = Quote(price, prev, now)
+            self.polls += 1
+            self.last_poll = now
+
+    def _fetch(self, symbols: list) -> dict:
+        with span("quotes.poll"):
+            return self.feed.fetch(symbols)
+
+
+_service: Optional[QuoteService] = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> QuoteService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = QuoteService()
+        return _service
+
+
+def _session_id() -> str:
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ModuleNotFoundError:
+        return "local"
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else "local"
+
+
+def watch(symbols: Iterable[str], session: Optional[str] = None) -> None:
+    """Keep *symbols* in the poll set for another ``LEASE_S`` on behalf of *session*."""
+    get_service().watch(session or _session_id(), list(symbols))
+
+
+def last_quote(symbol: str) -> Optional[Quote]:
+    return get_service().quote(symbol)
+
+
+def stats() -> dict:
+    """Service counters, or an empty dict before anything has been watched."""
+    return _service.stats() if _service is not None else {}
+
+
+__all__ = [
+    "Quote", "ProviderFeed", "SimulatedFeed", "QuoteService",
+    "get_service", "watch", "last_quote", "stats",
+]
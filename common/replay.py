@@ -0,0 +1,191 @@
+"""
+common.replay
+~~~~~~~~~~~~~
+Record / replay providers for fully offline runs.
+
+``record``  wraps a live provider and writes every ``history``, ``info``,
+            ``financials``, ``cashflow``, ``recommendations`` and
+            ``download`` response to a local store.
+``replay``  serves those responses with no network access. Requests that
+            were never recorded behave like an unknown ticker on Yahoo
+            (empty frame / empty dict).
+
+Store layout (one pickle per response, written atomically)::
+
+    <store>/<method>/<SYMBOL>__<args-hash>.pkl
+
+Environment
+-----------
+STOCK_ANALYZER_PROVIDER=record|replay   enable (see common.provider)
+STOCK_ANALYZER_STORE=<dir>              store location (default data/replay)
+STOCK_ANALYZER_RECORD_FROM=<name>       provider to record (default yfinance)
+
+``python -m common.replay`` prints per-method entry counts and bytes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+ENV_STORE = "STOCK_ANALYZER_STORE"
+ENV_RECORD_FROM = "STOCK_ANALYZER_RECORD_FROM"
+DEFAULT_STORE = "data/replay"
+
+METHODS = ("history", "info", "financials", "cashflow", "recommendations", "download")
+
+_MISSING = {
+    "info": dict,
+    "history": pd.DataFrame,
+    "financials": pd.DataFrame,
+    "cashflow": pd.DataFrame,
+    "recommendations": pd.DataFrame,
+    "download": pd.DataFrame,
+}
+
+
+def _history_args(period="1mo", interval="1d", start=None, end=None, auto_adjust=True, **_) -> dict:
+    """Normalise yfinance ``history`` arguments so equal requests share a key."""
+    return {"period": period, "interval": interval, "start": start,
+            "end": end, "auto_adjust": auto_adjust}
+
+
+class ResponseStore:
+    """Directory of pickled provider responses."""
+
+    def __init__(self, root=None):
+        self.root = Path(root or os.environ.get(ENV_STORE, DEFAULT_STORE))
+
+    def path(self, method: str, symbol: str, args: Optional[dict] = None) -> Path:
+        digest = hashlib.sha1(repr(sorted((args or {}).items())).encode()).hexdigest()[:12]
+        safe = re.sub(r"[^A-Za-z0-9._^&-]", "_", symbol)
+        return self.root / method / f"{safe}__{digest}.pkl"
+
+    def get(self, method: str, symbol: str, args: Optional[dict] = None):
+        path = self.path(method, symbol, args)
+        if not path.exists():
+            return _MISSING[method]()
+        with path.open("rb") as fh:
+            return pickle.load(fh)
+
+    def put(self, method: str, symbol: str, args: Optional[dict], value) -> None:
+        path = self.path(method, symbol, args)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def stats(self) -> pd.DataFrame:
+        rows = []
+        for method in METHODS:
+            files = list((self.root / method).glob("*.pkl"))
+            rows.append({
+                "method": method,
+                "entries": len(files),
+                "bytes": sum(f.stat().st_size for f in files),
+            })
+        return pd.DataFrame(rows)
+
+
+# ────────────────────────────────────────────────────────────────────
+# Providers
+# ────────────────────────────────────────────────────────────────────
+
+
+class _StoredTicker:
+    """Ticker whose attribute reads go through ``self._fetch``."""
+
+    def __init__(self, provider, symbol: str):
+        self._p = provider
+        self.ticker = symbol
+
+    def history(self, *args, **kwargs) -> pd.DataFrame:
+        if args:
+            kwargs.setdefault("period", args[0])
+        return self._p._fetch("history", self.ticker, _history_args(**kwargs))
+
+    @property
+    def info(self) -> dict:
+        return self._p._fetch("info", self.ticker, None)
+
+    @property
+    def financials(self) -> pd.DataFrame:
+        return self._p._fetch("financials", self.ticker, None)
+
+    @property
+    def cashflow(self) -> pd.DataFrame:
+        return self._p._fetch("cashflow", self.ticker, None)
+
+    @property
+    def recommendations(self) -> pd.DataFrame:
+        return self._p._fetch("recommendations", self.ticker, None)
+
+
+def _download_key(tickers, kwargs: dict):
+    if isinstance(tickers, str):
+        tickers = tickers.replace(",", " ").split()
+    kwargs = {k: v for k, v in kwargs.items() if k not in ("progress", "threads", "timeout")}
+    return " ".join(tickers), kwargs
+
+
+class RecordingProvider:
+    """Pass calls to *inner* and persist every response."""
+
+    name = "record"
+    offline = False
+
+    def __init__(self, inner, store: Optional[ResponseStore] = None):
+        self.inner = inner
+        self.store = store or ResponseStore()
+
+    def Ticker(self, symbol: str) -> _StoredTicker:
+        return _StoredTicker(self, symbol)
+
+    def _fetch(self, method: str, symbol: str, args: Optional[dict]):
+        tkr = self.inner.Ticker(symbol)
+        value = tkr.history(**args) if method == "history" else getattr(tkr, method)
+        self.store.put(method, symbol, args, value)
+        return value
+
+    def download(self, tickers, **kwargs):
+        value = self.inner.download(tickers, **kwargs)
+        key, args = _download_key(tickers, kwargs)
+        self.store.put("download", key, args, value)
+        return value
+
+
+class ReplayProvider:
+    """Serve recorded responses only – never touches the network."""
+
+    name = "replay"
+    offline = True
+
+    def __init__(self, store: Optional[ResponseStore] = None):
+        self.store = store or ResponseStore()
+
+    def Ticker(self, symbol: str) -> _StoredTicker:
+        return _StoredTicker(self, symbol)
+
+    def _fetch(self, method: str, symbol: str, args: Optional[dict]):
+        return self.store.get(method, symbol, args)
+
+    def download(self, tickers, **kwargs):
+        key, args = _download_key(tickers, kwargs)
+        return self.store.get("download", key, args)
+
+
+__all__ = ["ResponseStore", "RecordingProvider", "ReplayProvider"]
+
+
+if __name__ == "__main__":
+    store = ResponseStore()
+    print(f"Store: {store.root.resolve()}")
+    print(store.stats().to_string(index=False))
@@ -0,0 +1,327 @@
+"""
+common.resample
+~~~~~~~~~~~~~~~
+Derive coarser OHLCV bars locally instead of fetching every interval.
+
+Intraday views (5m, 15m, 60m, 240m) all come from one month of 5-minute
+base bars per symbol, kept in a small in-process store. Bins are aligned
+to the 09:15 session open, so a 60m bar covers 09:15–10:15 and the last
+bar of the day is cut at the 15:30 close (15:15–15:30, 13:15–15:30 for
+240m). When the store's newest bar is complete, only a tail covering the
+sessions since then (one day, or five after a gap) is fetched and merged in;
+a series idle for longer refetches its whole base. The derived intervals are then re-aggregated from
+the first bin that the tail touched onwards; earlier bins are left alone.
+Each merge trims the series back to ``BASE_PERIOD``, and the store keeps
+at most ``MAX_SERIES`` series and ``MAX_BYTES`` in all, dropping the least
+recently used symbols first.
+
+Daily, weekly and monthly views share one daily series per symbol: the
+shortest already-cached daily history that covers the requested period,
+or else ten years fetched once. So the 60d chart, the 2y index history and the
+12mo insights are all served from the same bars. Daily bars are not
+rebuilt from 5m bars: Yahoo adjusts them for corporate actions, and
+5-minute history only reaches back 60 days.
+
+Functions
+---------
+resample_bars(bars, interval) -> DataFrame
+    OHLCV aggregation of *bars* into *interval* bins.
+get_bars(symbol, interval="5m", period="2d") -> DataFrame
+    Bars for any supported interval, trimmed to *period*.
+bar_freshness(symbol, interval, period) -> Freshness | None
+    Age of the data behind ``get_bars``.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import pandas as pd
+
+from common.bars import get_history, prefetch_histories
+from common.cache import Freshness, approx_bytes
+from common.market_calendar import (
+    SESSION_OPEN, interval_minutes, is_trading_day, next_bar_boundary, next_trading_day,
+    now_ist, previous_trading_day, session_bounds,
+)
+from common.telemetry import traced
+
+BASE_INTERVAL = "5m"
+BASE_PERIOD = "1mo"             # ≈ 22 sessions: plenty of 240m bars
+TAIL_PERIODS = {1: "1d", 5: "5d"}  # sessions missing → tail to fetch; more → refetch the base
+DAILY_BASE_PERIOD = "10y"
+# daily histories other code fetches that may already be cached
+DAILY_PERIODS = ("60d", "6mo", "12mo", "1y", "2y", "5y", "10y", "max")
+MAX_SERIES = 256
+MAX_BYTES = 128 * 2**20         # whole store; least recently used series go first
+RETRY_S = 30                    # after a failed tail fetch
+
+INTRADAY = ("5m", "15m", "60m", "240m")
+FROM_DAILY = {"1wk": dict(rule="W-MON", label="left", closed="left"), "1mo": dict(rule="MS")}
+INTERVALS = INTRADAY + ("1d",) + tuple(FROM_DAILY)
+
+AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+_SESSION_OFFSET = pd.Timedelta(hours=SESSION_OPEN.hour, minutes=SESSION_OPEN.minute)
+
+
+# ────────────────────────────────────────────────────────────────────
+# Aggregation
+# ────────────────────────────────────────────────────────────────────
+
+
+def resample_bars(bars: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """Aggregate *bars* (DatetimeIndex, OHLCV columns) into *interval* bins."""
+    if bars.empty:
+        return bars
+    agg = {c: f for c, f in AGG.items() if c in bars.columns}
+    if interval in FROM_DAILY:
+        out = bars.resample(**FROM_DAILY[interval]).agg(agg)
+    else:
+        minutes = interval_minutes(interval)
+        if minutes is None:
+            raise ValueError(f"Cannot resample to {interval!r}")
+        out = bars.resample(f"{minutes}min", origin="start_day", offset=_SESSION_OFFSET).agg(agg)
+    return out.dropna(subset=["Open"])
+
+
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+_UNIT_DAYS = {"d": 1, "wk": 7, "mo": 31, "y": 366}
+
+
+def period_days(period: str) -> float:
+    """Calendar days a yfinance *period* string spans (upper bound)."""
+    if period == "max":
+        return float("inf")
+    if period == "ytd":
+        return 366
+    m = _PERIOD_RE.match(period)
+    if not m:
+        raise ValueError(f"Unknown period {period!r}")
+    return int(m.group(1)) * _UNIT_DAYS[m.group(2)]
+
+
+def trim_period(bars: pd.DataFrame, period: str, sessions: bool = False) -> pd.DataFrame:
+    """
+    Keep the trailing *period* of *bars*, as calendar offsets from the last
+    bar. With *sessions*, "Nd" counts trading sessions instead (what Yahoo
+    returns for intraday intervals).
+    """
+    if bars.empty or period in (None, "max"):
+        return bars
+    if period == "ytd":
+        return bars[bars.index >= bars.index[-1].replace(month=1, day=1).normalize()]
+    m = _PERIOD_RE.match(period)
+    if not m:
+        raise ValueError(f"Unknown period {period!r}")
+    n, unit = int(m.group(1)), m.group(2)
+    if unit == "d" and sessions:
+        days = bars.index.normalize().unique()
+        return bars[bars.index >= days[-min(n, len(days))]]
+    offset = {"d": pd.DateOffset(days=n), "wk": pd.DateOffset(weeks=n),
+              "mo": pd.DateOffset(months=n), "y": pd.DateOffset(years=n)}[unit]
+    return bars[bars.index > bars.index[-1] - offset]
+
+
+def _daily_source(symbol: str, period: str) -> str:
+    """Shortest fresh cached daily period covering *period*, else the default base."""
+    need = period_days(period)
+    candidates = sorted({period, *DAILY_PERIODS}, key=period_days)
+    for p in candidates:
+        if period_days(p) >= need:
+            f = get_history.freshness(symbol, period=p, interval="1d")
+            if f is not None and not f.stale:
+                return p
+    return period if need > period_days(DAILY_BASE_PERIOD) else DAILY_BASE_PERIOD
+
+
+# ────────────────────────────────────────────────────────────────────
+# Intraday store
+# ────────────────────────────────────────────────────────────────────
+
+
+class _Series:
+    """Base 5m bars for one symbol plus every interval derived from them."""
+
+    def __init__(self):
+        self.base: Optional[pd.DataFrame] = None
+        self.derived: dict = {}
+        self.fetched_at = 0.0
+        self.next_refresh: Optional[pd.Timestamp] = None
+        self.stale = False
+        self.nbytes = 0
+        self.lock = threading.Lock()
+
+    def expired(self) -> bool:
+        return self.base is None or now_ist() >= self.next_refresh
+
+    def tail_period(self, now: Optional[pd.Timestamp] = None) -> Optional[str]:
+        """Shortest tail reaching back to the newest stored bar; None if the base must be refetched."""
+        now = now or now_ist()
+        last = self.base.index[-1].tz_convert(now.tz)
+        _, close = session_bounds(last)
+        complete = last + pd.Timedelta(minutes=interval_minutes(BASE_INTERVAL)) >= close
+        day = next_trading_day(last) if complete else last.date()
+        # the session a one-day fetch returns: today once it has opened, else the last one
+        latest = now.date() if is_trading_day(now) and now >= session_bounds(now)[0] else previous_trading_day(now)
+        missing = 0
+        while day <= latest and missing <= max(TAIL_PERIODS):
+            missing += 1
+            day = next_trading_day(day)
+        return next((p for n, p in TAIL_PERIODS.items() if max(missing, 1) <= n), None)
+
+    def refresh(self, symbol: str) -> None:
+        tail = self.tail_period() if self.base is not None and not self.base.empty else None
+        if tail is None:
+            fresh = get_history(symbol, period=BASE_PERIOD, interval=BASE_INTERVAL)
+            changed_from = None
+        else:
+            # forced: the cached tail expires on the same boundary as this series and would
+            # otherwise be served stale-while-revalidate, one bar behind
+            fresh = prefetch_histories([symbol], period=tail, interval=BASE_INTERVAL, force=True)[symbol]
+            changed_from = fresh.index[0] if not fresh.empty else None
+        period = BASE_PERIOD if changed_from is None else tail
+        served = get_history.freshness(symbol, period=period, interval=BASE_INTERVAL)
+        upstream_stale = served is not None and served.stale
+
+        if fresh.empty:
+            self.stale = self.base is not None
+            self.base = self.base if self.base is not None else fresh
+            self.next_refresh = now_ist() + pd.Timedelta(seconds=RETRY_S)
+            return
+
+        if changed_from is None:
+            self.base, self.derived = fresh, {}
+        else:
+            # merged tails would otherwise grow the series for as long as the server runs
+            self.base = trim_period(pd.concat([self.base[self.base.index < changed_from], fresh]), BASE_PERIOD)
+            start = self.base.index[0]
+            for iv, df in self.derived.items():
+                df = self._cut(df, changed_from)
+                self.derived[iv] = df[df.index >= start]
+        if upstream_stale:          # fetch failed, cache fell back to old bars: retry soon
+            self.fetched_at = served.as_of
+            self.stale = True
+            self.next_refresh = now_ist() + pd.Timedelta(seconds=RETRY_S)
+            return
+        self.fetched_at = time.time()
+        self.stale = False
+        self.next_refresh = next_bar_boundary(BASE_INTERVAL)
+
+    @staticmethod
+    def _cut(derived: pd.DataFrame, changed_from) -> pd.DataFrame:
+        """Drop the bins at or after the one containing *changed_from*."""
+        starts = derived.index[derived.index <= changed_from]
+        return derived[derived.index < starts[-1]] if len(starts) else derived.iloc[:0]
+
+    def view(self, interval: str) -> pd.DataFrame:
+        if interval == BASE_INTERVAL or self.base.empty:
+            return self.base
+        done = self.derived.get(interval)
+        if done is None or done.empty:
+            out = resample_bars(self.base, interval)
+        else:
+            # re-aggregate only from the last kept bin onwards
+            tail = self.base[self.base.index >= done.index[-1]]
+            out = pd.concat([done.iloc[:-1], resample_bars(tail, interval)])
+        self.derived[interval] = out
+        return out
+
+    def measure(self) -> int:
+        self.nbytes = approx_bytes(self.base) + sum(approx_bytes(d) for d in self.derived.values())
+        return self.nbytes
+
+
+_store: "OrderedDict[str, _Series]" = OrderedDict()
+_store_lock = threading.Lock()
+_evictions = 0
+
+
+def _series(symbol: str) -> _Series:
+    with _store_lock:
+        series = _store.get(symbol)
+        if series is None:
+            series = _store[symbol] = _Series()
+            while len(_store) > MAX_SERIES:
+                _store.popitem(last=False)
+        _store.move_to_end(symbol)
+    return series
+
+
+def _enforce_cap(keep: str) -> None:
+    """Drop the least recently used series (never *keep*) until the store fits ``MAX_BYTES``."""
+    global _evictions
+    with _store_lock:
+        held = sum(s.nbytes for s in _store.values())
+        for symbol in list(_store):
+            if held <= MAX_BYTES:
+                break
+            if symbol != keep:
+                held -= _store.pop(symbol).nbytes
+                _evictions += 1
+
+
+# ────────────────────────────────────────────────────────────────────
+# Public entry points
+# ────────────────────────────────────────────────────────────────────
+
+
+@traced("resample.bars")
+def get_bars(symbol: str, interval: str = "5m", period: str = "2d") -> pd.DataFrame:
+    """
+    *symbol* as for ``get_history`` (add ``.NS`` for NSE equities). Intraday
+    intervals are served from the 5m store, daily and longer from one
+    shared daily series.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"Unsupported interval {interval!r}; expected one of {INTERVALS}")
+    if interval not in INTRADAY:
+        daily = get_history(symbol, period=_daily_source(symbol, period), interval="1d")
+        daily = trim_period(daily, period)
+        return daily if interval == "1d" else resample_bars(daily, interval)
+
+    series = _series(symbol)
+    with series.lock:
+        if series.expired():
+            series.refresh(symbol)
+        bars = series.view(interval)
+        series.measure()
+    _enforce_cap(symbol)
+    return trim_period(bars, period, sessions=True).copy()
+
+
+def bar_freshness(symbol: str, interval: str, period: str) -> Optional[Freshness]:
+    if interval not in INTRADAY:
+        return get_history.freshness(symbol, period=_daily_source(symbol, period), interval="1d")
+    with _store_lock:
+        series = _store.get(symbol)
+    if series is None or not series.fetched_at:
+        return None
+    return Freshness(series.fetched_at, series.stale)
+
+
+def stats() -> dict:
+    with _store_lock:
+        series = list(_store.values())
+    return {
+        "series": len(series),
+        "base_rows": sum(len(s.base) for s in series if s.base is not None),
+        "derived_rows": sum(len(d) for s in series for d in s.derived.values()),
+        "bytes": sum(s.nbytes for s in series),
+        "max_bytes": MAX_BYTES,
+        "evictions": _evictions,
+    }
+
+
+def clear() -> None:
+    with _store_lock:
+        _store.clear()
+
+
+__all__ = [
+    "INTERVALS", "resample_bars", "period_days", "trim_period", "get_bars", "bar_freshness",
+    "stats", "clear",
+]
@@ -0,0 +1,198 @@
+"""
+common.risk
+~~~~~~~~~~~
+Beta, correlation and idiosyncratic volatility of every symbol against
+NIFTY 50 and its sector index.
+
+``nightly.py`` builds the aligned daily return matrix (dates × symbols)
+and ``rolling_risk`` computes all rolling moments for all symbols at once
+from windowed means of r, b, r·b, r² and b² – there is no per-symbol loop.
+Days a stock did not trade are masked out of the benchmark moments too,
+so each pair is estimated over the same dates.
+
+The latest value per (symbol, benchmark, window) is stored in the
+``RiskStats`` table of nse.db; the app only reads it.
+
+Functions
+---------
+sector_benchmark(big_sector, industry) -> str | None
+    Sector index ticker used for a company.
+return_matrix(closes) -> DataFrame
+    Daily simple returns, dates × symbols.
+rolling_risk(returns, benchmark, window) -> dict[str, DataFrame]
+    Rolling beta / correlation / annualised idiosyncratic vol.
+compute_risk_stats(closes, benchmarks, sectors, windows=WINDOWS) -> DataFrame
+    Latest values in RiskStats layout.
+risk_stats() -> DataFrame
+    The stored table (cached until nse.db changes).
+risk_for(symbol, window=126) -> DataFrame
+    RiskStats rows for one symbol.
+screen(max_corr=0.3, window=126, benchmark=MARKET_INDEX) -> DataFrame
+    Symbols whose correlation with *benchmark* is at most *max_corr*.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+from common.cache import cached
+from common.sql import ENGINE, db_stamp
+from common.telemetry import traced
+
+TABLE = "RiskStats"
+MARKET_INDEX = "^NSEI"
+WINDOWS = (63, 126, 252)        # ~3, 6 and 12 months of sessions
+TRADING_DAYS = 252
+COLUMNS = ["Symbol", "Benchmark", "Window", "Beta", "Correlation", "IdioVol", "Obs", "AsOf"]
+MIN_OBS_SHARE = 0.8             # of the window, before a value is reported
+
+# Industry first (narrower), then the broad sector.
+INDUSTRY_INDEX = {
+    "Banks - Regional": "^NSEBANK",
+    "Automobile & Auto Components": "^CNXAUTO",
+    "Pharmaceuticals & Biotechnology": "^CNXPHARMA",
+    "IT - Services": "^CNXIT",
+    "IT - Software": "^CNXIT",
+    "IT - Hardware": "^CNXIT",
+    "Realty": "^CNXREALTY",
+    "Ferrous Metals": "^CNXMETAL",
+    "Non - Ferrous Metals": "^CNXMETAL",
+}
+SECTOR_INDEX = {
+    "Information Technology": "^CNXIT",
+    "Fast Moving consumer goods": "^CNXFMCG",
+    "Healthcare": "^CNXPHARMA",
+    "Energy": "^CNXENERGY",
+}
+
+
+def sector_benchmark(big_sector, industry) -> Optional[str]:
+    return INDUSTRY_INDEX.get(industry) or SECTOR_INDEX.get(big_sector)
+
+
+# ────────────────────────────────────────────────────────────────────
+# Computation
+# ────────────────────────────────────────────────────────────────────
+
+
+def return_matrix(closes: pd.DataFrame) -> pd.DataFrame:
+    """Simple daily returns; gaps stay NaN rather than being forward-filled."""
+    closes = closes.sort_index()
+    return closes.pct_change(fill_method=None).iloc[1:]
+
+
+def rolling_risk(returns: pd.DataFrame, benchmark: pd.Series, window: int) -> Dict[str, pd.DataFrame]:
+    """Rolling beta, correlation and idiosyncratic vol of every column vs *benchmark*."""
+    b = benchmark.reindex(returns.index)
+    valid = returns.notna() & b.notna().to_numpy()[:, None]
+    r = returns.where(valid)
+    bm = pd.DataFrame(
+        np.where(valid, b.to_numpy()[:, None], np.nan), index=returns.index, columns=returns.columns
+    )
+
+    roll = dict(window=window, min_periods=int(window * MIN_OBS_SHARE))
+    mean_r = r.rolling(**roll).mean()
+    mean_b = bm.rolling(**roll).mean()
+    cov = (r * bm).rolling(**roll).mean() - mean_r * mean_b
+    var_r = (r * r).rolling(**roll).mean() - mean_r ** 2
+    var_b = (bm * bm).rolling(**roll).mean() - mean_b ** 2
+
+    var_b = var_b.where(var_b > 0)
+    beta = cov / var_b
+    corr = cov / np.sqrt(var_r.where(var_r > 0) * var_b)
+    idio = np.sqrt((var_r - beta * cov).clip(lower=0) * TRADING_DAYS)
+    return {
+        "Beta": beta,
+        "Correlation": corr.clip(-1, 1),
+        "IdioVol": idio,
+        "Obs": r.notna().astype(int).rolling(window, min_periods=1).sum(),
+    }
+
+
+@traced("risk.compute")
+def compute_risk_stats(
+    closes: pd.DataFrame,
+    benchmarks: pd.DataFrame,
+    sectors: pd.Series,
+    windows=WINDOWS,
+) -> pd.DataFrame:
+    """
+    *closes*: dates × symbols; *benchmarks*: dates × index tickers;
+    *sectors*: symbol → sector index ticker (or NaN).
+    """
+    returns = return_matrix(closes)
+    bench_returns = return_matrix(benchmarks).reindex(returns.index)
+    as_of = returns.index.max()
+
+    mapped = sectors.dropna()
+    groups = {MARKET_INDEX: list(returns.columns)}
+    for index, syms in mapped.groupby(mapped).groups.items():
+        groups[index] = [s for s in syms if s in returns.columns]
+
+    frames = []
+    for index, syms in groups.items():
+        if index not in bench_returns.columns or not syms:
+            continue
+        for window in windows:
+            stats = rolling_risk(returns[syms], bench_returns[index], window)
+            latest = pd.DataFrame({name: df.iloc[-1] for name, df in stats.items()})
+            latest = latest.dropna(subset=["Beta"])
+            latest.index.name = "Symbol"
+            frames.append(latest.reset_index().assign(Benchmark=index, Window=window))
+
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    out = pd.concat(frames, ignore_index=True).assign(AsOf=pd.Timestamp(as_of).date().isoformat())
+    out["Obs"] = out["Obs"].astype(int)
+    out = out.round({"Beta": 4, "Correlation": 4, "IdioVol": 4})
+    return out[COLUMNS]
+
+
+def write_risk_stats(stats: pd.DataFrame, engine=ENGINE) -> None:
+    stats.to_sql(TABLE, engine, if_exists="replace", index=False)
+    with engine.begin() as conn:
+        conn.execute(sa.text(
+            f'CREATE INDEX IF NOT EXISTS ix_{TABLE}_symbol ON "{TABLE}" (Symbol, Window)'
+        ))
+
+
+# ────────────────────────────────────────────────────────────────────
+# Lookups
+# ────────────────────────────────────────────────────────────────────
+
+
+@cached("risk.stats", max_entries=2)
+def _load_risk_stats(stamp: int) -> pd.DataFrame:
+    try:
+        return pd.read_sql(f'SELECT * FROM "{TABLE}"', ENGINE)
+    except (sa.exc.OperationalError, pd.errors.DatabaseError):    # nightly job not run yet
+        return pd.DataFrame(columns=COLUMNS)
+
+
+def risk_stats() -> pd.DataFrame:
+    """The whole RiskStats table, re-read only when nse.db changes."""
+    return _load_risk_stats(db_stamp())
+
+
+def risk_for(symbol: str, window: int = 126) -> pd.DataFrame:
+    """Market and sector rows for *symbol* (no '.NS' suffix); empty if not computed."""
+    df = risk_stats()
+    return df[(df["Symbol"] == symbol) & (df["Window"] == window)].reset_index(drop=True)
+
+
+def screen(max_corr: float = 0.3, window: int = 126, benchmark: str = MARKET_INDEX) -> pd.DataFrame:
+    """Least market-correlated names first."""
+    df = risk_stats()
+    hits = df[(df["Benchmark"] == benchmark) & (df["Window"] == window)
+              & (df["Correlation"] <= max_corr)]
+    return hits.sort_values("Correlation").reset_index(drop=True)
+
+
+__all__ = [
+    "MARKET_INDEX", "WINDOWS", "sector_benchmark", "return_matrix", "rolling_risk",
+    "compute_risk_stats", "write_risk_stats", "risk_stats", "risk_for", "screen",
+]
@@ -1,10 +1,21 @@
 # common/sql.py
+import hashlib
+import os
+
 import pandas as pd
 import sqlalchemy as sa
 
+from common.cache import cached
+from common.telemetry import traced
+
 DB_PATH = "nse.db"
 ENGINE = sa.create_engine(f"sqlite:///{DB_PATH}", future=True)
 
+# Tables whose contents define a dataset snapshot (see ``dataset_version``).
+SNAPSHOT_TABLES = ("DimCompany", "FactFundamentals")
+
+_version_memo: dict = {}
+
 def list_tables():
     """Return all table names in the DB (for debugging)."""
     with ENGINE.connect() as conn:
@@ -16,8 +27,74 @@ def preview(table_name: str, n: int = 5):
     """Preview any table."""
     return pd.read_sql(f"SELECT * FROM {table_name} LIMIT {n}", ENGINE)
 
+# ------------------------------------------------------------------
+# Dataset snapshot ID
+# ------------------------------------------------------------------
+def compute_snapshot_id(engine=ENGINE) -> str:
+    """Content hash of the snapshot tables, independent of row order."""
+    digest = hashlib.sha256()
+    for table in SNAPSHOT_TABLES:
+        df = pd.read_sql(f'SELECT * FROM "{table}"', engine)
+        df = df.sort_values("Symbol", kind="stable").reset_index(drop=True)
+        digest.update(table.encode())
+        digest.update(",".join(df.columns).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+def record_snapshot(engine=ENGINE) -> str:
+    """Store the current snapshot ID in ``DatasetMeta`` and return it."""
+    snapshot_id = compute_snapshot_id(engine)
+    meta = pd.DataFrame([
+        {"Key": "snapshot_id", "Value": snapshot_id},
+        {"Key": "created_at",  "Value": pd.Timestamp.now(tz="UTC").isoformat()},
+    ])
+    meta.to_sql("DatasetMeta", engine, if_exists="replace", index=False)
+    return snapshot_id
+
+def db_stamp() -> int:
+    """mtime of nse.db – keys caches of tables the nightly job rewrites."""
+    try:
+        return os.stat(DB_PATH).st_mtime_ns
+    except OSError:
+        return 0
+
+def dataset_version() -> str:
+    """
+    Snapshot ID of the data in nse.db, as recorded by bootstrap_db.py.
+
+    Cheap enough to call on every rerun: the DB is only re-read when the
+    file's mtime/size change. Older databases without ``DatasetMeta``
+    fall back to hashing the tables once.
+    """
+    try:
+        stat = os.stat(DB_PATH)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return "missing"
+
+    if stamp not in _version_memo:
+        try:
+            with ENGINE.connect() as conn:
+                row = conn.execute(sa.text(
+                    "SELECT Value FROM DatasetMeta WHERE Key = 'snapshot_id'"
+                )).first()
+            version = row[0] if row else compute_snapshot_id()
+        except sa.exc.OperationalError:  # no DatasetMeta table yet
+            version = compute_snapshot_id()
+        _version_memo.clear()
+        _version_memo[stamp] = version
+    return _version_memo[stamp]
+
+# ------------------------------------------------------------------
+# Loaders
+# ------------------------------------------------------------------
+@traced("sql.load_master")
 def load_master() -> pd.DataFrame:
     """Join DimCompany and FactFundamentals on Symbol."""
+    return _load_master(dataset_version())
+
+@cached("sql.load_master", max_entries=2)
+def _load_master(snapshot: str) -> pd.DataFrame:
     sql = """
         SELECT
             d.Symbol,
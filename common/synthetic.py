@@ -0,0 +1,311 @@
+"""
+common.synthetic
+~~~~~~~~~~~~~~~~
+Deterministic, offline stand-in for yfinance.
+
+Every symbol gets its own seeded random walk, so the same symbol always
+produces the same bars, fundamentals, statements and analyst ratings –
+no network, no API limits. Used by the benchmark suite and for demos
+(``STOCK_ANALYZER_PROVIDER=synthetic``).
+
+* Daily bars: business days from 2005 up to ``anchor`` (default: today).
+* Intraday bars: 5-minute NSE session bars (09:15–15:30 IST) for the
+  last 60 sessions; 15m/30m/60m/90m are aggregated from them.
+"""
+
+from __future__ import annotations
+
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+TZ = "Asia/Kolkata"
+DAILY_START = "2005-01-03"
+INTRADAY_SESSIONS = 60
+BARS_PER_SESSION = 75                     # 5-minute bars, 09:15 → 15:25 open times
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=15)
+MEMO_SYMBOLS = 256                        # generated bar sets kept per provider (LRU)
+
+OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+INTRADAY_RULES = {"5m": "5min", "15m": "15min", "30m": "30min",
+                  "60m": "60min", "1h": "60min", "90m": "90min"}
+
+SECTORS = {
+    "Technology":         "software services cloud consulting digital platforms analytics outsourcing",
+    "Financial Services": "banking lending deposits credit cards insurance loans wealth asset management",
+    "Healthcare":         "pharmaceuticals generics formulations hospitals diagnostics drugs api",
+    "Consumer Defensive": "foods beverages personal care household products fmcg brands distribution",
+    "Industrials":        "engineering construction capital goods machinery infrastructure projects",
+    "Basic Materials":    "chemicals steel cement metals mining specialty fertilizers polymers",
+    "Energy":             "oil gas refining petroleum exploration power generation pipelines",
+    "Consumer Cyclical":  "automobiles auto components retail apparel textiles two wheelers dealers",
+}
+_COMMON_WORDS = "company india limited operates segments products customers services markets based incorporated"
+
+
+def _seed(symbol: str, salt: int = 0) -> int:
+    return zlib.crc32(symbol.upper().encode()) ^ (salt * 0x9E3779B1 & 0xFFFFFFFF)
+
+
+def _parse_period(period: Optional[str], anchor: pd.Timestamp) -> Optional[pd.Timestamp]:
+    """Start timestamp for a yfinance-style period string (None = everything)."""
+    if period is None or period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=anchor.year, month=1, day=1, tz=TZ)
+    num = int("".join(ch for ch in period if ch.isdigit()) or 1)
+    unit = period.lstrip("0123456789")
+    if unit == "d":
+        return (anchor - pd.offsets.BDay(num - 1)).normalize()
+    if unit == "wk":
+        return anchor - pd.DateOffset(weeks=num)
+    if unit == "mo":
+        return anchor - pd.DateOffset(months=num)
+    if unit == "y":
+        return anchor - pd.DateOffset(years=num)
+    raise ValueError(f"Unsupported period {period!r}")
+
+
+class SyntheticTicker:
+    """yfinance.Ticker look-alike backed by ``SyntheticProvider``."""
+
+    def __init__(self, provider: "SyntheticProvider", symbol: str):
+        self._p = provider
+        self.ticker = symbol
+
+    def history(self, period: Optional[str] = "1mo", interval: str = "1d",
+                start=None, end=None, auto_adjust: bool = True, **_) -> pd.DataFrame:
+        return self._p.history(self.ticker, period=period, interval=interval, start=start, end=end)
+
+    @property
+    def info(self) -> dict:
+        return self._p.info(self.ticker)
+
+    @property
+    def financials(self) -> pd.DataFrame:
+        return self._p.financials(self.ticker)
+
+    @property
+    def cashflow(self) -> pd.DataFrame:
+        return self._p.cashflow(self.ticker)
+
+    @property
+    def recommendations(self) -> pd.DataFrame:
+        return self._p.recommendations(self.ticker)
+
+
+class SyntheticProvider:
+    name = "synthetic"
+    offline = True
+
+    def __init__(self, anchor=None):
+        anchor = pd.Timestamp(anchor) if anchor is not None else pd.Timestamp.now(tz=TZ)
+        anchor = anchor.tz_localize(TZ) if anchor.tzinfo is None else anchor.tz_convert(TZ)
+        if anchor.weekday() >= 5:
+            anchor = anchor - pd.offsets.BDay(1)
+        self.anchor = anchor.normalize()
+        self._days = pd.bdate_range(DAILY_START, self.anchor.tz_localize(None), name="Date").tz_localize(TZ)
+        self._daily: OrderedDict = OrderedDict()
+        self._intraday: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ── yfinance-compatible surface ─────────────────────────────────
+    def Ticker(self, symbol: str) -> SyntheticTicker:
+        return SyntheticTicker(self, symbol)
+
+    def download(self, tickers, period: str = "1mo", interval: str = "1d",
+                 group_by: str = "column", start=None, end=None,
+                 multi_level_index: bool = True, **_) -> pd.DataFrame:
+        if isinstance(tickers, str):
+            tickers = tickers.replace(",", " ").split()
+        frames = {
+            t: self.history(t, period=period, interval=interval, start=start, end=end)[OHLCV]
+            for t in tickers
+        }
+        if len(frames) == 1 and not multi_level_index:
+            return next(iter(frames.values()))
+        out = pd.concat(frames, axis=1)                      # (ticker, field)
+        if group_by != "ticker":
+            out = out.swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+        return out
+
+    # ── bars ────────────────────────────────────────────────────────
+    def history(self, symbol: str, period: Optional[str] = "1mo", interval: str = "1d",
+                start=None, end=None) -> pd.DataFrame:
+        if interval == "1d":
+            df = self._daily_bars(symbol)
+        elif interval in ("1wk", "1mo"):
+            rule = "W-FRI" if interval == "1wk" else "MS"
+            df = self._resample(self._daily_bars(symbol), rule)
+        elif interval in INTRADAY_RULES:
+            df = self._intraday_bars(symbol)
+            if interval != "5m":
+                df = self._resample(df, INTRADAY_RULES[interval], offset="15min")
+        else:
+            return pd.DataFrame(columns=OHLCV + ["Dividends", "Stock Splits"])
+
+        if start is not None or end is not None:
+            if start is not None:
+                df = df[df.index >= pd.Timestamp(start).tz_localize(TZ)]
+            if end is not None:
+                df = df[df.index < pd.Timestamp(end).tz_localize(TZ)]
+        else:
+            since = _parse_period(period, self.anchor)
+            if since is not None:
+                df = df[df.index >= since]
+        return df.copy()
+
+    @staticmethod
+    def _resample(df: pd.DataFrame, rule: str, offset=None) -> pd.DataFrame:
+        agg = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum",
+               "Dividends": "sum", "Stock Splits": "sum"}
+        out = df.resample(rule, offset=offset).agg(agg)
+        return out.dropna(subset=["Open"])
+
+    def _memo_get(self, memo: OrderedDict, symbol: str):
+        with self._lock:
+            df = memo.get(symbol)
+            if df is not None:
+                memo.move_to_end(symbol)
+            return df
+
+    def _memo_put(self, memo: OrderedDict, symbol: str, df: pd.DataFrame) -> None:
+        with self._lock:
+            memo[symbol] = df
+            while len(memo) > MEMO_SYMBOLS:
+                memo.popitem(last=False)
+
+    def _daily_bars(self, symbol: str) -> pd.DataFrame:
+        cached = self._memo_get(self._daily, symbol)
+        if cached is not None:
+            return cached
+
+        rng = np.random.default_rng(_seed(symbol))
+        idx = self._days
+        n = len(idx)
+        mu, sigma = rng.normal(4e-4, 2e-4), rng.uniform(0.01, 0.03)
+        close = rng.uniform(50, 3000) * np.exp(np.cumsum(rng.normal(mu, sigma, n)))
+        open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, sigma / 3, n))
+        wick = np.abs(rng.normal(0, sigma / 2, (2, n)))
+        df = pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + wick[0]),
+            "Low": np.minimum(open_, close) * (1 - wick[1]),
+            "Close": close,
+            "Volume": rng.lognormal(12, 1, n).astype(np.int64),
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        }, index=idx)
+
+        self._memo_put(self._daily, symbol, df)
+        return df
+
+    def _intraday_bars(self, symbol: str) -> pd.DataFrame:
+        cached = self._memo_get(self._intraday, symbol)
+        if cached is not None:
+            return cached
+
+        daily = self._daily_bars(symbol).tail(INTRADAY_SESSIONS)
+        rng = np.random.default_rng(_seed(symbol, salt=5))
+        d, k = len(daily), BARS_PER_SESSION
+
+        # Brownian bridge from each session's open to its close
+        steps = rng.normal(0, 1, (d, k)).cumsum(axis=1)
+        t = np.arange(1, k + 1) / k
+        bridge = steps - t * steps[:, -1:]
+        o, c = daily["Open"].to_numpy()[:, None], daily["Close"].to_numpy()[:, None]
+        scale = (daily["High"] - daily["Low"]).to_numpy()[:, None] / (4 * np.sqrt(k))
+        path = o + (c - o) * t + bridge * scale
+        opens = np.concatenate([o, path[:, :-1]], axis=1)
+        wick = np.abs(rng.normal(0, 1, (2, d, k))) * scale / 2
+
+        stamps = (daily.index.tz_localize(None).values[:, None]
+                  + (SESSION_OPEN + pd.to_timedelta(np.arange(k) * 5, unit="min")).values[None, :])
+        vol = (daily["Volume"].to_numpy()[:, None] / k * rng.uniform(0.5, 1.5, (d, k))).astype(np.int64)
+        df = pd.DataFrame({
+            "Open": opens.ravel(),
+            "High": (np.maximum(opens, path) + wick[0]).ravel(),
+            "Low": (np.minimum(opens, path) - wick[1]).ravel(),
+            "Close": path.ravel(),
+            "Volume": vol.ravel(),
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        }, index=pd.DatetimeIndex(stamps.ravel(), name="Datetime").tz_localize(TZ))
+
+        self._memo_put(self._intraday, symbol, df)
+        return df
+
+    # ── fundamentals & statements ───────────────────────────────────
+    def _sector(self, symbol: str) -> str:
+        names = list(SECTORS)
+        return names[_seed(symbol, salt=1) % len(names)]
+
+    def info(self, symbol: str) -> dict:
+        rng = np.random.default_rng(_seed(symbol, salt=2))
+        base = symbol.split(".")[0]
+        price = float(self._daily_bars(symbol)["Close"].iloc[-1])
+        sector = self._sector(symbol)
+        pe = float(rng.uniform(6, 80))
+        shares = float(rng.uniform(2e7, 5e9))
+        words = SECTORS[sector].split() + _COMMON_WORDS.split()
+        summary = " ".join(rng.choice(words, size=40))
+
+        def maybe(v):                     # ~5 % of fields missing, like real Yahoo data
+            return None if rng.random() < 0.05 else v
+
+        return {
+            "symbol": symbol,
+            "longName": f"{base} Limited",
+            "sector": sector,
+            "currentPrice": round(price, 2),
+            "trailingPE": maybe(pe),
+            "trailingEps": maybe(price / pe),
+            "profitMargins": maybe(float(rng.uniform(-0.05, 0.35))),
+            "returnOnEquity": maybe(float(rng.uniform(-0.05, 0.40))),
+            "debtToEquity": maybe(float(rng.uniform(0, 250))),
+            "dividendYield": maybe(float(rng.uniform(0, 4))),
+            "freeCashflow": maybe(float(rng.normal(5e9, 5e9))),
+            "marketCap": price * shares,
+            "sharesOutstanding": shares,
+            "longBusinessSummary": f"{base} Limited {summary}.",
+        }
+
+    def _fiscal_years(self) -> pd.DatetimeIndex:
+        last = self.anchor.year - (1 if self.anchor.month <= 3 else 0)
+        return pd.DatetimeIndex([pd.Timestamp(year=y, month=3, day=31) for y in range(last, last - 4, -1)])
+
+    def financials(self, symbol: str) -> pd.DataFrame:
+        rng = np.random.default_rng(_seed(symbol, salt=3))
+        cols = self._fiscal_years()
+        revenue = rng.uniform(5e9, 5e11) / np.cumprod(np.r_[1, rng.uniform(1.0, 1.25, len(cols) - 1)])
+        margin = rng.uniform(-0.05, 0.3, len(cols))
+        return pd.DataFrame(
+            [revenue, revenue * margin, revenue * (margin + 0.05)],
+            index=["Total Revenue", "Net Income", "Operating Income"],
+            columns=cols,
+        )
+
+    def cashflow(self, symbol: str) -> pd.DataFrame:
+        rng = np.random.default_rng(_seed(symbol, salt=4))
+        cols = self._fiscal_years()
+        ocf = rng.uniform(1e8, 5e10, len(cols))
+        capex = -ocf * rng.uniform(0.1, 0.8, len(cols))
+        return pd.DataFrame(
+            [ocf + capex, ocf, capex],
+            index=["Free Cash Flow", "Operating Cash Flow", "Capital Expenditure"],
+            columns=cols,
+        )
+
+    def recommendations(self, symbol: str) -> pd.DataFrame:
+        rng = np.random.default_rng(_seed(symbol, salt=6))
+        counts = rng.integers(0, 12, (4, 5))
+        df = pd.DataFrame(counts, columns=["strongBuy", "buy", "hold", "sell", "strongSell"])
+        df.insert(0, "period", ["0m", "-1m", "-2m", "-3m"])
+        return df
+
+
+__all__ = ["SyntheticProvider", "SyntheticTicker"]
@@ -0,0 +1,285 @@
+"""
+common.telemetry
+~~~~~~~~~~~~~~~~
+Lightweight, process-wide timing spans.
+
+    with span("peers.tfidf_fit"):
+        ...
+
+    @traced("finance.industry_averages")
+    def _industry_averages(...): ...
+
+Each span name gets a latency histogram plus call/error counters. Spans
+opened inside another span (same thread) are recorded as its children,
+and the last few root spans are kept as traces for the diagnostics page.
+Upstream provider calls are counted separately by method (see
+common.provider).
+
+Exports
+-------
+snapshot() -> DataFrame          per-span count / errors / latency summary
+upstream_snapshot() -> DataFrame per-method upstream calls and errors
+recent_traces() -> list          latest root spans with their children
+prometheus_text() -> str         Prometheus text exposition format
+register_collector(fn)           add lines from another module (e.g. cache stats)
+
+``STOCK_ANALYZER_METRICS_PORT=<port>`` additionally serves
+``prometheus_text()`` at ``http://<host>:<port>/metrics``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+import pandas as pd
+
+ENV_METRICS_PORT = "STOCK_ANALYZER_METRICS_PORT"
+METRIC_PREFIX = "stock_analyzer"
+
+# seconds – tuned for page work: 1 ms … 30 s
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TRACE_HISTORY = 50
+
+_lock = threading.Lock()
+_local = threading.local()
+_spans: dict = {}
+_upstream: dict = {}
+_traces: deque = deque(maxlen=TRACE_HISTORY)
+_collectors: list = []
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count", "errors", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)     # last slot = +Inf
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float, error: bool) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.errors += error
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound containing quantile *q* (Prometheus-style estimate)."""
+        if not self.count:
+            return float("nan")
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+# ────────────────────────────────────────────────────────────────────
+# Recording
+# ────────────────────────────────────────────────────────────────────
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block under *name*; exceptions count as errors."""
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    node = {"name": name, "start": time.time(), "ms": None, "error": False, "children": []}
+    if stack:
+        stack[-1]["children"].append(node)
+    stack.append(node)
+
+    t0 = time.perf_counter()
+    error = False
+    try:
+        yield node
+    except BaseException as exc:
+        # Streamlit's st.stop()/rerun use exceptions for control flow
+        error = type(exc).__name__ not in ("StopException", "RerunException")
+        raise
+    finally:
+        elapsed = time.perf_counter() - t0
+        node["ms"], node["error"] = elapsed * 1000, error
+        stack.pop()
+        with _lock:
+            hist = _spans.get(name)
+            if hist is None:
+                hist = _spans[name] = _Histogram()
+            hist.observe(elapsed, error)
+            if not stack:
+                _traces.append(node)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator form of ``span``; defaults to ``module.function``."""
+    def wrap(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            with span(label):
+                return func(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def record_upstream(provider: str, method: str, error: bool = False) -> None:
+    with _lock:
+        row = _upstream.setdefault((provider, method), [0, 0])
+        row[0] += 1
+        row[1] += error
+
+
+def register_collector(fn) -> None:
+    """*fn()* returns extra exposition lines appended to ``prometheus_text``."""
+    if fn not in _collectors:
+        _collectors.append(fn)
+
+
+def reset() -> None:
+    with _lock:
+        _spans.clear()
+        _upstream.clear()
+        _traces.clear()
+
+
+# ────────────────────────────────────────────────────────────────────
+# Reading
+# ────────────────────────────────────────────────────────────────────
+
+
+def snapshot() -> pd.DataFrame:
+    with _lock:
+        rows = [
+            {
+                "span": name,
+                "count": h.count,
+                "errors": h.errors,
+                "error_rate": h.errors / h.count if h.count else 0.0,
+                "total_s": h.total,
+                "mean_ms": h.total / h.count * 1000 if h.count else float("nan"),
+                "p50_ms": h.quantile(0.50) * 1000,
+                "p95_ms": h.quantile(0.95) * 1000,
+                "max_ms": h.max * 1000,
+            }
+            for name, h in _spans.items()
+        ]
+    df = pd.DataFrame(rows, columns=["span", "count", "errors", "error_rate", "total_s",
+                                     "mean_ms", "p50_ms", "p95_ms", "max_ms"])
+    return df.sort_values("total_s", ascending=False, ignore_index=True)
+
+
+def upstream_snapshot() -> pd.DataFrame:
+    with _lock:
+        rows = [
+            {"provider": p, "method": m, "calls": c, "errors": e,
+             "error_rate": e / c if c else 0.0}
+            for (p, m), (c, e) in _upstream.items()
+        ]
+    return pd.DataFrame(rows, columns=["provider", "method", "calls", "errors", "error_rate"])
+
+
+def recent_traces() -> list:
+    with _lock:
+        return list(_traces)[::-1]
+
+
+def _labels(**kv) -> str:
+    esc = {k: str(v).replace("\\", "\\\\").replace('"', '\\"') for k, v in kv.items()}
+    return "{" + ",".join(f'{k}="{v}"' for k, v in esc.items()) + "}"
+
+
+def prometheus_text() -> str:
+    """All metrics in the Prometheus text exposition format (v0.0.4)."""
+    p = METRIC_PREFIX
+    out = [
+        f"# HELP {p}_span_seconds Duration of instrumented spans.",
+        f"# TYPE {p}_span_seconds histogram",
+    ]
+    with _lock:
+        spans = {k: (list(h.counts), h.total, h.count, h.errors) for k, h in _spans.items()}
+        upstream = dict(_upstream)
+
+    for name, (counts, total, count, _) in sorted(spans.items()):
+        cum = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), counts):
+            cum += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            out.append(f"{p}_span_seconds_bucket{_labels(span=name, le=le)} {cum}")
+        out.append(f"{p}_span_seconds_sum{_labels(span=name)} {total}")
+        out.append(f"{p}_span_seconds_count{_labels(span=name)} {count}")
+
+    out += [f"# HELP {p}_span_errors_total Spans that exited with an exception.",
+            f"# TYPE {p}_span_errors_total counter"]
+    out += [f"{p}_span_errors_total{_labels(span=n)} {v[3]}" for n, v in sorted(spans.items())]
+
+    out += [f"# HELP {p}_upstream_requests_total Calls made to the market-data provider.",
+            f"# TYPE {p}_upstream_requests_total counter"]
+    out += [f"{p}_upstream_requests_total{_labels(provider=pr, method=m)} {c}"
+            for (pr, m), (c, _) in sorted(upstream.items())]
+    out += [f"# HELP {p}_upstream_errors_total Provider calls that raised.",
+            f"# TYPE {p}_upstream_errors_total counter"]
+    out += [f"{p}_upstream_errors_total{_labels(provider=pr, method=m)} {e}"
+            for (pr, m), (_, e) in sorted(upstream.items())]
+    for collect in list(_collectors):
+        out += collect()
+    return "\n".join(out) + "\n"
+
+
+# ────────────────────────────────────────────────────────────────────
+# Optional /metrics endpoint
+# ────────────────────────────────────────────────────────────────────
+
+_server = None
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> None:
+    """Serve ``prometheus_text()`` on a daemon thread (idempotent)."""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with _lock:
+        if _server is not None:
+            return
+        _server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+
+
+if os.environ.get(ENV_METRICS_PORT):
+    try:
+        start_metrics_server(int(os.environ[ENV_METRICS_PORT]))
+    except OSError:             # port taken (e.g. a second process) – keep running
+        pass
+
+
+__all__ = [
+    "span", "traced", "record_upstream", "register_collector", "reset",
+    "snapshot", "upstream_snapshot", "recent_traces", "prometheus_text",
+    "start_metrics_server",
+]
@@ -0,0 +1,136 @@
+"""
+common.universe
+~~~~~~~~~~~~~~~
+One compact, process-wide view of the NSE symbol universe.
+
+The frame joins DimCompany and FactFundamentals once per dataset snapshot
+and is shared by every session through ``st.cache_resource`` – treat it as
+read-only (``.copy()`` before mutating).
+
+* Sector / Industry / Series are categoricals, metrics are float32.
+* ``Description`` (≈2 MB of text) is *not* part of the frame; it is loaded
+  on first use by ``descriptions()`` / ``with_descriptions()``.
+
+Functions
+---------
+get_universe() -> Universe
+    The shared universe for the current dataset snapshot.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+import streamlit as st
+
+from common.sql import ENGINE, dataset_version
+from common.telemetry import span, traced
+
+CSV_NAMES = "data/nse_stocks_.csv"
+
+CATEGORICAL_COLS = ["Series", "Big Sectors", "Industry"]
+METRIC_COLS = ["PE Ratio", "EPS", "ROE", "ProfitMargin", "DebtToEquity", "MarketCap"]
+
+
+class Universe:
+    """Symbol universe with lazily attached company descriptions."""
+
+    def __init__(self, frame: pd.DataFrame, snapshot: str):
+        self.frame = frame
+        self.snapshot = snapshot
+        self._descriptions: Optional[pd.Series] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def names(self) -> pd.DataFrame:
+        """Symbol ↔ company-name lookup."""
+        return self.frame[["Symbol", "Company Name"]]
+
+    def industry_of(self, symbol: str) -> Optional[str]:
+        hit = self.frame.loc[self.frame["Symbol"] == symbol, "Industry"]
+        return None if hit.empty or pd.isna(hit.iat[0]) else str(hit.iat[0])
+
+    def descriptions(self) -> pd.Series:
+        """Description text indexed by Symbol (loaded on first call)."""
+        if self._descriptions is None:
+            with self._lock:
+                if self._descriptions is None:
+                    with span("universe.descriptions"):
+                        df = pd.read_sql(
+                            "SELECT Symbol, Description FROM FactFundamentals", ENGINE
+                        )
+                        self._descriptions = (
+                            df.drop_duplicates("Symbol").set_index("Symbol")["Description"]
+                        )
+        return self._descriptions
+
+    def description(self, symbol: str) -> Optional[str]:
+        text = self.descriptions().get(symbol)
+        return text if isinstance(text, str) and text else None
+
+    def with_descriptions(self) -> pd.DataFrame:
+        """The universe frame plus a ``Description`` column (a new frame)."""
+        return self.frame.join(self.descriptions(), on="Symbol")
+
+
+def _load_series() -> pd.DataFrame:
+    """Series (EQ, BE, …) from the listing CSV, for DBs built before it was stored."""
+    df = pd.read_csv(CSV_NAMES, usecols=["Symbol", " SERIES"])
+    return df.rename(columns={" SERIES": "Series"}).drop_duplicates("Symbol")
+
+
+@traced("universe.load")
+def load_universe_frame() -> pd.DataFrame:
+    """Read the compact universe frame straight from nse.db."""
+    with ENGINE.connect() as conn:
+        dim_cols = [row[1] for row in conn.execute(sa.text("PRAGMA table_info(DimCompany)"))]
+    series_sel = 'd.Series,' if "Series" in dim_cols else ""
+
+    sql = f"""
+        SELECT
+            d.Symbol,
+            d.CompanyName     AS "Company Name",
+            {series_sel}
+            d."Big Sectors",
+            d.Industry,
+            f.PERatio         AS "PE Ratio",
+            f.EPS,
+            f.ROE,
+            f.ProfitMargin,
+            f.DebtToEquity,
+            f.MarketCap
+        FROM DimCompany AS d
+        LEFT JOIN FactFundamentals AS f
+        ON d.Symbol = f.Symbol
+    """
+    df = pd.read_sql(sql, ENGINE)
+    if not series_sel:
+        df = df.merge(_load_series(), on="Symbol", how="left")
+
+    for col in CATEGORICAL_COLS:
+        df[col] = df[col].astype("category")
+    for col in METRIC_COLS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float32)
+
+    cols = ["Symbol", "Company Name"] + CATEGORICAL_COLS + METRIC_COLS
+    return df[cols].drop_duplicates("Symbol").reset_index(drop=True)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_universe(snapshot: str) -> Universe:
+    return Universe(load_universe_frame(), snapshot)
+
+
+def get_universe() -> Universe:
+    """Shared universe for the current dataset snapshot."""
+    return _load_universe(dataset_version())
+
+
+__all__ = ["Universe", "get_universe", "load_universe_frame"]
@@ -0,0 +1,168 @@
+"""
+common.watchlist
+~~~~~~~~~~~~~~~~
+Named watchlists with optional holdings, valued in one vectorized pass.
+
+Lists live in their own SQLite file (``watchlists.db``) so rebuilding
+nse.db never touches them. A list is a set of rows Name, Symbol, Qty,
+AvgCost – Qty / AvgCost are optional, a plain watchlist leaves them empty.
+
+Valuation joins the list against frames that are already in memory: the
+universe (EPS → PE at the current price), ``PriceStats`` (all-time high)
+and the daily bars ``prefetch_histories`` brought in with one batched
+download. No per-symbol calls.
+
+Functions
+---------
+list_watchlists() -> list[str]
+load_watchlist(name) -> DataFrame
+    Symbol, Qty, AvgCost, AddedAt.
+save_watchlist(name, holdings) / delete_watchlist(name)
+value_holdings(holdings, closes, universe, price_stats) -> DataFrame
+    Price, Day %, Value, Cost, P&L, P&L %, PE, ATH and From ATH % per row.
+totals(valued) -> dict
+    Portfolio value, cost, P&L and day change.
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import sqlalchemy as sa
+
+WATCHLIST_DB = "watchlists.db"
+ENGINE = sa.create_engine(f"sqlite:///{WATCHLIST_DB}", future=True)
+TABLE = "Watchlists"
+COLUMNS = ["Symbol", "Qty", "AvgCost", "AddedAt"]
+MAX_SYMBOLS = 500
+
+
+# ────────────────────────────────────────────────────────────────────
+# Storage
+# ────────────────────────────────────────────────────────────────────
+
+
+def _ensure_table(conn) -> None:
+    conn.execute(sa.text(f"""
+        CREATE TABLE IF NOT EXISTS "{TABLE}" (
+            Name    TEXT NOT NULL,
+            Symbol  TEXT NOT NULL,
+            Qty     REAL,
+            AvgCost REAL,
+            AddedAt TEXT,
+            PRIMARY KEY (Name, Symbol)
+        )
+    """))
+
+
+def list_watchlists(engine=ENGINE) -> list:
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        rows = conn.execute(sa.text(f'SELECT DISTINCT Name FROM "{TABLE}" ORDER BY Name'))
+        return [r[0] for r in rows]
+
+
+def load_watchlist(name: str, engine=ENGINE) -> pd.DataFrame:
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        df = pd.read_sql(
+            sa.text(f'SELECT {", ".join(COLUMNS)} FROM "{TABLE}" WHERE Name = :n ORDER BY AddedAt, Symbol'),
+            conn, params={"n": name},
+        )
+    return df.astype({"Qty": float, "AvgCost": float})
+
+
+def save_watchlist(name: str, holdings: pd.DataFrame, engine=ENGINE) -> None:
+    """Replace list *name* with *holdings* (Symbol plus optional Qty / AvgCost)."""
+    name = name.strip()
+    if not name:
+        raise ValueError("Watchlist name is empty")
+    df = holdings.reindex(columns=COLUMNS).dropna(subset=["Symbol"])
+    df["Symbol"] = df["Symbol"].astype(str).str.strip().str.upper().str.removesuffix(".NS")
+    df = df[df["Symbol"] != ""].drop_duplicates("Symbol", keep="last")
+    if len(df) > MAX_SYMBOLS:
+        raise ValueError(f"A watchlist holds at most {MAX_SYMBOLS} symbols")
+    df["AddedAt"] = df["AddedAt"].fillna(pd.Timestamp.now(tz="UTC").isoformat())
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        conn.execute(sa.text(f'DELETE FROM "{TABLE}" WHERE Name = :n'), {"n": name})
+        df.assign(Name=name).to_sql(TABLE, conn, if_exists="append", index=False)
+
+
+def delete_watchlist(name: str, engine=ENGINE) -> None:
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        conn.execute(sa.text(f'DELETE FROM "{TABLE}" WHERE Name = :n'), {"n": name})
+
+
+# ────────────────────────────────────────────────────────────────────
+# Valuation
+# ────────────────────────────────────────────────────────────────────
+
+
+def closes_frame(bars: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """``{ticker: bars}`` → one Close column per symbol (``.NS`` stripped)."""
+    closes = {
+        t.removesuffix(".NS"): df["Close"].set_axis(pd.to_datetime(df.index).tz_localize(None).normalize())
+        for t, df in bars.items() if not df.empty
+    }
+    return pd.DataFrame(closes).sort_index() if closes else pd.DataFrame()
+
+
+def value_holdings(
+    holdings: pd.DataFrame,
+    closes: pd.DataFrame,
+    universe: pd.DataFrame,
+    price_stats: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    *closes*: one column per symbol (see ``closes_frame``). *universe*: the
+    universe frame (Symbol, Company Name, EPS). *price_stats*: PriceStats
+    indexed by Symbol. Symbols missing from any input come out as NaN.
+    """
+    out = holdings[["Symbol", "Qty", "AvgCost"]].set_index("Symbol")
+    filled = closes.reindex(columns=out.index).ffill()
+    last = filled.iloc[-1] if len(filled) else pd.Series(np.nan, index=out.index)
+    prev = filled.iloc[-2] if len(filled) > 1 else pd.Series(np.nan, index=out.index)
+
+    info = universe.drop_duplicates("Symbol").set_index("Symbol").reindex(out.index)
+    # today's price may already be above last night's ATH
+    ath = np.fmax(price_stats["ATH"].reindex(out.index).astype(float), last)
+    eps = info["EPS"].astype(float)
+
+    out.insert(0, "Company", info["Company Name"].astype(object))
+    out["Price"] = last
+    out["Day %"] = (last / prev - 1) * 100
+    out["Value"] = out["Qty"] * last
+    out["Cost"] = out["Qty"] * out["AvgCost"]
+    out["P&L"] = out["Value"] - out["Cost"]
+    out["P&L %"] = (last / out["AvgCost"] - 1) * 100
+    out["PE"] = (last / eps).where(eps > 0)
+    out["ATH"] = ath
+    out["From ATH %"] = (last / ath - 1) * 100
+    return out.reset_index()
+
+
+def totals(valued: pd.DataFrame) -> dict:
+    """Value and day change over rows with a quantity; cost and P&L over those with a cost too."""
+    held = valued.dropna(subset=["Qty", "Price"])
+    costed = held.dropna(subset=["AvgCost"])
+    value = float(held["Value"].sum())
+    cost = float(costed["Cost"].sum())
+    pnl = float(costed["P&L"].sum())
+    prev_value = float((held["Value"] / (1 + held["Day %"].fillna(0) / 100)).sum())
+    return {
+        "value": value,
+        "cost": cost,
+        "pnl": pnl,
+        "pnl_pct": pnl / cost * 100 if cost else None,
+        "day": value - prev_value,
+    }
+
+
+__all__ = [
+    "list_watchlists", "load_watchlist", "save_watchlist", "delete_watchlist",
+    "closes_frame", "value_holdings", "totals",
+]
@@ -0,0 +1,48 @@
+# export.py
+# ------------------------------------------------------------
+# Bulk export for notebooks and services (see common/export.py):
+#   • DimCompany, FactFundamentals, IndustryStats
+#   • RiskStats, PivotLevels, PriceStats   (if nightly.py has run)
+#   • Bars, Indicators                     (with --bars; partitioned by year)
+#
+# Run:  python export.py OUT_DIR [--format parquet|arrow] [--bars] [--period 2y]
+# Read: common.export.load(OUT_DIR, "Bars", filter=pc.field("Year") >= 2024)
+# (set STOCK_ANALYZER_PROVIDER=synthetic to run offline)
+# ------------------------------------------------------------
+import argparse
+import time
+
+import pandas as pd
+
+from common.export import FORMATS, export_bars, export_tables
+from common.sql import ENGINE
+from nightly import PERIOD, fetch_bars
+
+
+def export(out_dir: str, fmt: str = "parquet", bars: bool = False, period: str = PERIOD,
+           limit: int = None, progress: bool = True) -> dict:
+    t0 = time.perf_counter()
+    entries = export_tables(out_dir, fmt)
+    if bars:
+        symbols = pd.read_sql("SELECT DISTINCT Symbol FROM DimCompany", ENGINE)["Symbol"].dropna()
+        if limit:
+            symbols = symbols.head(limit)
+        wide = fetch_bars([f"{s}.NS" for s in symbols], period, progress)
+        wide.columns = wide.columns.set_levels(wide.columns.levels[1].str.removesuffix(".NS"), level=1)
+        entries.update(export_bars(wide, out_dir, fmt))
+    if progress:
+        for name, entry in entries.items():
+            print(f"✅ {name:<18} {entry['rows']:>10,} rows")
+        print(f"   {fmt} export in {out_dir} ({time.perf_counter() - t0:.1f}s)")
+    return entries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export nse.db tables, bars and indicators")
+    parser.add_argument("out_dir")
+    parser.add_argument("--format", choices=list(FORMATS), default="parquet")
+    parser.add_argument("--bars", action="store_true", help="download and export daily bars + indicators")
+    parser.add_argument("--period", default=PERIOD, help="bar history (yfinance period)")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N symbols' bars")
+    args = parser.parse_args()
+    export(args.out_dir, args.format, args.bars, args.period, args.limit)
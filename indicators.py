@@ -1,5 +1,6 @@
 import pandas as pd
-from pivot_utils import get_previous_period_ohlc, calculate_classic_pivots
+from pivot_utils import TIMEFRAMES, get_pivots
+from common.telemetry import traced
 
 def apply_sma(df: pd.DataFrame, lengths: list) -> pd.DataFrame:
     for sma_len in lengths:
@@ -15,11 +16,13 @@ def apply_sma(df: pd.DataFrame, lengths: list) -> pd.DataFrame:
 
     return df
 
+@traced("indicators.ema")
 def apply_ema(df: pd.DataFrame, lengths: list) -> pd.DataFrame:
     for ema_len in lengths:
         df[f"EMA_{ema_len}"] = df["Close"].ewm(span=ema_len, adjust=False).mean()
     return df
 
+@traced("indicators.smma")
 def apply_smma(df: pd.DataFrame, lengths: list) -> pd.DataFrame:
     for length in lengths:
         df[f"SMMA_{length}"] = calculate_smma(df["Close"], length)
@@ -36,6 +39,7 @@ def calculate_smma(series: pd.Series, length: int) -> pd.Series:
 def compute_sma(df: pd.DataFrame, length: int) -> pd.Series:
     """Compute a single SMA series without modifying original DataFrame."""
     return df["Close"].rolling(window=length).mean()
+@traced("indicators.crossovers")
 def detect_crossovers(df, short_col="EMA_20", long_col="EMA_50"):
     """
     Detect crossover points between short-term and long-term EMAs or SMAs.
@@ -93,6 +97,7 @@ def detect_cross_signals(df: pd.DataFrame) -> str:
 
     return "⚠️ No crossover signals detected at this time."
 
+@traced("indicators.rsi")
 def compute_rsi(df: pd.DataFrame, period: int = 14) -> pd.Series:
     delta = df["Close"].diff()
     gain = delta.where(delta > 0, 0.0)
@@ -105,18 +110,20 @@ def compute_rsi(df: pd.DataFrame, period: int = 14) -> pd.Series:
     rsi = 100 - (100 / (1 + rs))
     return rsi
 
-def get_pivot_lines(df: pd.DataFrame, symbol: str, interval: str):
+PIVOT_TIMEFRAME = {"5m": "D", "15m": "D", "60m": "W", "240m": "W", "1d": "M", "1wk": "M"}
+
+@traced("indicators.pivot_lines")
+def get_pivot_lines(df: pd.DataFrame, symbol: str, interval: str, method: str = "classic"):
+    """Plotly shapes for *symbol*'s (no '.NS') pivots – day levels on 5m/15m, week on hourly, month on daily."""
     pivot_shapes = []
-    pivot_annotations = []
 
-    # Only use previous day OHLC for intraday intervals
-    if interval in ["5m", "15m", "60m", "240m"]:
-        base = get_previous_period_ohlc(symbol)
-    else:
+    timeframe = PIVOT_TIMEFRAME.get(interval)
+    if timeframe is None:
         return [], "⏳ Pivot levels not supported for this interval."
+    base = get_pivots(symbol, timeframe, method)
 
     if base:
-        pivots = calculate_classic_pivots(base["high"], base["low"], base["close"])
+        pivots = base["levels"]
 
         for label, value in pivots.items():
             pivot_shapes.append({
@@ -142,6 +149,7 @@ def get_pivot_lines(df: pd.DataFrame, symbol: str, interval: str):
                 }
             })
 
-        return pivot_shapes, f"📍 Pivot Source: {base['date']} (Prev Day OHLC)"
+        period = TIMEFRAMES[timeframe]
+        return pivot_shapes, f"📍 {method.title()} pivots from the {period} of {base['source']} (previous {period} HLC)"
     else:
         return [], "⚠️ Could not fetch pivot source data."
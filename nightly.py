@@ -0,0 +1,113 @@
+# nightly.py
+# ------------------------------------------------------------
+# After-close batch job. Refreshes in nse.db:
+#   • RiskStats    ← beta / correlation / idiosyncratic vol of every
+#                    symbol vs NIFTY 50 and its sector index
+#                    (63 / 126 / 252-session windows)
+#   • PivotLevels  ← classic / Fibonacci / Camarilla pivots from the
+#                    previous day, week and month, for the next session
+#   • PriceStats   ← last close, 52-week range and all-time high
+#                    (seed the ATH once with --period max)
+#
+# Run:  python nightly.py [--limit N] [--period 2y] [--export DIR]
+# (set STOCK_ANALYZER_PROVIDER=synthetic to run offline)
+# ------------------------------------------------------------
+import argparse
+import time
+
+import pandas as pd
+import sqlalchemy as sa
+from tqdm import tqdm
+
+from common.bars import long_bars
+from common.price_stats import compute_price_stats, read_price_stats, write_price_stats
+from common.provider import download
+from common.risk import MARKET_INDEX, compute_risk_stats, sector_benchmark, write_risk_stats
+from common.sql import DB_PATH
+from pivot_utils import pivot_table, write_pivot_table
+
+BATCH = 100                 # tickers per download() call
+PERIOD = "2y"               # covers the longest window plus warm-up
+
+
+def fetch_bars(tickers, period: str = PERIOD, progress: bool = True) -> pd.DataFrame:
+    """Daily OHLC, columns (field, ticker), in batched downloads."""
+    frames = []
+    batches = [tickers[i:i + BATCH] for i in range(0, len(tickers), BATCH)]
+    for batch in tqdm(batches, desc="Downloading", disable=not progress):
+        try:
+            data = download(batch, period=period, interval="1d", auto_adjust=True,
+                            group_by="column", threads=True)
+        except Exception as exc:
+            print(f"⚠️  batch starting {batch[0]} failed: {exc}")
+            continue
+        if data.empty:
+            continue
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([data.columns, batch[:1]])
+        frames.append(data[["Open", "High", "Low", "Close"]])
+    if not frames:
+        return pd.DataFrame()
+    bars = pd.concat(frames, axis=1)
+    bars.index = pd.to_datetime(bars.index).tz_localize(None).normalize()
+    bars = bars.loc[:, ~bars.columns.duplicated()]
+    return bars.dropna(axis=1, how="all")
+
+
+def nightly(db_path: str = DB_PATH, limit: int = None, period: str = PERIOD,
+            progress: bool = True, export_dir: str = None, export_format: str = "parquet") -> tuple:
+    engine = sa.create_engine(f"sqlite:///{db_path}", future=True, echo=False)
+    dim = pd.read_sql('SELECT Symbol, "Big Sectors", Industry FROM DimCompany', engine)
+    dim = dim.dropna(subset=["Symbol"]).drop_duplicates("Symbol")
+    if limit:
+        dim = dim.head(limit)
+
+    sectors = pd.Series(
+        [sector_benchmark(s, i) for s, i in zip(dim["Big Sectors"], dim["Industry"])],
+        index=dim["Symbol"], dtype=object,
+    )
+    indices = [MARKET_INDEX] + sorted(set(sectors.dropna()))
+
+    t0 = time.perf_counter()
+    bars = fetch_bars([f"{s}.NS" for s in dim["Symbol"]], period, progress)
+    if bars.empty:              # every batch failed: keep yesterday's tables
+        raise SystemExit("❌ No bars downloaded – RiskStats, PivotLevels and PriceStats left unchanged")
+    bars.columns = bars.columns.set_levels(bars.columns.levels[1].str.removesuffix(".NS"), level=1)
+    benchmarks = fetch_bars(indices, period, progress=False)["Close"]
+
+    stats = compute_risk_stats(bars["Close"], benchmarks, sectors)
+    write_risk_stats(stats, engine)
+    if progress:
+        print(f"✅ RiskStats: {len(stats):,} rows for {stats['Symbol'].nunique():,} symbols "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    pivots = pivot_table(long_bars(bars))
+    write_pivot_table(pivots, engine)
+    if progress:
+        print(f"✅ PivotLevels: {len(pivots):,} rows for session {pivots['Date'].iat[0]} "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+    prices = compute_price_stats(bars, previous=read_price_stats(engine))
+    write_price_stats(prices, engine)
+    if progress:
+        print(f"✅ PriceStats: {len(prices):,} symbols")
+
+    if export_dir:
+        from common.export import export_bars       # pyarrow, only needed here
+        entries = export_bars(bars, export_dir, export_format)
+        if progress:
+            print(f"✅ Exported {entries['Bars']['rows']:,} bars to {export_dir}")
+    return stats, pivots, prices
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh RiskStats, PivotLevels and PriceStats in nse.db")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N symbols")
+    parser.add_argument("--period", default=PERIOD, help="history to download (yfinance period)")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--export", metavar="DIR", help="also write the bars and indicators (see export.py)")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet",
+                        help="export format (with --export)")
+    args = parser.parse_args()
+    nightly(args.db, args.limit, args.period, export_dir=args.export, export_format=args.format)
@@ -1,33 +1,27 @@
 import streamlit as st
 import pandas as pd
 
-from common.sql import load_master
-from common.data import load_name_lookup
-from common.display import display_metrics
+from common.memory import guard_session
+from common.profiling import profile_rerun
+from common.universe import get_universe
+from common.display import display_fundamentals_history, display_metrics
 
 
 # ─────────────────────────────
 # Page config
 # ─────────────────────────────
 st.set_page_config(page_title="Fundamentals", page_icon="", layout="wide")
+profile_rerun()
+guard_session()
 st.title("Fundamentals – Stock Analysis")
 
 
 # ─────────────────────────────
-# Load and merge data
+# Load data (shared universe – descriptions load lazily for peers)
 # ─────────────────────────────
-master_df = load_master()
-name_df   = load_name_lookup()
-
-# Make sure we have Description for similarity algorithms later on
-if "Description" not in master_df.columns:
-    master_df = pd.merge(
-        master_df,
-        name_df[["Symbol", "Description"]],
-        on="Symbol",
-        how="left",
-        validate="1:1",
-    )
+universe  = get_universe()
+master_df = universe.frame
+name_df   = universe.names
 
 symbol2name = dict(zip(name_df["Symbol"], name_df["Company Name"]))
 
@@ -79,3 +73,9 @@ display_metrics(
     master_df,
     name_df,   # your display_metrics signature must accept this
 )
+
+# ─────────────────────────────
+# 4️⃣ Stored fundamentals over time (from nse.db, no Yahoo calls)
+# ─────────────────────────────
+with st.expander("📜 Fundamentals history"):
+    display_fundamentals_history(chosen_sym)
@@ -2,8 +2,9 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
-from common.sql import load_master
-from common.data import load_name_lookup
+from common.memory import guard_session
+from common.profiling import profile_rerun
+from common.universe import get_universe
 from common.finance import human_market_cap
 
 st.set_page_config(
@@ -12,13 +13,15 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+profile_rerun()
+guard_session()
 
 st.title("Sector & Industry Analysis")
 
 # Load data
-master_df = load_master()
-name_df = load_name_lookup()
-df = pd.merge(master_df, name_df, on="Symbol", how="left")
+universe = get_universe()
+name_df = universe.names
+df = universe.frame
 
 
 # Sidebar filters
@@ -74,6 +77,10 @@ avg_vals["ProfitMarginCleaned"] = profit_margin_avg
 
 
 
+def fmt_avg(val, scale=1, suffix=""):
+    if val is None or pd.isna(val): return "N/A"
+    return f"{val * scale:.2f}{suffix}"
+
 def fmt_cap(val):
     if val is None or pd.isna(val): return "N/A"
     return f"{val/1e9:.2f}B" if val >= 1e9 else f"{val/1e6:.2f}M" if val >= 1e6 else f"{val:.0f}"
@@ -92,11 +99,11 @@ def icon_d2e(v, a):
 
 # Industry-level metrics
 cols = st.columns(6)
-cols[0].metric("Avg PE", f"{avg_vals.get(cols_to_use['PE'], np.nan):.2f}")
-cols[1].metric("Avg EPS", f"{avg_vals.get(cols_to_use['EPS'], np.nan):.2f}")
-cols[2].metric("Avg ROE", f"{avg_vals.get(cols_to_use['ROE'], np.nan) * 100:.2f}%")
-cols[3].metric("Avg P. Margin", f"{profit_margin_avg:.2f}%")
-cols[4].metric("Avg D/E", f"{avg_vals.get('Debt to Equity', np.nan):.2f}")
+cols[0].metric("Avg PE", fmt_avg(avg_vals.get(cols_to_use['PE'])))
+cols[1].metric("Avg EPS", fmt_avg(avg_vals.get(cols_to_use['EPS'])))
+cols[2].metric("Avg ROE", fmt_avg(avg_vals.get(cols_to_use['ROE']), 100, "%"))
+cols[3].metric("Avg P. Margin", fmt_avg(profit_margin_avg, suffix="%"))
+cols[4].metric("Avg D/E", fmt_avg(avg_vals.get('Debt to Equity')))
 cols[5].metric("Avg MCap", fmt_cap(avg_vals.get(cols_to_use["Market Cap"])))
 
 # Rank and interpret companies
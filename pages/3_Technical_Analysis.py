@@ -1,36 +1,35 @@
 import streamlit as st
-import yfinance as yf
+from common.backtest import COST, evaluate
+from common.display import data_age_caption, live_price_metric
+from common.finance import get_recommendations
+from common.levels import get_levels
 import plotly.graph_objects as go
 import pandas as pd
-from common.data import load_name_lookup
+from common.market_calendar import interval_minutes
+from common.memory import guard_session
+from common.profiling import profile_rerun
+from common.resample import bar_freshness, get_bars
+from common.risk import risk_for
+from common.telemetry import span, traced
+from common.universe import get_universe
 from indicators import apply_sma, apply_ema, get_pivot_lines
 from indicators import detect_cross_signals,compute_rsi
+from pivot_utils import METHODS as PIVOT_METHODS
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
-st.set_page_config(page_title="Technical Chart", layout="wide")
-
-# ─────────────────────────────
-# Theme selector
-# ─────────────────────────────
-col_title, col_theme = st.columns([6, 1])
-with col_title:
-    st.title("Indian Stock – Technical Analysis")
-with col_theme:
-    dark_mode = st.checkbox("🌙 Dark Mode", value=False)
+BACKTEST_PERIOD = "5y"          # daily history behind the crossover backtest caption
 
-theme = "Dark" if dark_mode else "Light"
+st.set_page_config(page_title="Technical Chart", layout="wide")
+profile_rerun()
+guard_session()
 
-# Theme colors
-bg_color = "#FFFFFF" if theme == "Light" else "#0E1117"
-font_color = "#000000" if theme == "Light" else "#FFFFFF"
-increasing_color = "#00B26F" if theme == "Light" else "#26de81"
-decreasing_color = "#FF3C38" if theme == "Light" else "#eb3b5a"
+st.title("Indian Stock – Technical Analysis")
 
 # ─────────────────────────────
 # Search bar (shared for all tabs)
 # ─────────────────────────────
-name_df = load_name_lookup()
+name_df = get_universe().names
 symbol2name = dict(zip(name_df["Symbol"], name_df["Company Name"]))
 
 search_query = st.text_input("Search by Symbol or Company Name").strip().lower()
@@ -57,7 +56,24 @@ if search_query:
 # ─────────────────────────────
 tab1, tab2, tab3 = st.tabs([" Chart", " Insights", " View"])
 
-with tab1:
+
+# The chart's widgets (theme, interval, indicators, candle buttons) live in a
+# fragment: changing one reruns only this function, not the Insights / View tabs.
+@st.fragment
+@traced("technical.chart")
+def chart_section(chosen_sym):
+    # ─────────────────────────────
+    # Theme selector
+    # ─────────────────────────────
+    dark_mode = st.checkbox("🌙 Dark Mode", value=False)
+    theme = "Dark" if dark_mode else "Light"
+
+    # Theme colors
+    bg_color = "#FFFFFF" if theme == "Light" else "#0E1117"
+    font_color = "#000000" if theme == "Light" else "#FFFFFF"
+    increasing_color = "#00B26F" if theme == "Light" else "#26de81"
+    decreasing_color = "#FF3C38" if theme == "Light" else "#eb3b5a"
+
     # ─────────────────────────────
     # Interval dropdown
     # ─────────────────────────────
@@ -65,7 +81,10 @@ with tab1:
         "5 minutes": "5m",
         "15 minutes": "15m",
         "1 hour": "60m",
-        "1 day": "1d"
+        "4 hours": "240m",
+        "1 day": "1d",
+        "1 week": "1wk",
+        "1 month": "1mo"
     }
     label    = st.selectbox("Select Interval", list(interval_mapping.keys()), index=0)
     interval = interval_mapping[label]
@@ -79,22 +98,27 @@ with tab1:
     # Indicator selection
     all_indicators = st.multiselect(
         "Select Indicators",
-        ["EMA"],
+        ["EMA", "Pivots"],
         default=[]
     )
+    pivot_method = (
+        st.selectbox("Pivot method", PIVOT_METHODS, format_func=str.title)
+        if "Pivots" in all_indicators else None
+    )
 
-    sma_lengths, ema_lengths = [], []
+    sma_lengths = []
+    ema_lengths = [20, 50] if "EMA" in all_indicators else []     # the pair the crossover markers use
     # (You kept SMA off by default, so no SMA input block here.)
 
     # Choose period so the chart loads enough candles
-    period = (
-        "60d" if interval == "1d" else
-        "5d"  if interval == "60m" else
-        "2d"
-    )
+    period = {
+        "1d": "60d", "1wk": "2y", "1mo": "10y",
+        "240m": "1mo", "60m": "5d",
+    }.get(interval, "2d")
+    intraday = interval_minutes(interval) is not None
 
     # Buttons to pull older intraday candles (only if intraday)
-    if interval != "1d" and chosen_sym:
+    if intraday and chosen_sym:
         c1, c2 = st.columns([1, 1])
         with c1:
             if st.button("🔁 Load older candles"):
@@ -109,18 +133,18 @@ with tab1:
     # ─────────────────────────────
     if chosen_sym:
         try:
-            df = yf.Ticker(chosen_sym + ".NS").history(interval=interval, period=period)
+            # every intraday interval is resampled locally from cached 5m bars
+            df = get_bars(chosen_sym + ".NS", interval=interval, period=period)
             df = df.reset_index()
 
             if df.empty:
                 st.error("No data found.")
-                st.session_state.df_stock = None
             else:
-                st.session_state.df_stock = df
+                data_age_caption(bar_freshness(chosen_sym + ".NS", interval, period))
                 x_col = "Datetime" if "Datetime" in df.columns else "Date"
                 df["x_label"] = (
                     df[x_col].dt.strftime("%d/%m %H:%M")
-                    if any(k in interval for k in ("m", "h"))
+                    if intraday
                     else df[x_col].dt.strftime("%d/%m")
                 )
 
@@ -138,18 +162,12 @@ with tab1:
                 ))
 
                 # ←────────────── support / resistance logic ──────────────→
-                if interval == "5m":               # 1-day levels
-                    last_day = df[x_col].max().date()
-                    sr_df = df[df[x_col].dt.date == last_day]
-                elif interval == "15m":            # 1-week levels
-                    end_date   = df[x_col].max().date()
-                    start_date = end_date - pd.Timedelta(days=7)
-                    sr_df = df[df[x_col].dt.date >= start_date]
-                else:                              # fallback: whole df
-                    sr_df = df
-
-                support    = sr_df["Low"].min()
-                resistance = sr_df["High"].max()
+                support, resistance = get_levels(
+                    chosen_sym + ".NS", period=period, interval=interval
+                ).nearest(df["Close"].iloc[-1])
+                # nothing beyond the range yet → the range extremes
+                support    = df["Low"].min()  if support    is None else support
+                resistance = df["High"].max() if resistance is None else resistance
 
                 fig.add_hline(
                     y=support,
@@ -179,6 +197,13 @@ with tab1:
                             name=f"EMA ({ema_len})"
                         ))
 
+                if pivot_method:
+                    pivot_shapes, pivot_note = get_pivot_lines(df, chosen_sym, interval, pivot_method)
+                    for item in pivot_shapes:
+                        fig.add_shape(**item["shape"])
+                        fig.add_annotation(**item["annotation"])
+                    st.caption(pivot_note)
+
                 # (Your crossover-signal logic unchanged)
                 from indicators import detect_crossovers
                 signals = detect_crossovers(df, short_col="EMA_20", long_col="EMA_50")
@@ -196,6 +221,18 @@ with tab1:
                         marker=dict(color='red', size=10),
                         name='Sell Signal'
                     ))
+                # what the same signal would have made on five years of daily bars
+                if ema_lengths:
+                    daily = get_bars(chosen_sym + ".NS", interval="1d", period=BACKTEST_PERIOD)
+                    if len(daily) > 50:
+                        wide = pd.concat({chosen_sym: daily}, axis=1).swaplevel(axis=1)
+                        bt = evaluate(wide, "crossover", {"fast": (20,), "slow": (50,)}).iloc[0]
+                        hits = f"{bt['Hit rate %']:.0f}% profitable" if bt["Trades"] else "none closed"
+                        st.caption(
+                            f"EMA 20/50 crossover, {BACKTEST_PERIOD} daily backtest: {bt['CAGR %']:+.1f}% a year "
+                            f"vs {bt['Buy & hold CAGR %']:+.1f}% buy & hold · {int(bt['Trades'])} trades, {hits} "
+                            f"· max drawdown {bt['Max drawdown %']:.0f}% · {COST:.1%} cost per side"
+                        )
 
                 # ────────────────── layout tweaks ──────────────────
                 total_candles = len(df)
@@ -253,10 +290,13 @@ with tab1:
             st.error(f"Error: {e}")
 
 
-with tab2:
+with tab1:
+    chart_section(chosen_sym)
+
+with tab2, span("technical.insights"):
     if chosen_sym:
         # Always fetch enough data for SMA 200
-        df_insights = yf.Ticker(chosen_sym + ".NS").history(interval="1d", period="12mo")
+        df_insights = get_bars(chosen_sym + ".NS", interval="1d", period="12mo")
         if not df_insights.empty:
             df_insights = df_insights.reset_index()
             df_insights["SMA_50"] = df_insights["Close"].rolling(window=50).mean()
@@ -271,7 +311,7 @@ with tab2:
             col1, col2, col3 = st.columns(3)
 
             with col1:
-                st.metric("Current Price", f"₹{latest_price:,.2f}")
+                live_price_metric(chosen_sym + ".NS", fallback=latest_price)
     
             with col2:
                 st.metric(
@@ -332,14 +372,14 @@ with tab2:
 
 
 
-with tab3:
+with tab3, span("technical.view"):
     st.subheader(f"Market View for {chosen_sym or 'selected stock'}")
 
     if chosen_sym:
         try:
             # Load stock and NIFTY50 data
-            stock_df = yf.Ticker(chosen_sym + ".NS").history(period="6mo", interval="1d")
-            nifty_df = yf.Ticker("^NSEI").history(period="6mo", interval="1d")  # NIFTY 50
+            stock_df = get_bars(chosen_sym + ".NS", interval="1d", period="6mo")
+            nifty_df = get_bars("^NSEI", interval="1d", period="6mo")  # NIFTY 50
 
             if not stock_df.empty and not nifty_df.empty:
                 stock_df = stock_df.reset_index()
@@ -356,68 +396,71 @@ with tab3:
                 # Compute price returns
                 df_merged["Return"] = df_merged["Close"].pct_change()
                 df_merged["NIFTY_Return"] = df_merged["Close_NIFTY"].pct_change()
-                ticker = yf.Ticker(chosen_sym + ".NS")
-                ratings_df = ticker.recommendations
+                ratings_df = get_recommendations(chosen_sym)
                 #st.write(ratings_df)
 
-                def convert_to_month(period_label):
-                    try:
-                        offset = int(str(period_label).replace("m", ""))
-                        month = datetime.today() + relativedelta(months=offset)
-                        return month.strftime("%b")  # e.g., 'Jul', 'Jun'
-                    except:
-                        return str(period_label)
+                # no recommendations (upstream down, nothing cached): skip the chart, keep the rest of the tab
+                if ratings_df.empty or "period" not in ratings_df:
+                    st.info("Analyst recommendations are unavailable right now.")
+                else:
+                    def convert_to_month(period_label):
+                        try:
+                            offset = int(str(period_label).replace("m", ""))
+                            month = datetime.today() + relativedelta(months=offset)
+                            return month.strftime("%b")  # e.g., 'Jul', 'Jun'
+                        except:
+                            return str(period_label)
                 
-                ratings_df["Month"] = ratings_df["period"].apply(convert_to_month)
+                    ratings_df["Month"] = ratings_df["period"].apply(convert_to_month)
                 
 
-                # Compute Buy, Hold, Sell categories
-                ratings_df["Buy"] = ratings_df["strongBuy"] + ratings_df["buy"]
-                ratings_df["Sell"] = ratings_df["sell"] + ratings_df["strongSell"]
+                    # Compute Buy, Hold, Sell categories
+                    ratings_df["Buy"] = ratings_df["strongBuy"] + ratings_df["buy"]
+                    ratings_df["Sell"] = ratings_df["sell"] + ratings_df["strongSell"]
                 
-                # Ensure order of display (most recent first)
-                ratings_df = ratings_df[::-1]
+                    # Ensure order of display (most recent first)
+                    ratings_df = ratings_df[::-1]
                 
-                # Create grouped bar chart
-                fig = go.Figure()
+                    # Create grouped bar chart
+                    fig = go.Figure()
                 
-                fig.add_trace(go.Bar(
-                    x=ratings_df["Month"],
-                    y=ratings_df["Buy"],
-                    name="✅ Buy",
-                    marker_color="green"
-                ))
+                    fig.add_trace(go.Bar(
+                        x=ratings_df["Month"],
+                        y=ratings_df["Buy"],
+                        name="✅ Buy",
+                        marker_color="green"
+                    ))
                 
-                fig.add_trace(go.Bar(
-                    x=ratings_df["Month"],
-                    y=ratings_df["hold"],
-                    name="⚪ Hold",
-                    marker_color="gray"
-                ))
+                    fig.add_trace(go.Bar(
+                        x=ratings_df["Month"],
+                        y=ratings_df["hold"],
+                        name="⚪ Hold",
+                        marker_color="gray"
+                    ))
                 
-                fig.add_trace(go.Bar(
-                    x=ratings_df["Month"],
-                    y=ratings_df["Sell"],
-                    name="❌ Sell",
-                    marker_color="red"
-                ))
+                    fig.add_trace(go.Bar(
+                        x=ratings_df["Month"],
+                        y=ratings_df["Sell"],
+                        name="❌ Sell",
+                        marker_color="red"
+                    ))
                 
-                fig.update_layout(
-                    barmode="group",
-                    title="Analyst Recommendations",
-                    xaxis_title="Month",
-                    yaxis_title="Number of Ratings",
-                    legend_title="Rating",
-                    plot_bgcolor="#0E1117",   # Dark background
-                    paper_bgcolor="#0E1117",
-                    font=dict(color="white"),  # White font
-                    xaxis=dict(color="white"),
-                    yaxis=dict(color="white"),
-                    height=400
-                )
+                    fig.update_layout(
+                        barmode="group",
+                        title="Analyst Recommendations",
+                        xaxis_title="Month",
+                        yaxis_title="Number of Ratings",
+                        legend_title="Rating",
+                        plot_bgcolor="#0E1117",   # Dark background
+                        paper_bgcolor="#0E1117",
+                        font=dict(color="white"),  # White font
+                        xaxis=dict(color="white"),
+                        yaxis=dict(color="white"),
+                        height=400
+                    )
 
                 
-                st.plotly_chart(fig, use_container_width=True)
+                    st.plotly_chart(fig, use_container_width=True)
 
 
                 #st.markdown("### 📈 Price Performance")
@@ -440,17 +483,29 @@ with tab3:
                 st.write(f"Today's Volume: `{int(latest_vol):,}` | 21-Day Avg: `{int(avg_vol):,}`")
                 
 
-                #st.markdown("### 🧱 Support & Resistance (20-day)")
-                support = df_merged["Close"].rolling(window=20).min().iloc[-1]
-                resistance = df_merged["Close"].rolling(window=20).max().iloc[-1]
+                #st.markdown("### 🧱 Support & Resistance")
+                levels = get_levels(chosen_sym + ".NS", period="6mo", interval="1d")
                 current_price = df_merged["Close"].iloc[-1]
+                support, resistance = levels.nearest(current_price)
 
-                st.write(f"📉 Support(20-day): ₹{support:.2f}")
-                st.write(f"📈 Resistance(20-day): ₹{resistance:.2f}")
+                st.write(f"📉 Support: ₹{support:.2f}" if support is not None else "📉 Support: none below")
+                st.write(f"📈 Resistance: ₹{resistance:.2f}" if resistance is not None else "📈 Resistance: none above")
 
                 #st.markdown("### 🤝 Correlation with NIFTY 50")
-                correlation = df_merged["Return"].corr(df_merged["NIFTY_Return"])
-                st.write(f"Correlation with NIFTY 50 (last 6 months): `{correlation:.2f}`")
+                risk = risk_for(chosen_sym, window=126).set_index("Benchmark")
+                if "^NSEI" in risk.index:
+                    correlation = risk.at["^NSEI", "Correlation"]
+                    st.write(
+                        f"Correlation with NIFTY 50 (last 6 months): `{correlation:.2f}` | "
+                        f"Beta: `{risk.at['^NSEI', 'Beta']:.2f}` | "
+                        f"Idiosyncratic vol: `{risk.at['^NSEI', 'IdioVol'] * 100:.1f}%`"
+                    )
+                    for bench, row in risk.drop(index="^NSEI").iterrows():
+                        st.write(f"vs sector index {bench}: correlation `{row['Correlation']:.2f}`, "
+                                 f"beta `{row['Beta']:.2f}`")
+                else:       # not in the nightly RiskStats yet
+                    correlation = df_merged["Return"].corr(df_merged["NIFTY_Return"])
+                    st.write(f"Correlation with NIFTY 50 (last 6 months): `{correlation:.2f}`")
                 if correlation > 0.7:
                     st.success("✅ Highly correlated with broader market.")
                 elif correlation < 0.3:
@@ -460,9 +515,10 @@ with tab3:
                 #st.info("🗓️ Next Earnings: Not available via yFinance. Please check official filings.")
 
                 #st.markdown("### 🧭 Most Traded Price Range")
-                price_bins = pd.cut(df_merged["Close"], bins=20)
-                most_traded = price_bins.value_counts().idxmax()
-                st.write(f"Most traded price range in last 6 months: **{most_traded}**")
+                most_traded = levels.poc_range()
+                if most_traded:
+                    lo, hi = most_traded
+                    st.write(f"Most traded price range in last 6 months: **₹{lo:,.2f} – ₹{hi:,.2f}**")
 
             else:
                 st.warning("Could not load complete data to compute View Tab insights.")
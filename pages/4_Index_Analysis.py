@@ -1,12 +1,20 @@
 import streamlit as st
-import yfinance as yf
+from common.provider import is_offline
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from scipy.signal import argrelextrema
+from common.bars import get_history, prefetch_histories
+from common.cache import cached
+from common.display import data_age_caption, live_price_metric
+from common.levels import get_levels
+from common.memory import guard_session
+from common.profiling import profile_rerun
+from common.telemetry import span, traced
 from indicators import compute_rsi  # make sure this function exists and returns a "RSI" column
 
 st.set_page_config(page_title=" Index Analysis", layout="wide")
+profile_rerun()
+guard_session()
 
 # ─────────────────────────────────────
 # Index Selector
@@ -20,6 +28,60 @@ index_options = {
     "NIFTY Auto": "^CNXAUTO",
     "NIFTY Pharma": "^CNXPHARMA",
 }
+# two years of daily bars: enough for shift(250) and for EMA / RSI warm-up
+INDEX_PERIOD = "2y"
+CHART_BARS = 60
+
+# ─────────────────────────────────────
+# Load all indices in one batched download
+# ─────────────────────────────────────
+all_bars = prefetch_histories(index_options.values(), period=INDEX_PERIOD, interval="1d")
+
+
+def pct_change(cur, prev):
+    return (cur - prev) / prev * 100 if pd.notna(prev) else None
+
+def fmt_pct(val):
+    return f"{val:+.2f} %" if val is not None else "—"
+
+
+@traced("index.dashboard")
+def index_dashboard(bars_by_name: dict) -> pd.DataFrame:
+    rows = []
+    for name, bars in bars_by_name.items():
+        close = bars["Close"].dropna() if not bars.empty else pd.Series(dtype=float)
+        if close.empty:
+            rows.append({"Index": name})
+            continue
+        ema9 = close.ewm(span=9, adjust=False).mean().iloc[-1]
+        ema15 = close.ewm(span=15, adjust=False).mean().iloc[-1]
+        prev = lambda n: close.iloc[-1 - n] if len(close) > n else np.nan
+        rows.append({
+            "Index": name,
+            "Price": close.iloc[-1],
+            "1 d %": pct_change(close.iloc[-1], prev(1)),
+            "30 d %": pct_change(close.iloc[-1], prev(30)),
+            "1 y %": pct_change(close.iloc[-1], prev(250)),
+            "RSI (14)": compute_rsi(close.to_frame("Close")).iloc[-1],
+            "EMA 9/15": "▲ Bullish" if ema9 > ema15 else "▼ Bearish",
+        })
+    return pd.DataFrame(rows)
+
+
+st.subheader("Index Dashboard")
+st.dataframe(
+    index_dashboard({name: all_bars[sym] for name, sym in index_options.items()}),
+    hide_index=True,
+    use_container_width=True,
+    column_config={
+        "Price": st.column_config.NumberColumn(format="%.2f"),
+        "1 d %": st.column_config.NumberColumn(format="%+.2f"),
+        "30 d %": st.column_config.NumberColumn(format="%+.2f"),
+        "1 y %": st.column_config.NumberColumn(format="%+.2f"),
+        "RSI (14)": st.column_config.NumberColumn(format="%.1f"),
+    },
+)
+
 selected_index = st.selectbox(" Select Index", list(index_options.keys()))
 index_symbol = index_options[selected_index]
 
@@ -27,7 +89,11 @@ index_symbol = index_options[selected_index]
 # ─────────────────────────────────────
 # Load Data and Compute Indicators
 # ─────────────────────────────────────
-df = yf.Ticker(index_symbol).history(period="60d", interval="1d").reset_index()
+df = all_bars[index_symbol].reset_index()
+if df.empty:
+    st.warning("⚠️ Index data is temporarily unavailable – please try again shortly.")
+    st.stop()
+data_age_caption(get_history.freshness(index_symbol, period=INDEX_PERIOD, interval="1d"))
 price = df["Close"].iloc[-1]
 # Ensure we have enough data
 df["Date"] = pd.to_datetime(df["Date"])
@@ -51,15 +117,10 @@ day_ago   = df["Prev_1d"].iloc[-1]
 month_ago = df["Prev_30d"].iloc[-1]
 year_ago  = df["Prev_250d"].iloc[-1]
 
-def pct_change(cur, prev):
-    return (cur - prev) / prev * 100 if pd.notna(prev) else None
-
 day_change   = pct_change(price, day_ago)
 month_change = pct_change(price, month_ago)
 year_change  = pct_change(price, year_ago)
 df.reset_index(inplace=True)
-def fmt_pct(val):
-    return f"{val:+.2f} %" if val is not None else "—"
 
 # ────────────────────────────
 # 📊 Snapshot header
@@ -75,11 +136,13 @@ rsi_arrow  = "↑" if latest_rsi >= prev_rsi else "↓"
 
 
 
-c_price, c_day, c_month, c_rsi, c_sr = st.columns([2, 2, 2, 2, 3])
+c_price, c_day, c_month, c_year, c_rsi = st.columns([2, 2, 2, 2, 3])
 
-c_price.metric("💰 Price",  f"₹{price:,.2f}")
+with c_price:
+    live_price_metric(index_symbol, "💰 Price", fallback=price)
 c_day.metric(  "24 h %",      fmt_pct(day_change),   delta_color="inverse")
 c_month.metric("30 d %",      fmt_pct(month_change), delta_color="inverse")
+c_year.metric( "1 y %",       fmt_pct(year_change),  delta_color="inverse")
 c_rsi.metric(  "RSI (14)",    f"{latest_rsi:.1f} {rsi_arrow}")
 
 
@@ -89,37 +152,28 @@ c_rsi.metric(  "RSI (14)",    f"{latest_rsi:.1f} {rsi_arrow}")
 # ─────────────────────────────────────
 # Nearest Support & Resistance
 # ─────────────────────────────────────
-def get_nearest_support_resistance(df, price):
-    df = df.copy()
-    df["min"] = df["Close"].iloc[argrelextrema(df["Close"].values, np.less_equal, order=5)[0]]
-    df["max"] = df["Close"].iloc[argrelextrema(df["Close"].values, np.greater_equal, order=5)[0]]
-    supports = df["min"].dropna()
-    resistances = df["max"].dropna()
-    nearest_support = supports[supports < price].max() if not supports.empty else None
-    nearest_resistance = resistances[resistances > price].min() if not resistances.empty else None
-    return nearest_support, nearest_resistance
-
-support, resistance = get_nearest_support_resistance(df, price)
+support, resistance = get_levels(index_symbol, period=INDEX_PERIOD, interval="1d").nearest(price)
 
 # ─────────────────────────────────────
 # Chart Rendering
 # ─────────────────────────────────────
 st.subheader(f" {selected_index} – Candlestick Chart with EMA 9, EMA 15")
 
+chart_df = df.tail(CHART_BARS)
 fig = go.Figure()
 
 fig.add_trace(go.Candlestick(
-    x=df["Date"],
-    open=df["Open"],
-    high=df["High"],
-    low=df["Low"],
-    close=df["Close"],
+    x=chart_df["Date"],
+    open=chart_df["Open"],
+    high=chart_df["High"],
+    low=chart_df["Low"],
+    close=chart_df["Close"],
     increasing_line_color="green",
     decreasing_line_color="#e74c3c",
     name="Price"
 ))
-fig.add_trace(go.Scatter(x=df["Date"], y=df["EMA_9"], mode="lines", name="EMA 9", line=dict(color="orange")))
-fig.add_trace(go.Scatter(x=df["Date"], y=df["EMA_15"], mode="lines", name="EMA 15", line=dict(color="cyan")))
+fig.add_trace(go.Scatter(x=chart_df["Date"], y=chart_df["EMA_9"], mode="lines", name="EMA 9", line=dict(color="orange")))
+fig.add_trace(go.Scatter(x=chart_df["Date"], y=chart_df["EMA_15"], mode="lines", name="EMA 15", line=dict(color="cyan")))
 
 if support:
     fig.add_hline(y=support, line_color="green", line_dash="dot", opacity=0.7,
@@ -202,22 +256,31 @@ else:
 import feedparser
 import datetime
 import streamlit as st
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
 
 # ─────────────────────────────
 # Cache FinBERT model
 # ─────────────────────────────
+@traced("index.load_finbert")
 @st.cache_resource
 def load_finbert():
+    # imported here: cache_resource serialises the (slow, not thread-safe)
+    # first import across concurrent sessions, and offline runs skip it
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+
     tokenizer = AutoTokenizer.from_pretrained("ProsusAI/finbert")
     model     = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
     return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
 
-sentiment_pipeline = load_finbert()
+try:
+    sentiment_pipeline = None if is_offline() else load_finbert()
+except Exception:          # model not cached / hub unreachable – headlines still render
+    sentiment_pipeline = None
 
 # ─────────────────────────────
 # Function to fetch news from two RSS feeds
 # ─────────────────────────────
+@traced("index.fetch_news")
+@cached("index.news", ttl=15 * 60, max_entries=4)
 def fetch_index_news(max_headlines=5):
     today = datetime.datetime.utcnow().date()
     feeds = {
@@ -258,7 +321,7 @@ def fetch_index_news(max_headlines=5):
 st.markdown("---")
 st.subheader("News Analysis")
 
-raw_headlines = fetch_index_news(max_headlines=5)
+raw_headlines = [] if is_offline() else fetch_index_news(max_headlines=5)
 
 if not raw_headlines:
     st.warning("No recent news found.")
@@ -274,6 +337,7 @@ else:
         titles.append(item["title"])
 
     # sentiment
-    results = sentiment_pipeline(titles)
+    with span("index.sentiment"):
+        results = sentiment_pipeline(titles) if sentiment_pipeline else []
    
 
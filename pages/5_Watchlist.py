@@ -0,0 +1,146 @@
+import pandas as pd
+import streamlit as st
+
+from common.bars import get_history, prefetch_histories
+from common.display import data_age_caption
+from common.price_stats import price_stats
+from common.memory import guard_session
+from common.profiling import profile_rerun
+from common.telemetry import traced
+from common.universe import get_universe
+from common.watchlist import (
+    closes_frame, delete_watchlist, list_watchlists, load_watchlist, save_watchlist,
+    totals, value_holdings,
+)
+
+QUOTE_PERIOD = "5d"             # last close plus the one before it for Day %
+
+# ─────────────────────────────
+# Page config
+# ─────────────────────────────
+st.set_page_config(page_title="Watchlists", layout="wide")
+profile_rerun()
+guard_session()
+st.title("📋 Watchlists")
+
+universe = get_universe()
+symbol2name = dict(zip(universe.names["Symbol"], universe.names["Company Name"]))
+
+
+# ─────────────────────────────
+# Pick / create / delete a list
+# ─────────────────────────────
+names = list_watchlists()
+col_pick, col_new = st.columns([2, 1])
+with col_new:
+    new_name = st.text_input("New watchlist").strip()
+    if st.button("➕ Create", disabled=not new_name):
+        if new_name in names:
+            st.warning(f"“{new_name}” already exists.")
+        else:
+            st.session_state["watchlist_new"] = new_name
+            st.session_state["watchlist_name"] = new_name
+
+pending = st.session_state.get("watchlist_new")
+options = names + ([pending] if pending and pending not in names else [])
+if not options:
+    st.info("Create a watchlist to start.")
+    st.stop()
+
+with col_pick:
+    current = st.session_state.get("watchlist_name")
+    name = st.selectbox(
+        "Watchlist", options, index=options.index(current) if current in options else 0,
+    )
+    st.session_state["watchlist_name"] = name
+
+holdings = load_watchlist(name)
+
+
+# ─────────────────────────────
+# Edit symbols and holdings
+# ─────────────────────────────
+with st.expander("✏️ Edit list", expanded=holdings.empty):
+    picked = st.multiselect(
+        "Symbols",
+        options=list(symbol2name),
+        default=[s for s in holdings["Symbol"] if s in symbol2name],
+        format_func=lambda s: f"{s} – {symbol2name.get(s, '')}",
+    )
+    editable = (
+        pd.DataFrame({"Symbol": picked})
+        .merge(holdings, on="Symbol", how="left")[["Symbol", "Qty", "AvgCost", "AddedAt"]]
+    )
+    edited = st.data_editor(
+        editable,
+        column_config={
+            "Symbol": st.column_config.TextColumn(disabled=True),
+            "Qty": st.column_config.NumberColumn("Qty", min_value=0, step=1),
+            "AvgCost": st.column_config.NumberColumn("Avg cost (₹)", min_value=0, format="%.2f"),
+            "AddedAt": None,
+        },
+        hide_index=True,
+        use_container_width=True,
+        key=f"watchlist_editor_{name}_{len(picked)}",
+    )
+    col_save, col_del = st.columns([1, 1])
+    with col_save:
+        if st.button("💾 Save", type="primary"):
+            try:
+                save_watchlist(name, edited)
+            except ValueError as exc:
+                st.error(str(exc))
+            else:
+                st.session_state.pop("watchlist_new", None)
+                st.rerun()
+    with col_del:
+        if name in names and st.button("🗑️ Delete list"):
+            delete_watchlist(name)
+            st.session_state.pop("watchlist_name", None)
+            st.rerun()
+
+if holdings.empty:
+    st.info("This watchlist is empty – add symbols above and save.")
+    st.stop()
+
+
+# ─────────────────────────────
+# Quotes – one batched download for the whole list
+# ─────────────────────────────
+tickers = [f"{s}.NS" for s in holdings["Symbol"]]
+refresh = st.button("🔄 Refresh quotes")
+bars = prefetch_histories(tickers, period=QUOTE_PERIOD, interval="1d", force=refresh)
+
+
+@traced("watchlist.value")
+def valuation() -> pd.DataFrame:
+    return value_holdings(holdings, closes_frame(bars), universe.frame, price_stats())
+
+
+valued = valuation()
+summary = totals(valued)
+
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Symbols", len(valued))
+c2.metric("Value", f"₹{summary['value']:,.0f}", f"{summary['day']:+,.0f} today")
+c3.metric("Invested", f"₹{summary['cost']:,.0f}")
+c4.metric(
+    "P&L", f"₹{summary['pnl']:,.0f}",
+    f"{summary['pnl_pct']:+.2f}%" if summary["pnl_pct"] is not None else None,
+)
+
+st.dataframe(
+    valued.style.format({
+        "Qty": "{:,.0f}", "AvgCost": "₹{:,.2f}", "Price": "₹{:,.2f}", "Day %": "{:+.2f}%",
+        "Value": "₹{:,.0f}", "Cost": "₹{:,.0f}", "P&L": "₹{:+,.0f}", "P&L %": "{:+.2f}%",
+        "PE": "{:.1f}", "ATH": "₹{:,.2f}", "From ATH %": "{:+.1f}%",
+    }, na_rep="–"),
+    use_container_width=True,
+    hide_index=True,
+)
+
+missing = valued.loc[valued["Price"].isna(), "Symbol"].tolist()
+if missing:
+    st.warning(f"No quotes for: {', '.join(missing)}")
+data_age_caption(*(get_history.freshness(t, period=QUOTE_PERIOD, interval="1d") for t in tickers))
+st.caption("ATH from the nightly PriceStats table (`python nightly.py`), raised to today's price if higher.")
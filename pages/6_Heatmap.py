@@ -0,0 +1,93 @@
+import numpy as np
+import plotly.express as px
+import streamlit as st
+
+from common.display import data_age_caption
+from common.heatmap import SCOPES, WINDOWS, freshness, heatmap_frame, sector_returns
+from common.memory import guard_session
+from common.profiling import profile_rerun
+from common.telemetry import traced
+
+# colour scale is clipped at this percentile of |return| so one outlier does not wash out the map
+COLOR_CLIP_PCT = 95
+
+# ─────────────────────────────
+# Page config
+# ─────────────────────────────
+st.set_page_config(page_title="Market Heatmap", layout="wide")
+profile_rerun()
+guard_session()
+st.title("🟩 Market Heatmap")
+
+c1, c2, c3 = st.columns([1, 2, 2])
+with c1:
+    scope = st.selectbox("Companies", list(SCOPES), index=1)
+with c2:
+    window = st.radio("Return over", list(WINDOWS), horizontal=True)
+with c3:
+    group = st.radio("Group tiles by", ["Sector", "Sector › Industry"], horizontal=True)
+
+# computed once per new daily bar and shared by every session
+frame = heatmap_frame(SCOPES[scope])
+if frame.empty:
+    st.warning("⚠️ Market data is temporarily unavailable – please try again shortly.")
+    st.stop()
+
+
+# ─────────────────────────────
+# Treemap – tile area = market cap, colour = return
+# ─────────────────────────────
+@traced("heatmap.figure")
+def treemap(frame, window: str, group: str):
+    tiles = frame.dropna(subset=[window])
+    clip = max(float(np.nanpercentile(tiles[window].abs(), COLOR_CLIP_PCT)), 0.5)
+    path = [px.Constant("NSE"), "Big Sectors"] + (["Industry"] if group != "Sector" else []) + ["Symbol"]
+    fig = px.treemap(
+        tiles, path=path, values="MarketCap", color=window,
+        color_continuous_scale="RdYlGn", color_continuous_midpoint=0, range_color=(-clip, clip),
+        custom_data=["Company Name", window],
+    )
+    fig.update_traces(
+        texttemplate="<b>%{label}</b><br>%{color:+.2f}%",
+        hovertemplate="<b>%{label}</b> %{customdata[0]}<br>%{color:+.2f}%<extra></extra>",
+        marker_line_width=0.5,
+    )
+    fig.update_layout(margin=dict(t=10, l=0, r=0, b=0), height=700, coloraxis_colorbar_title=f"{window} %")
+    return fig
+
+
+st.plotly_chart(treemap(frame, window, group), use_container_width=True)
+data_age_caption(freshness(SCOPES[scope]))
+st.caption(
+    f"{len(frame):,} companies, last close {frame.attrs.get('as_of', '–')}. Tiles are sized by stored "
+    "market cap; sector colours are market-cap weighted."
+)
+
+
+# ─────────────────────────────
+# Sector table and movers
+# ─────────────────────────────
+left, right = st.columns([3, 2])
+with left:
+    st.subheader(f"Sectors – {window}")
+    sectors = sector_returns(frame, window)
+    sectors["MarketCap"] = sectors["MarketCap"] / 1e7
+    st.dataframe(
+        sectors,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "Return %": st.column_config.NumberColumn(format="%+.2f"),
+            "Median %": st.column_config.NumberColumn(format="%+.2f"),
+            "MarketCap": st.column_config.NumberColumn("Market cap (₹ Cr)", format="%,.0f"),
+        },
+    )
+with right:
+    st.subheader(f"Movers – {window}")
+    movers = frame.dropna(subset=[window]).sort_values(window)
+    cols = ["Symbol", "Company Name", window]
+    fmt = {window: st.column_config.NumberColumn(format="%+.2f")}
+    st.caption("Top gainers")
+    st.dataframe(movers[cols].tail(5).iloc[::-1], hide_index=True, use_container_width=True, column_config=fmt)
+    st.caption("Top losers")
+    st.dataframe(movers[cols].head(5), hide_index=True, use_container_width=True, column_config=fmt)
@@ -0,0 +1,158 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+from common import cache, memory, profiling, quotes, resample, telemetry
+from common.provider import get_provider
+
+st.set_page_config(page_title="Diagnostics", layout="wide")
+
+# ─────────────────────────────
+# Gate: only with ?diag=1 or STOCK_ANALYZER_DIAGNOSTICS=1
+# ─────────────────────────────
+enabled = (
+    st.query_params.get("diag") == "1"
+    or os.environ.get("STOCK_ANALYZER_DIAGNOSTICS") == "1"
+)
+if not enabled:
+    st.info("Diagnostics are disabled. Open this page with `?diag=1` to view them.")
+    st.stop()
+
+st.title("Diagnostics")
+st.caption(f"Provider: **{get_provider().name}** – timings are process-wide, since start or last reset.")
+
+col_a, col_b = st.columns([1, 1])
+with col_a:
+    st.download_button(
+        "⬇️ Prometheus metrics",
+        telemetry.prometheus_text(),
+        file_name="stock_analyzer_metrics.prom",
+        mime="text/plain",
+    )
+with col_b:
+    if st.button("♻️ Reset counters"):
+        telemetry.reset()
+        st.rerun()
+
+# ─────────────────────────────
+# Span latency
+# ─────────────────────────────
+st.subheader("Spans")
+spans = telemetry.snapshot()
+if spans.empty:
+    st.info("No spans recorded yet – open another page first.")
+else:
+    st.dataframe(
+        spans.style.format({
+            "error_rate": "{:.1%}", "total_s": "{:.2f}",
+            "mean_ms": "{:.1f}", "p50_ms": "{:.1f}", "p95_ms": "{:.1f}", "max_ms": "{:.1f}",
+        }),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+# ─────────────────────────────
+# Upstream provider calls
+# ─────────────────────────────
+st.subheader("Upstream calls")
+upstream = telemetry.upstream_snapshot()
+if upstream.empty:
+    st.info("No provider calls yet.")
+else:
+    st.dataframe(upstream.style.format({"error_rate": "{:.1%}"}),
+                 use_container_width=True, hide_index=True)
+
+# ─────────────────────────────
+# Caches
+# ─────────────────────────────
+st.subheader("Caches")
+caches = cache.stats()
+if caches.empty:
+    st.info("No cached functions loaded yet.")
+else:
+    caches["MB"] = caches.pop("bytes") / 1e6
+    st.dataframe(
+        caches.style.format({"hit_rate": "{:.1%}", "MB": "{:.2f}"}, na_rep="–"),
+        use_container_width=True,
+        hide_index=True,
+    )
+    if st.button("🧹 Clear caches"):
+        cache.clear_all()
+        resample.clear()
+        st.rerun()
+
+bar_store = resample.stats()
+st.caption(
+    f"Intraday bar store: {bar_store['series']} symbols, {bar_store['base_rows']:,} base 5m bars, "
+    f"{bar_store['derived_rows']:,} derived bars, {bar_store['bytes'] / 1e6:.2f} MB"
+)
+
+# ─────────────────────────────
+# Memory (common.memory)
+# ─────────────────────────────
+st.subheader("Memory")
+mem = memory.report()
+mb = lambda n: "unbounded" if n is None else f"{n / 1e6:,.1f} MB"
+c1, c2, c3, c4 = st.columns(4)
+c1.metric("Process RSS", mb(mem["rss_bytes"]))
+c2.metric("Caches", mb(mem["cache_bytes"]), f"budget {mb(mem['cache_budget'])}", delta_color="off")
+c3.metric("Sessions", mb(mem["session_bytes"]), f"{mb(mem['session_budget'])} each", delta_color="off")
+c4.metric("Bar store", mb(mem["bar_store_bytes"]))
+trims = mem["session_trims"]
+st.caption(
+    f"Session guard: {trims['values']} values dropped in {trims['sessions']} reruns "
+    f"({trims['bytes'] / 1e6:.1f} MB). Budgets: STOCK_ANALYZER_CACHE_BUDGET, "
+    "STOCK_ANALYZER_CACHE_LIMITS, STOCK_ANALYZER_SESSION_BUDGET."
+)
+if not mem["sessions"].empty:
+    st.dataframe(mem["sessions"], use_container_width=True, hide_index=True)
+
+# ─────────────────────────────
+# Live quotes (common.quotes)
+# ─────────────────────────────
+st.subheader("Live quotes")
+live = quotes.stats()
+if not live:
+    st.info("Quote service not started – open a page with a live price first.")
+else:
+    last = live.pop("last_poll")
+    live["last poll"] = pd.Timestamp(last, unit="s", tz="UTC").tz_convert("Asia/Kolkata").strftime("%H:%M:%S") if last else "–"
+    st.dataframe(pd.DataFrame([live]), use_container_width=True, hide_index=True)
+
+# ─────────────────────────────
+# Rerun profiles (common.profiling)
+# ─────────────────────────────
+st.subheader("Rerun profiles")
+profiles = profiling.recent_profiles()
+if not profiles:
+    st.info("No profiles yet – add `?profile=1` to a page URL or set STOCK_ANALYZER_PROFILE=1.")
+else:
+    chosen = st.selectbox("Profile (collapsed stacks)", profiles, format_func=lambda p: p.name)
+    st.download_button("⬇️ Download", chosen.read_bytes(), file_name=chosen.name, mime="text/plain")
+
+# ─────────────────────────────
+# Recent traces
+# ─────────────────────────────
+st.subheader("Recent traces")
+
+
+def _flatten(node, depth=0):
+    yield {
+        "span": "    " * depth + node["name"],
+        "ms": node["ms"],
+        "error": "❌" if node["error"] else "",
+    }
+    for child in node["children"]:
+        yield from _flatten(child, depth + 1)
+
+
+traces = telemetry.recent_traces()
+for node in traces[:20]:
+    started = pd.Timestamp(node["start"], unit="s").strftime("%H:%M:%S")
+    label = f"{started} · {node['name']} · {node['ms']:.1f} ms" + (" ❌" if node["error"] else "")
+    with st.expander(label):
+        st.dataframe(pd.DataFrame(_flatten(node)), use_container_width=True, hide_index=True)
+
+with st.expander("Prometheus text"):
+    st.code(telemetry.prometheus_text(), language="text")
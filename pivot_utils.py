@@ -1,36 +1,47 @@
-import yfinance as yf
-import pandas as pd
+"""
+pivot_utils
+~~~~~~~~~~~
+Classic, Fibonacci and Camarilla pivot levels for the day, week and month.
 
-def get_previous_period_ohlc(symbol: str) -> dict:
-    """Get previous day's OHLC data for intraday pivot calculation."""
-    ticker = yf.Ticker(symbol)
-    df = ticker.history(period="5d", interval="1d")  # Fetch last 5 daily candles
+The formulas take scalars or aligned Series / arrays alike, so the
+nightly batch computes every symbol in one pass over stored daily bars
+(``pivot_table``) and writes the result to the ``PivotLevels`` table in
+nse.db, one row per (Date, Symbol, Timeframe, Method). ``Date`` is the
+session the levels apply to. Charts read that table; only symbols the
+batch has not covered fall back to computing from cached daily bars.
 
-    if df.empty or len(df) < 2:
-        return {}
+Functions
+---------
+previous_period_ohlc(bars, session) -> DataFrame
+    High / low / close of the last completed day, week and month before
+    *session*, per symbol.
+pivot_table(bars, session=None) -> DataFrame
+    All methods × timeframes for *session* (default: the next session).
+get_pivots(symbol, timeframe="D", method="classic") -> dict
+    Stored levels for the current session, computed on the fly if absent.
+"""
 
-    # Get the second last row (i.e., yesterday)
-    prev_day = df.iloc[-2]
-    return {
-        "high": prev_day["High"],
-        "low": prev_day["Low"],
-        "close": prev_day["Close"],
-        "date": prev_day.name.strftime("%Y-%m-%d")
-    }
-    if len(resampled) < 2:
-        return None
+import pandas as pd
+import sqlalchemy as sa
 
-    prev = resampled.iloc[-2]
+from common.cache import Uncached, cached
+from common.market_calendar import eod_ttl, next_close, next_trading_day
+from common.resample import get_bars
+from common.sql import ENGINE, db_stamp
+from common.telemetry import traced
+
+TABLE = "PivotLevels"
+TIMEFRAMES = {"D": "day", "W": "week", "M": "month"}
+METHODS = ("classic", "fibonacci", "camarilla")
+LEVELS = ["Pivot", "R1", "R2", "R3", "R4", "S1", "S2", "S3", "S4"]
+HISTORY_PERIOD = "3mo"          # enough daily bars for last month's range
 
-    return {
-        "high": prev["High"],
-        "low": prev["Low"],
-        "close": prev["Close"],
-        "open": prev["Open"],
-        "date": prev.name.strftime("%d-%b-%Y")
-    }
 
-def calculate_classic_pivots(high: float, low: float, close: float) -> dict:
+# ────────────────────────────────────────────────────────────────────
+# Formulas (scalar or vectorized)
+# ────────────────────────────────────────────────────────────────────
+
+def calculate_classic_pivots(high, low, close) -> dict:
     """Classic pivot formula (TradingView-style)."""
     P = (high + low + close) / 3
     return {
@@ -42,3 +53,163 @@ def calculate_classic_pivots(high: float, low: float, close: float) -> dict:
         "R3": high + 2 * (P - low),
         "S3": low - 2 * (high - P),
     }
+
+def calculate_fibonacci_pivots(high, low, close) -> dict:
+    P = (high + low + close) / 3
+    rng = high - low
+    return {
+        "Pivot": P,
+        "R1": P + 0.382 * rng,
+        "S1": P - 0.382 * rng,
+        "R2": P + 0.618 * rng,
+        "S2": P - 0.618 * rng,
+        "R3": P + rng,
+        "S3": P - rng,
+    }
+
+def calculate_camarilla_pivots(high, low, close) -> dict:
+    rng = (high - low) * 1.1
+    return {
+        "Pivot": (high + low + close) / 3,
+        "R1": close + rng / 12,
+        "S1": close - rng / 12,
+        "R2": close + rng / 6,
+        "S2": close - rng / 6,
+        "R3": close + rng / 4,
+        "S3": close - rng / 4,
+        "R4": close + rng / 2,
+        "S4": close - rng / 2,
+    }
+
+FORMULAS = {
+    "classic": calculate_classic_pivots,
+    "fibonacci": calculate_fibonacci_pivots,
+    "camarilla": calculate_camarilla_pivots,
+}
+
+
+# ────────────────────────────────────────────────────────────────────
+# Batch over stored bars
+# ────────────────────────────────────────────────────────────────────
+
+def _period_key(dates: pd.Series, timeframe: str) -> pd.Series:
+    if timeframe == "D":
+        return dates.dt.normalize()
+    if timeframe == "W":
+        return dates.dt.to_period("W-SUN").dt.start_time
+    return dates.dt.to_period("M").dt.start_time
+
+def previous_period_ohlc(bars: pd.DataFrame, session) -> pd.DataFrame:
+    """
+    *bars*: long daily bars with Date, Symbol, Open, High, Low, Close.
+    Returns Symbol, Timeframe, SourceDate, High, Low, Close for the last
+    completed period of each timeframe strictly before *session*'s.
+    """
+    dates = pd.to_datetime(bars["Date"])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    bars = bars.assign(_d=dates.to_numpy()).sort_values("_d")
+    session = pd.Series([pd.Timestamp(session)])
+
+    frames = []
+    for tf in TIMEFRAMES:
+        key = _period_key(bars["_d"], tf)
+        current = _period_key(session, tf).iat[0]
+        done = bars.assign(Key=key)[key < current]
+        agg = (
+            done.groupby(["Symbol", "Key"], observed=True, sort=False)
+            .agg(High=("High", "max"), Low=("Low", "min"), Close=("Close", "last"))
+            .reset_index()
+        )
+        last = agg.sort_values("Key").groupby("Symbol", observed=True).tail(1)
+        frames.append(last.rename(columns={"Key": "SourceDate"}).assign(Timeframe=tf))
+    out = pd.concat(frames, ignore_index=True)
+    return out[["Symbol", "Timeframe", "SourceDate", "High", "Low", "Close"]]
+
+@traced("pivots.table")
+def pivot_table(bars: pd.DataFrame, session=None) -> pd.DataFrame:
+    """Every method for every (symbol, timeframe), applying to *session*."""
+    if session is None:
+        last = pd.to_datetime(bars["Date"]).max()
+        session = next_trading_day(last)
+    base = previous_period_ohlc(bars.dropna(subset=["High", "Low", "Close"]), session)
+
+    frames = []
+    for method, formula in FORMULAS.items():
+        levels = formula(base["High"], base["Low"], base["Close"])
+        frame = base[["Symbol", "Timeframe", "SourceDate"]].assign(Method=method, **levels)
+        frames.append(frame)
+    out = pd.concat(frames, ignore_index=True).reindex(
+        columns=["Symbol", "Timeframe", "Method", "SourceDate"] + LEVELS
+    )
+    out.insert(0, "Date", pd.Timestamp(session).date().isoformat())
+    out["SourceDate"] = out["SourceDate"].dt.date.astype(str)
+    return out.round({lvl: 2 for lvl in LEVELS})
+
+def write_pivot_table(table: pd.DataFrame, engine=ENGINE) -> None:
+    """Replace the rows for the session(s) in *table*; other dates are kept."""
+    with engine.begin() as conn:
+        exists = conn.execute(sa.text(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=:t"), {"t": TABLE}).first()
+        if exists:
+            for date in table["Date"].unique():
+                conn.execute(sa.text(f'DELETE FROM "{TABLE}" WHERE Date = :d'), {"d": date})
+        table.to_sql(TABLE, conn, if_exists="append", index=False)
+        conn.execute(sa.text(
+            f'CREATE INDEX IF NOT EXISTS ix_{TABLE}_lookup ON "{TABLE}" (Symbol, Timeframe, Method, Date)'
+        ))
+
+
+# ────────────────────────────────────────────────────────────────────
+# Lookups
+# ────────────────────────────────────────────────────────────────────
+
+def current_session() -> pd.Timestamp:
+    """The session running now, or the next one outside market hours."""
+    return next_close().normalize().tz_localize(None)
+
+@cached("pivots.stored", max_entries=256)
+def _stored_pivots(symbol: str, session: str, stamp: int) -> pd.DataFrame:
+    try:
+        return pd.read_sql(
+            sa.text(f'SELECT * FROM "{TABLE}" WHERE Symbol = :s AND Date = :d'),
+            ENGINE, params={"s": symbol, "d": session},
+        )
+    except (sa.exc.OperationalError, pd.errors.DatabaseError):   # batch not run yet
+        return pd.DataFrame(columns=["Date", "Symbol", "Timeframe", "Method", "SourceDate"] + LEVELS)
+
+@cached("pivots.live", ttl=eod_ttl(), max_entries=512)
+def _live_pivots(symbol: str, session: str) -> pd.DataFrame:
+    """Same table for one symbol from cached daily bars (batch has not covered it)."""
+    bars = get_bars(f"{symbol}.NS", interval="1d", period=HISTORY_PERIOD)
+    if bars.empty:
+        return Uncached(pd.DataFrame(columns=["Timeframe", "Method"]))
+    return pivot_table(bars.reset_index().assign(Symbol=symbol), session)
+
+@traced("pivots.get")
+def get_pivots(symbol: str, timeframe: str = "D", method: str = "classic") -> dict:
+    """
+    Levels for *symbol* (no '.NS' suffix) in the current session, plus the
+    ``source`` period they were computed from. Empty dict if unavailable.
+    """
+    session = current_session()
+    stored = _stored_pivots(symbol, session.date().isoformat(), db_stamp())
+    rows = stored[(stored["Timeframe"] == timeframe) & (stored["Method"] == method)]
+    if not rows.empty:
+        row = rows.iloc[0]
+    else:
+        table = _live_pivots(symbol, session.date().isoformat())
+        rows = table[(table["Timeframe"] == timeframe) & (table["Method"] == method)]
+        if rows.empty:
+            return {}
+        row = rows.iloc[0]
+
+    levels = {lvl: float(row[lvl]) for lvl in LEVELS if pd.notna(row[lvl])}
+    return {"levels": levels, "source": row["SourceDate"], "session": row["Date"]}
+
+
+__all__ = [
+    "calculate_classic_pivots", "calculate_fibonacci_pivots", "calculate_camarilla_pivots",
+    "previous_period_ohlc", "pivot_table", "write_pivot_table", "get_pivots",
+    "current_session", "TIMEFRAMES", "METHODS",
+]
@@ -3,27 +3,18 @@
 Industry‑scoped peer selection using **Yahoo Finance longBusinessSummary**.
 
 * Fetches every company description in the target’s industry on first
-  call (can be slow; cached for 12 h via Streamlit).
+  call (can be slow; cached for 12 h via common.cache).
 * No external API keys, no FMP – 100 % yfinance.
 """
 from __future__ import annotations
 
 from typing import List
 import pandas as pd
-import yfinance as yf
+from common.cache import cached
+from common.provider import Ticker
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
-# ------------------------------------------------------------------ #
-# Streamlit‑aware caching                                             
-# ------------------------------------------------------------------ #
-try:
-    import streamlit as st
-    _cache_data = st.cache_data(ttl=12 * 60 * 60, show_spinner=True)
-except ModuleNotFoundError:
-    def _cache_data(func):
-        return func
-
 # ------------------------------------------------------------------ #
 # Yahoo Finance description fetch                                     
 # ------------------------------------------------------------------ #
@@ -31,14 +22,15 @@ except ModuleNotFoundError:
 def _get_yf_description(sym: str) -> str:
     """Return the company's longBusinessSummary via yfinance."""
     try:
-        return yf.Ticker(f"{sym}.NS").info.get("longBusinessSummary", "")
+        return Ticker(f"{sym}.NS").info.get("longBusinessSummary", "")
     except Exception:
         return ""
 
 # ------------------------------------------------------------------ #
 # Batch‑fetch descriptions for one industry                           
 # ------------------------------------------------------------------ #
-@_cache_data
+@cached("similar_peers.industry_descriptions", ttl=12 * 60 * 60, max_entries=256,
+        max_bytes=64 * 2**20, show_spinner=True)
 def _fetch_industry_descriptions(symbols: List[str]) -> pd.DataFrame:
     rows = [
         {"Symbol": sym, "Description": _get_yf_description(sym)}
@@ -0,0 +1,59 @@
+"""An empty ``history`` during an outage must not replace cached bars."""
+
+import time
+
+import pandas as pd
+
+from common import cache, provider
+from common.bars import get_history
+
+
+class _Provider:
+    """Serves the queued frames in order, one per ``history`` call."""
+
+    name = "test"
+    offline = True
+
+    def __init__(self, *frames):
+        self.frames = list(frames)
+
+    def Ticker(self, symbol):
+        outer = self
+
+        class _Ticker:
+            ticker = symbol
+
+            def history(self, **kwargs):
+                return outer.frames.pop(0)
+
+        return _Ticker()
+
+
+def _bars():
+    index = pd.date_range("2026-10-12", periods=3, freq="D", tz="Asia/Kolkata")
+    return pd.DataFrame({c: [1.0, 2.0, 3.0] for c in ("Open", "High", "Low", "Close")}, index=index)
+
+
+def test_empty_refresh_keeps_stale_bars():
+    good = _bars()
+    provider.set_provider(_Provider(pd.DataFrame()))
+    try:
+        get_history.clear()
+        get_history.prime(good, "TEST.NS", "1mo", "1d")
+        # expire it: the next call serves it stale and revalidates in the background
+        for entry in cache._registry["bars.history"].entries.values():
+            entry.expires = time.time() - 1
+        failures = provider.breaker("test").failures
+        refreshes = get_history.stats()["refreshes"]
+
+        pd.testing.assert_frame_equal(get_history("TEST.NS", "1mo", "1d"), good)
+        deadline = time.monotonic() + 5
+        while get_history.stats()["refreshes"] == refreshes and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert provider.breaker("test").failures == failures + 1
+        assert get_history.freshness("TEST.NS", "1mo", "1d").stale
+        pd.testing.assert_frame_equal(get_history("TEST.NS", "1mo", "1d"), good)
+    finally:
+        provider.set_provider(None)
+        get_history.clear()